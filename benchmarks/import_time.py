@@ -0,0 +1,52 @@
+"""
+Import-time benchmark of pedophysics
+
+Each statement is timed in a fresh interpreter, so that no module is cached between runs.
+The last statement loads every submodule and scipy, which is what `import pedophysics` did before
+submodules and scipy were imported lazily.
+
+Usage
+-----
+python benchmarks/import_time.py [--repeat 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+STATEMENTS = ['import pedophysics',
+              'from pedophysics import Soil',
+              'from pedophysics.predict import Water',
+              'from pedophysics import *',
+              'from pedophysics import *; import scipy.optimize, scipy.constants']
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+def time_statement(statement, repeat):
+    """
+    Time the import statement in `repeat` fresh interpreters and return the timings in seconds
+    """
+    code = ("import time; t = time.perf_counter(); " + statement + "; t = time.perf_counter() - t; "
+            "import sys; print(t, 'scipy' in sys.modules)")
+    env = dict(os.environ, PYTHONPATH=SRC + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    timings = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True).stdout.split()
+        timings.append(float(out[0]))
+    return sorted(timings), out[1] == 'True'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='Number of fresh interpreters per statement')
+    args = parser.parse_args()
+
+    print(f"{'statement':<95} {'median [ms]':>11} {'min [ms]':>9}  scipy loaded")
+    for statement in STATEMENTS:
+        timings, scipy_loaded = time_statement(statement, args.repeat)
+        print(f"{statement:<95} {1e3*timings[len(timings)//2]:>11.1f} {1e3*timings[0]:>9.1f}  {scipy_loaded}")
+
+
+if __name__ == '__main__':
+    main()
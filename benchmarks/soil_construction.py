@@ -0,0 +1,82 @@
+"""
+Construction-time benchmark of Soil objects from large inputs
+
+The same random states are passed to Soil() as keyword arrays, and to Soil.from_frame, Soil.from_records
+and Soil.from_arrow (when pyarrow is installed). Soil(bulk_ec, clay) gives two properties only, the others
+being stored as constant columns. The memory kept by each Soil object is measured with tracemalloc,
+which does not trace the arrays allocated by pyarrow.
+
+Usage
+-----
+python benchmarks/soil_construction.py [--n-states 1000000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from pedophysics import Soil
+
+PROPERTIES = ['water', 'bulk_perm', 'bulk_ec', 'clay', 'sand', 'porosity', 'temperature', 'frequency_perm']
+
+
+def time_call(function, repeat):
+    """
+    Call the function `repeat` times and return the best timing in seconds and the last result
+    """
+    timings = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - t)
+    return min(timings), result
+
+
+def retained_memory(function):
+    """
+    Call the function once and return the memory kept by its result in MB
+    """
+    tracemalloc.start()
+    result = function()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size/1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--n-states', type=int, default=1000000, help='Number of soil states')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of constructions per method')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({name: rng.uniform(0, 1, args.n_states) for name in PROPERTIES})
+    frame['site'] = rng.integers(0, 100, args.n_states)
+    records = frame.to_records(index=False)
+
+    methods = {'Soil(bulk_ec, clay)': lambda: Soil(bulk_ec=frame.bulk_ec.to_numpy(copy=True), clay=frame.clay.to_numpy(copy=True)),
+               'Soil(**arrays)': lambda: Soil(**{name: frame[name].to_numpy(copy=True) for name in PROPERTIES}),
+               'Soil.from_frame': lambda: Soil.from_frame(frame),
+               'Soil.from_records': lambda: Soil.from_records(records)}
+    try:
+        import pyarrow
+        table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+        methods['Soil.from_arrow'] = lambda: Soil.from_arrow(table)
+    except ImportError:
+        print('pyarrow is not installed, Soil.from_arrow is skipped')
+
+    print(f"{args.n_states} states, {len(PROPERTIES)} properties")
+    print(f"{'method':<20} {'best [s]':>9} {'memory [MB]':>12}  shares frame memory")
+    for name, method in methods.items():
+        timing, soil = time_call(method, args.repeat)
+        print(f"{name:<20} {timing:>9.3f} {retained_memory(method):>12.1f}  {np.shares_memory(soil.df.water.values, frame.water.values)}")
+
+
+if __name__ == '__main__':
+    main()
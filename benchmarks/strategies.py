@@ -0,0 +1,118 @@
+"""
+Calibration of the costs and errors of the inversion paths selected by the strategy of predict functions
+
+Each inversion of utils.strategy.COSTS is solved on random states by each of its paths: the scipy minimize call per
+state of the predict functions ('optimizer'), and the closed-form, tabulated or batched bisection alternatives.
+The setup time of a path is its time on one state, and its time per state is the slope between one state and
+--n-states states. The error is the largest absolute difference to a bisection at full precision.
+The printed table is the COSTS of utils.strategy, for this machine.
+
+Usage
+-----
+python benchmarks/strategies.py [--n-states 2000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from scipy.optimize import minimize
+from pedophysics.pedophysical_models.bulk_ec import SheetsHendrickx, LongmireSmithEC, WunderlichEC
+from pedophysics.pedophysical_models.bulk_perm import LongmireSmithP, WunderlichP
+from pedophysics.utils.solvers import bisection, tabulated_inverse
+from pedophysics.utils.strategy import COSTS
+
+
+def time_call(function, repeat):
+    """
+    Call the function `repeat` times and return the best timing in seconds and the last result
+    """
+    timings = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - t)
+    return min(timings), result
+
+
+def optimizer(model, y, x0, bounds):
+    """Invert model(x, i) = y[i] state by state by minimize, as the predict functions do"""
+    return np.array([minimize(lambda x: (model(x, i) - y[i])**2, x0, bounds=[bounds], method='L-BFGS-B').x[0] for i in range(len(y))])
+
+
+def inversions(n, rng):
+    """
+    Return, for each inversion of COSTS, its bounds and a function of the number of states returning the result of each path
+    """
+    temperature = rng.uniform(273.15, 313.15, n)
+    frequency_ec = rng.choice([1e3, 1e4, 9e3], n)
+    frequency_perm = rng.choice([1e5, 1e6, 1e7], n)
+    bulk_ec_dc = rng.uniform(1e-3, 0.5, n)
+    water = rng.uniform(0.02, 0.5, n)
+    bulk_ec_dc_tc = SheetsHendrickx(bulk_ec_dc, temperature)
+    bulk_ec = LongmireSmithEC(bulk_ec_dc, frequency_ec)
+    bulk_perm_ec = LongmireSmithP(bulk_ec_dc, 5., frequency_perm)
+    bulk_perm = WunderlichP(water, 5., 0.05, 80., 0.1)
+    bulk_ec_w = WunderlichEC(water, 0.01, 0.05, 0.1, 0.1)
+
+    def per_frequency(model, y, frequency, lower):
+        result = np.empty(len(y))
+        for f in np.unique(frequency):
+            states = frequency == f
+            result[states] = tabulated_inverse(lambda x: model(x, f), y[states], lower, 1)
+        return result
+
+    return {
+        'bulk_ec_dc from bulk_ec_dc_tc': ((0, 1), {
+            'optimizer': lambda m: optimizer(lambda x, i: SheetsHendrickx(x, temperature[i]), bulk_ec_dc_tc[:m], 0.05, (0, 1)),
+            'closed-form': lambda m: np.clip(bulk_ec_dc_tc[:m]/SheetsHendrickx(1, temperature[:m]), 0, 1)},
+            lambda x, m: SheetsHendrickx(x, temperature[:m]) - bulk_ec_dc_tc[:m]),
+        'bulk_ec_dc from bulk_ec': ((0, 1), {
+            'optimizer': lambda m: optimizer(lambda x, i: LongmireSmithEC(x, frequency_ec[i]), bulk_ec[:m], 0.05, (0, 1)),
+            'tabulated': lambda m: per_frequency(LongmireSmithEC, bulk_ec[:m], frequency_ec[:m], 0)},
+            lambda x, m: LongmireSmithEC(x, frequency_ec[:m]) - bulk_ec[:m]),
+        'bulk_ec_dc from bulk_perm': ((1e-6, 1), {
+            'optimizer': lambda m: optimizer(lambda x, i: LongmireSmithP(x, 5., frequency_perm[i]), bulk_perm_ec[:m], 0.05, (1e-6, 1)),
+            'tabulated': lambda m: per_frequency(lambda x, f: LongmireSmithP(x, 0, f), bulk_perm_ec[:m] - 5., frequency_perm[:m], 1e-6)},
+            lambda x, m: LongmireSmithP(x, 5., frequency_perm[:m]) - bulk_perm_ec[:m]),
+        'water from bulk_perm': ((0, .65), {
+            'optimizer': lambda m: optimizer(lambda x, i: WunderlichP(x, 5., 0.05, 80., 0.1), bulk_perm[:m], 0.15, (0, .65)),
+            'bisection': lambda m: bisection(lambda x: WunderlichP(x, 5., 0.05, 80., 0.1) - bulk_perm[:m], np.zeros(m), .65)},
+            lambda x, m: WunderlichP(x, 5., 0.05, 80., 0.1) - bulk_perm[:m]),
+        'water from bulk_ec_dc_tc': ((0, .65), {
+            'optimizer': lambda m: optimizer(lambda x, i: WunderlichEC(x, 0.01, 0.05, 0.1, 0.1), bulk_ec_w[:m], 0.15, (0, .65)),
+            'bisection': lambda m: bisection(lambda x: WunderlichEC(x, 0.01, 0.05, 0.1, 0.1) - bulk_ec_w[:m], np.zeros(m), .65)},
+            lambda x, m: WunderlichEC(x, 0.01, 0.05, 0.1, 0.1) - bulk_ec_w[:m]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--n-states', type=int, default=2000, help='Number of soil states of the batch')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of calls per path')
+    args = parser.parse_args()
+    n = args.n_states
+
+    print("COSTS = {")
+    for inversion, (bounds, paths, residual) in inversions(n, np.random.default_rng(0)).items():
+        with np.errstate(all='ignore'):
+            reference = bisection(lambda x: residual(x, n), np.full(n, float(bounds[0])), bounds[1], tol=1e-14, maxiter=100)
+        entries = []
+        for path, solve in paths.items():
+            m = n if path != 'optimizer' else min(n, 200) # The optimizer is timed on fewer states
+            one, _ = time_call(lambda: solve(1), args.repeat)
+            many, result = time_call(lambda: solve(m), args.repeat)
+            per_state = max(many - one, 0)/(m - 1)
+            error = np.nanmax(np.abs(result - reference[:m]))
+            entries.append(f"'{path}': ({max(one - per_state, 0):.1e}, {per_state:.1e}, {error:.0e})")
+        print(f"    '{inversion}': {{{', '.join(entries)}}},")
+    print("}")
+    assert set(COSTS) == set(inversions(1, np.random.default_rng(0)))
+
+
+if __name__ == '__main__':
+    main()
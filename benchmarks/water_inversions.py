@@ -0,0 +1,87 @@
+"""
+Benchmark of the closed-form LR_MV, LR and LR_W water inversions of water_from_perm.non_fitting
+
+The states are spread over the three frequency bands of the inversions, with a fraction of them missing water.
+The per-state loop calls each inversion once per missing state and rounds its result, as water_from_perm.non_fitting
+did before; the array expressions evaluate each band once on its missing states. non_fitting is timed as well,
+on a Soil object whose other attributes are already known.
+
+Usage
+-----
+python benchmarks/water_inversions.py [--n-states 100000] [--missing 0.5] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from pedophysics import Soil
+from pedophysics.predict import water_from_perm
+from pedophysics.pedophysical_models.water import LR, LR_W, LR_MV
+
+BANDS = [(50e6, LR_MV, 'CEC'), (150e6, LR, 'alpha'), (1e9, LR_W, 'clay')]
+
+
+def time_call(function, repeat):
+    """
+    Call the function `repeat` times and return the best timing in seconds and the last result
+    """
+    timings = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - t)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--n-states', type=int, default=100000, help='Number of soil states')
+    parser.add_argument('--missing', type=float, default=0.5, help='Fraction of states missing water')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of calls per method')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    n = args.n_states
+    attributes = {'bulk_perm': rng.uniform(5, 30, n), 'porosity': rng.uniform(0.35, 0.55, n), 'air_perm': np.full(n, 1.2),
+                  'solid_perm': np.full(n, 4.), 'water_perm': np.full(n, 80.), 'CEC': rng.uniform(1, 40, n), 'clay': rng.uniform(0, 60, n),
+                  'frequency_perm': np.array([band[0] for band in BANDS])[rng.integers(0, len(BANDS), n)]}
+    water = np.where(rng.uniform(0, 1, n) < args.missing, np.nan, 0.2)
+    alpha = np.array([0.5])
+    extra = lambda name, m: alpha if name == 'alpha' else attributes[name][m]
+    inputs = ['bulk_perm', 'porosity', 'air_perm', 'solid_perm', 'water_perm']
+
+    def loop():
+        result = water.copy()
+        for frequency, model, name in BANDS:
+            for x in np.flatnonzero((attributes['frequency_perm'] == frequency) & np.isnan(water)):
+                result[x] = round(model(*[attributes[i][x] for i in inputs], extra(name, x)), 6)
+        return result
+
+    def arrays():
+        result = water.copy()
+        for frequency, model, name in BANDS:
+            m = (attributes['frequency_perm'] == frequency) & np.isnan(water)
+            result[m] = model(*[attributes[i][m] for i in inputs], extra(name, m))
+        return result
+
+    soil = lambda: Soil(water=water.copy(), alpha=0.5, **{key: value.copy() for key, value in attributes.items()})
+    samples = [soil() for _ in range(args.repeat)]
+
+    print(f"{n} states, {np.isnan(water).sum()} missing water")
+    print(f"{'method':<28} {'best [s]':>9}")
+    loop_timing, loop_result = time_call(loop, args.repeat)
+    array_timing, array_result = time_call(arrays, args.repeat)
+    non_fitting_timing, _ = time_call(lambda: water_from_perm.non_fitting(samples.pop()), args.repeat)
+    print(f"{'per-state loop':<28} {loop_timing:>9.3f}")
+    print(f"{'array expressions':<28} {array_timing:>9.3f}")
+    print(f"{'water_from_perm.non_fitting':<28} {non_fitting_timing:>9.3f}")
+    print(f"Largest difference between loop and arrays: {np.nanmax(np.abs(loop_result - array_result)):.1e}")
+
+
+if __name__ == '__main__':
+    main()
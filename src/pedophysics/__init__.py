@@ -1,6 +1,10 @@
-from .instruments import *
-from .simulate import *
-from .utils import *
-from .predict import *
-from .pedophysical_models import *
-from .pedotransfer_functions import *
+# Submodules are imported on first access of their attributes, see utils.lazy
+from pedophysics.utils.lazy import lazy_package
+
+_submodules = ['instruments', 'simulate', 'utils', 'predict', 'pedophysical_models', 'pedotransfer_functions']
+
+_attributes = {'Inst2FreqP': 'instruments', 'Inst2FreqEC': 'instruments',
+               'Soil': 'simulate', 'synthetic_states': 'simulate', 'synthetic_soil': 'simulate', 'synthetic_chunks': 'simulate',
+               'write_synthetic': 'simulate'}
+
+__getattr__, __dir__ = lazy_package(__name__, _submodules, _attributes)
\ No newline at end of file
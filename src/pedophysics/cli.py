@@ -0,0 +1,259 @@
+"""
+Command-line batch processor of soil states in CSV or Parquet files
+
+The input file is read in chunks of --chunk-size rows. Each chunk is converted to a Soil object (see Soil.from_frame),
+the --target predict functions are called on it, and the chunk is written with its completed target columns, and their
+provenance (soil.info) as 'info.<target>' columns, to a part file 'part-00000.<format>', 'part-00001.<format>', ...
+of the output directory. At most --jobs chunks are held in memory at once, so that the memory use does not depend
+on the size of the file. Fitting predict functions are fitted on each chunk on its own.
+
+Part files are written under a temporary name and then renamed, and the settings of the run are written to
+'manifest.json' in the output directory. With --resume, the parts already written are skipped, so that an interrupted
+run is completed with the same settings.
+
+Usage
+-----
+pedophysics survey.csv results --target Water --map theta=water EC=bulk_ec --set frequency_perm=50e6 water_ec=0.1
+"""
+import argparse
+import ast
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from pedophysics.simulate import Soil
+
+FORMATS = ['csv', 'parquet']
+
+# Predict functions accepted as targets, and the array-like attribute each of them completes
+TARGETS = {'Temperature': 'temperature', 'Water': 'water', 'Salinity': 'salinity', 'Porosity': 'porosity',
+           'ParticleDensity': 'particle_density', 'BulkPerm': 'bulk_perm', 'BulkPermInf': 'bulk_perm_inf', 'AirPerm': 'air_perm',
+           'WaterPerm': 'water_perm', 'SolidPerm': 'solid_perm', 'BulkEC': 'bulk_ec', 'BulkECTC': 'bulk_ec_tc', 'BulkECDC': 'bulk_ec_dc',
+           'BulkECDCTC': 'bulk_ec_dc_tc', 'WaterEC': 'water_ec', 'SolidEC': 'solid_ec', 'FrequencyPerm': 'frequency_perm',
+           'FrequencyEC': 'frequency_ec'}
+
+
+def read_chunks(path, chunk_size, columns=None):
+    """
+    Yield the rows of a CSV or Parquet file in DataFrames of at most chunk_size rows
+
+    Parameters
+    ----------
+    path : str
+        Input file. A '.parquet' extension is read as Parquet (requires pyarrow), any other as CSV.
+    chunk_size : int
+        Maximum number of rows per chunk.
+    columns : list of str, optional
+        Columns to read. All by default.
+
+    Yields
+    ------
+    DataFrame
+        Rows of the chunk, indexed by their position in the file.
+    """
+    if path.endswith('.parquet'):
+        import pyarrow.parquet
+
+        start = 0
+        for batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            chunk = batch.to_pandas()
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            yield chunk
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns)
+
+
+def predict_chunk(chunk, columns, attributes, targets, info=True):
+    """
+    Predict the targets of the soil states of a chunk and return the chunk with its completed target columns
+
+    Module-level function, so that it can be sent to worker processes.
+
+    Parameters
+    ----------
+    chunk : DataFrame
+        Rows of the input file.
+    columns : dict
+        Mapping of chunk column names to Soil attribute names.
+    attributes : dict
+        Other Soil attributes, as in Soil.from_frame.
+    targets : list of str
+        Names of the predict functions in TARGETS.
+    info : bool, optional
+        If True (default), the provenance of each target is added as an 'info.<target>' column.
+
+    Returns
+    -------
+    DataFrame
+        The chunk, with one column per target attribute (replacing a column of the same name) and its provenance.
+    """
+    from pedophysics import predict
+
+    soil = Soil.from_frame(chunk, columns=columns, **attributes)
+    output = chunk.copy()
+    for target in targets:
+        attribute = TARGETS[target]
+        getattr(predict, target)(soil)
+        output[attribute] = soil.df[attribute].values
+        if info:
+            output['info.' + attribute] = soil.info[attribute].values
+    return output
+
+
+def write_part(frame, path):
+    """
+    Write a DataFrame to a CSV or Parquet file under a temporary name and then rename it, so that a part file is either complete or absent
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    temporary = os.path.join(directory, '.' + name + '.tmp')
+    if path.endswith('.parquet'):
+        frame.to_parquet(temporary, index=True)
+    else:
+        frame.to_csv(temporary, index_label='state')
+    os.replace(temporary, path)
+
+
+def run(input, output, targets, columns=None, attributes=None, chunk_size=100000, n_jobs=1, fmt=None, info=True, resume=False):
+    """
+    Process the soil states of a CSV or Parquet file in chunks and return the paths of the part files written by this call
+
+    Parameters
+    ----------
+    input : str
+        Input file, in CSV or Parquet ('.parquet') format.
+    output : str
+        Directory of the part files and the manifest.
+    targets : list of str
+        Names of the predict functions to call, in TARGETS.
+    columns : dict, optional
+        Mapping of input column names to Soil attribute names, e.g. {'theta': 'water', 'EC': 'bulk_ec'}.
+    attributes : dict, optional
+        Other Soil attributes: single values (e.g. Lw, instrument) and array-like attributes given for all states (e.g. water_ec=0.1).
+    chunk_size : int, optional
+        Maximum number of rows per chunk and part file.
+    n_jobs : int, optional
+        Number of worker processes. Each of them holds one chunk in memory.
+    fmt : str, optional
+        Format of the part files, 'csv' or 'parquet'. The format of the input by default.
+    info : bool, optional
+        If True (default), the provenance of each target is written as an 'info.<target>' column.
+    resume : bool, optional
+        If True, the part files written by a previous run with the same settings are kept and skipped.
+
+    Returns
+    -------
+    list
+        Paths of the part files written by this call.
+
+    External functions
+    --------
+    read_chunks : Yield the rows of a CSV or Parquet file in DataFrames of at most chunk_size rows
+    predict_chunk : Predict the targets of the soil states of a chunk and return the chunk with its completed target columns
+    write_part : Write a DataFrame to a CSV or Parquet file under a temporary name and then rename it, so that a part file is either complete or absent
+
+    Example
+    -------
+    >>> run('survey.csv', 'results', ['Water'], columns={'theta': 'water'}, attributes={'frequency_perm': 50e6}, chunk_size=2)
+    ['results/part-00000.csv', 'results/part-00001.csv']
+    """
+    columns, attributes = columns or {}, attributes or {}
+    invalid = [target for target in targets if target not in TARGETS]
+    if invalid:
+        raise ValueError(f"{invalid} are not predict targets. Must be in {list(TARGETS)}")
+    fmt = fmt or ('parquet' if input.endswith('.parquet') else 'csv')
+    if fmt not in FORMATS:
+        raise ValueError(f"'fmt' must be one of {FORMATS}")
+    if n_jobs < 1 or chunk_size < 1:
+        raise ValueError("'n_jobs' and 'chunk_size' must be positive")
+
+    manifest = {'input': os.path.abspath(input), 'targets': list(targets), 'columns': columns, 'attributes': attributes,
+                'chunk_size': chunk_size, 'format': fmt, 'info': info}
+    os.makedirs(output, exist_ok=True)
+    manifest_path = os.path.join(output, 'manifest.json')
+    if resume and os.path.exists(manifest_path):
+        with open(manifest_path) as file:
+            previous = json.load(file)
+        if previous != manifest:
+            changed = [key for key in manifest if previous.get(key) != manifest[key]]
+            raise ValueError(f"Cannot resume {output}: the settings {changed} differ from those of the previous run")
+    else:
+        with open(manifest_path, 'w') as file:
+            json.dump(manifest, file, indent=2)
+
+    # At most n_jobs chunks are predicted at once, and their parts are written in the order of the file
+    pool = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+    pending, written = deque(), []
+    try:
+        for i, chunk in enumerate(read_chunks(input, chunk_size)):
+            path = os.path.join(output, f"part-{i:05d}.{fmt}")
+            if resume and os.path.exists(path):
+                continue
+            arguments = (chunk, columns, attributes, targets, info)
+            pending.append((path, pool.submit(predict_chunk, *arguments) if pool else predict_chunk(*arguments)))
+            while len(pending) >= n_jobs:
+                path, result = pending.popleft()
+                write_part(result.result() if pool else result, path)
+                written.append(path)
+        while pending:
+            path, result = pending.popleft()
+            write_part(result.result(), path)
+            written.append(path)
+    finally:
+        if pool:
+            pool.shutdown()
+    return written
+
+
+def parse_pairs(pairs, convert=False):
+    """
+    Return a dict of NAME=VALUE pairs, with the values converted to numbers (or True, False, None) when `convert` is True
+    """
+    parsed = {}
+    for pair in pairs or []:
+        name, separator, value = pair.partition('=')
+        if not separator or not name:
+            raise argparse.ArgumentTypeError(f"'{pair}' must be given as NAME=VALUE")
+        if convert:
+            try:
+                value = ast.literal_eval(value)
+            except (ValueError, SyntaxError):
+                pass
+        parsed[name] = value
+    return parsed
+
+
+def main(argv=None):
+    """
+    Run the pedophysics command-line batch processor and return its exit status
+    """
+    parser = argparse.ArgumentParser(prog='pedophysics', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', help="Input file, in CSV or Parquet ('.parquet') format")
+    parser.add_argument('output', help='Output directory of the part files')
+    parser.add_argument('--target', nargs='+', required=True, choices=list(TARGETS), metavar='TARGET',
+                        help=f"Predict functions to call, among {', '.join(TARGETS)}")
+    parser.add_argument('--map', nargs='+', metavar='COLUMN=ATTRIBUTE', help='Input columns named differently than the Soil attributes')
+    parser.add_argument('--set', nargs='+', metavar='ATTRIBUTE=VALUE', help='Soil attributes given for all states, e.g. frequency_perm=50e6 instrument=TDR')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='Rows per chunk and part file (default 100000)')
+    parser.add_argument('--jobs', type=int, default=1, help='Number of worker processes (default 1)')
+    parser.add_argument('--format', choices=FORMATS, help='Format of the part files (default: the format of the input)')
+    parser.add_argument('--no-info', action='store_true', help='Do not write the provenance of the targets')
+    parser.add_argument('--resume', action='store_true', help='Keep the part files of a previous run and process the others')
+    args = parser.parse_args(argv)
+
+    try:
+        written = run(args.input, args.output, args.target, columns=parse_pairs(args.map), attributes=parse_pairs(args.set, convert=True),
+                      chunk_size=args.chunk_size, n_jobs=args.jobs, fmt=args.format, info=not args.no_info, resume=args.resume)
+    except (ValueError, argparse.ArgumentTypeError, OSError) as error:
+        print(f"pedophysics: error: {error}", file=sys.stderr)
+        return 1
+    print(f"{len(written)} part files written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,6 @@
 import numpy as np
-from scipy.constants import pi, epsilon_0
+
+from pedophysics.utils.precision import result_dtype, as_float64, as_dtype
 
 def WunderlichEC(water, ec_init, wat_init, wc, Lw):  
     """
@@ -47,6 +48,8 @@ def WunderlichEC(water, ec_init, wat_init, wc, Lw):
     0.182634
 
     """
+    dtype = result_dtype(water, ec_init, wat_init, wc, Lw)                # Float32 inputs are integrated in float64
+    water, ec_init, wat_init, wc, Lw = as_float64(water, ec_init, wat_init, wc, Lw)
     diff = water - wat_init                                               # Diference utilized just for simplicity
     bulk_ec = ec_init                                                     # Initial permitivity = Epsilon sub 1  
     x = 0                                                                 # Diferentiation from p = 0  
@@ -57,7 +60,7 @@ def WunderlichEC(water, ec_init, wat_init, wc, Lw):
         x=x+dx
         bulk_ec=bulk_ec+dy
 
-    return bulk_ec    
+    return as_dtype(bulk_ec, dtype)
 
 
 def Fu(water, clay, por, wc, solid_ec, dry_ec, sat_ec, s=1, w=2):
@@ -175,10 +178,14 @@ def LongmireSmithEC(bulk_ec_dc, frequency_ec):
     array([0.05153802, 0.10245936])
 
     """
+    from scipy.constants import pi, epsilon_0
+
     if (bulk_ec_dc == 0).all():
         return 0
     
     else: 
+        dtype = result_dtype(bulk_ec_dc, frequency_ec)                  # Float32 inputs are summed in float64
+        bulk_ec_dc, frequency_ec = as_float64(bulk_ec_dc, frequency_ec)
         a = [3.4e6, 2.74e5, 2.58e4, 3.38e3, 5.26e2, 1.33e2, 2.72e1, 1.25e1, 4.8, 2.17, 9.8e-1, 3.92e-1, 1.73e-1]
         f = (125*bulk_ec_dc)**0.8312
         bulk_eci_ = []
@@ -189,7 +196,7 @@ def LongmireSmithEC(bulk_ec_dc, frequency_ec):
             bulk_eci_.append(bulk_eci)
 
         bulk_ec = bulk_ec_dc + sum(bulk_eci_)
-        return bulk_ec
+        return as_dtype(bulk_ec, dtype)
     
     
 def Rhoades(water, wc, s_ec, E, F):
@@ -1,5 +1,7 @@
 import numpy as np
 
+from pedophysics.utils.precision import result_dtype, as_float64, as_dtype
+
 def WunderlichP(water, perm_init, wat_init, wp, Lw): 
     """
     Calculate the soil bulk real relative dielectric permittivity using the Wunderlich model and return
@@ -46,6 +48,8 @@ def WunderlichP(water, perm_init, wat_init, wp, Lw):
     24.591
 
     """
+    dtype = result_dtype(water, perm_init, wat_init, wp, Lw)       # Float32 inputs are integrated in float64
+    water, perm_init, wat_init, wp, Lw = as_float64(water, perm_init, wat_init, wp, Lw)
     diff = water - wat_init                                        # Diference utilized just for simplicity
     bulk_perm = perm_init                                          # Initial permitivity = epsilon sub 1  
     x = 0.001                                                      # Diferentiation from p = 0  
@@ -56,7 +60,7 @@ def WunderlichP(water, perm_init, wat_init, wp, Lw):
         x=x+dx
         bulk_perm = bulk_perm+dy*dx
         
-    return bulk_perm
+    return as_dtype(bulk_perm, dtype)
 
 
 def LR_MV(water, por, ap, sp, wp, CEC): 
@@ -131,8 +135,9 @@ def LR(water, por, ap, sp, wp, alpha):
         Soil solid real relative dielectric permittivity phase [-].
     wp : array_like
         Soil water phase real dielectric permittivity [-].
-    alpha : float
-        Soil alpha exponent as defined in volumetric mixing theory [-].
+    alpha : float or array_like
+        Soil alpha exponent as defined in volumetric mixing theory [-]. A single value (also as a one-element array,
+        e.g. soil.alpha) is applied to all states, an array to each state. NaN values are replaced by 0.5.
 
     Returns
     -------
@@ -151,8 +156,8 @@ def LR(water, por, ap, sp, wp, alpha):
     15.006
 
     """
-    if not isinstance(alpha, np.floating):
-        alpha = alpha[0]
+    alpha = np.asarray(alpha, dtype=float)
+    alpha = np.where(np.isnan(alpha), 0.5, alpha).reshape(() if alpha.size == 1 else alpha.shape)
     bulk_perm = ( water*wp**alpha + (1-por)*sp**alpha + (por-water)*ap**(alpha))**(1/alpha)
 
     return bulk_perm
@@ -256,6 +261,8 @@ def LongmireSmithP(bulk_ec_dc, bulk_perm_inf, frequency_perm):
     if (bulk_ec_dc == 0).all():
         return bulk_perm_inf
     
+    dtype = result_dtype(bulk_ec_dc, bulk_perm_inf, frequency_perm)     # Float32 inputs are summed in float64
+    bulk_ec_dc, bulk_perm_inf, frequency_perm = as_float64(bulk_ec_dc, bulk_perm_inf, frequency_perm)
     a = [3.4e6, 2.74e5, 2.58e4, 3.38e3, 5.26e2, 1.33e2, 2.72e1, 1.25e1, 4.8, 2.17, 9.8e-1, 3.92e-1, 1.73e-1]
     f = (125*bulk_ec_dc)**0.8312
     bulk_permi_ = []
@@ -266,7 +273,7 @@ def LongmireSmithP(bulk_ec_dc, bulk_perm_inf, frequency_perm):
         bulk_permi_.append(bulk_permi)
     bulk_perm = bulk_perm_inf + sum(bulk_permi_)
 
-    return bulk_perm
+    return as_dtype(bulk_perm, dtype)
 
 
 def Hilhorst(bulk_ec, water_ec, water_perm, offset_perm):
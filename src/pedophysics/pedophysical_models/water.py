@@ -70,8 +70,9 @@ def LR(bp, por, ap, sp, wp, alpha):
         Soil solid real relative dielectric permittivity phase [-].
     wp : array_like
         Soil water phase real dielectric permittivity [-].
-    alpha : float
-        Soil alpha exponent as defined in volumetric mixing theory [-].
+    alpha : float or array_like
+        Soil alpha exponent as defined in volumetric mixing theory [-]. A single value (also as a one-element array,
+        e.g. soil.alpha) is applied to all states, an array to each state. NaN values are replaced by 0.5.
 
     Returns
     -------
@@ -90,11 +91,8 @@ def LR(bp, por, ap, sp, wp, alpha):
     0.210
 
     """
-    if not isinstance(alpha, np.floating):
-        alpha = alpha[0]
-
-    if np.isnan(alpha):
-        alpha = 0.5
+    alpha = np.asarray(alpha, dtype=float)
+    alpha = np.where(np.isnan(alpha), 0.5, alpha).reshape(() if alpha.size == 1 else alpha.shape)
     water = (bp**alpha - (1-por)*sp**alpha - por*ap**alpha) / (wp**alpha - ap**alpha)
 
     return water
@@ -148,4 +146,78 @@ def LR_MV(bp, por, ap, sp, wp, CEC):
     alpha = 0.248*np.log(CEC) + 0.366  
     water = (bp**alpha - (1-por)*sp**alpha - por*ap**alpha) / (wp**alpha - ap**alpha)
 
-    return water
\ No newline at end of file
+    return water
+
+def Fu(bulk_ec, clay, por, wc, solid_ec, dry_ec, sat_ec, s=1, w=2):
+    """
+    Calculate the soil volumetric water content using the Fu model and return
+
+    This function inverts the volumetric mixing model of Fu et al. [1] (see pedophysical_models.bulk_ec.Fu). 
+    For the default water phase exponent w = 2 the bulk electrical conductivity is quadratic in the water content, 
+    so the inversion is solved in closed form for all three forms of the model, element-wise over arrays.
+
+    Parameters
+    ----------
+    bulk_ec : array_like
+        Soil bulk real electrical conductivity direct current temperature corrected [S/m].
+    clay : array_like
+        Soil clay content [g/g]*100.
+    por: array_like
+        Soil porosity [m**3/m**3].
+    wc : array_like
+        Soil water real electrical conductivity [S/m].
+    solid_ec : array_like
+        Soil solid real electrical conductivity [S/m].
+    dry_ec : array_like
+        Soil bulk real electrical conductivity at zero water content [S/m].
+    sat_ec : array_like
+        Soil bulk real electrical conductivity at saturation water content [S/m].
+    s : float, optional
+        Phase exponent of the solid, default is 1.
+    w : float, optional
+        Phase exponent of the water, only the default value of 2 is supported.
+
+    Returns
+    -------
+    array_like
+        Soil volumetric water content [m**3/m**3]. NaN where the model has no non-negative solution.
+
+    Notes
+    -----
+    When the quadratic has two non-negative roots, the smallest one is returned.
+
+    References
+    ----------
+    .. [1] Yongwei Fu, Robert Horton, Tusheng Ren, J.L. Heitman,
+    A general form of Archie's model for estimating bulk soil electrical conductivity,
+    Journal of Hydrology, Volume 597, 2021, 126160, ISSN 0022-1694, https://doi.org/10.1016/j.jhydrol.2021.126160.
+
+    Example
+    -------
+    >>> Fu(0.071781, 30, 0.5, 0.3, 0, np.nan, np.nan)
+    0.3
+    """
+    if w != 2:
+        raise ValueError("The closed-form inversion of Fu is only available for w = 2")
+
+    bulk_ec, clay, por, wc, solid_ec, dry_ec, sat_ec = np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in (bulk_ec, clay, por, wc, solid_ec, dry_ec, sat_ec)])
+    d = 0.6539
+    e = 0.0183
+    surf_ec = (d*clay/(100-clay))+e # Soil electrical conductivity of solid surfaces
+
+    # Coefficients of a*water**2 + b*water + c = 0 for each form of the model
+    sat_ec = np.where(~np.isnan(dry_ec) & np.isnan(sat_ec), dry_ec + (wc+surf_ec)*por**w, sat_ec)
+    a = np.where(np.isnan(dry_ec), wc, (dry_ec-sat_ec)/(por**w) - surf_ec)
+    b = por*surf_ec
+    c = np.where(np.isnan(dry_ec), solid_ec*(1-por)**s, dry_ec) - bulk_ec
+    a = np.where(np.isnan(dry_ec) & ~np.isnan(sat_ec), np.nan, a) # No form of the model uses sat_ec without dry_ec
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sqrt_disc = np.sqrt(b**2 - 4*a*c)
+        roots = np.stack([(-b - sqrt_disc)/(2*a), (-b + sqrt_disc)/(2*a)])
+        roots = np.where(a == 0, -c/b, roots)
+    roots = np.where(roots >= 0, roots, np.inf)
+    water = roots.min(axis=0)
+    water = np.where(np.isinf(water), np.nan, water)
+
+    return water[()] if water.ndim == 0 else water
@@ -1,3 +1,5 @@
+import numpy as np
+
 def SenGoode(T, C_f):
     """
     Calculate soil water real electrical conductivity using the Sen and Goode model and return
@@ -48,4 +50,65 @@ def SenGoode(T, C_f):
     d6 = 0.214 
     water_ec = (d1+d2*T_celsius+d3*T_celsius**2)*C_f - ((d4+d5*T_celsius)/(1+d6*C_f**0.5))*C_f**1.5
 
-    return water_ec
\ No newline at end of file
+    return water_ec
+
+def FuWaterEC(water, clay, por, bulk_ec, solid_ec, dry_ec, sat_ec, s=1, w=2):
+    """
+    Calculate soil water real electrical conductivity by inverting the Fu model and return
+
+    In the forms of the Fu model without sat_ec (see pedophysical_models.bulk_ec.Fu), the bulk electrical conductivity 
+    is affine in the water electrical conductivity, which is thus solved in closed form.
+    With both dry_ec and sat_ec given, the Fu model does not depend on the water electrical conductivity.
+
+    Parameters
+    ----------
+    water : array_like
+        Soil volumetric water content [m**3/m**3].
+    clay : array_like
+        Soil clay content [g/g]*100.
+    por: array_like
+        Soil porosity [m**3/m**3].
+    bulk_ec : array_like
+        Soil bulk real electrical conductivity [S/m].
+    solid_ec : array_like
+        Soil solid real electrical conductivity [S/m].
+    dry_ec : array_like
+        Soil bulk real electrical conductivity at zero water content [S/m].
+    sat_ec : array_like
+        Soil bulk real electrical conductivity at saturation water content [S/m].
+    s : float, optional
+        Phase exponent of the solid, default is 1.
+    w : float, optional
+        Phase exponent of the water, default is 2.
+
+    Returns
+    -------
+    array_like
+        Soil water real electrical conductivity [S/m]. NaN where sat_ec is given, where water is zero, 
+        or where the bulk electrical conductivity is only matched by a negative water electrical conductivity.
+
+    References
+    ----------
+    .. [1] Yongwei Fu, Robert Horton, Tusheng Ren, J.L. Heitman,
+    A general form of Archie's model for estimating bulk soil electrical conductivity,
+    Journal of Hydrology, Volume 597, 2021, 126160, ISSN 0022-1694, https://doi.org/10.1016/j.jhydrol.2021.126160.
+
+    Example
+    -------
+    >>> FuWaterEC(0.3, 30, 0.5, 0.072626, 0, np.nan, np.nan)
+    0.309384
+    """
+    water, clay, por, bulk_ec, solid_ec, dry_ec, sat_ec = np.broadcast_arrays(*[np.asarray(v, dtype=np.float64) 
+                                                                                  for v in (water, clay, por, bulk_ec, solid_ec, dry_ec, sat_ec)])
+    d = 0.6539
+    e = 0.0183
+    surf_ec = (d*clay/(100-clay))+e # Soil electrical conductivity of solid surfaces
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # bulk_ec = solid_ec*(1-por)**s + (water**(w-1))*(por*surf_ec) + wc*water**w
+        from_solid = (bulk_ec - solid_ec*(1-por)**s - (water**(w-1))*(por*surf_ec))/water**w
+        # bulk_ec = dry_ec - (wc + 2*surf_ec)*water**w + (water**(w-1))*(por*surf_ec), as sat_ec = dry_ec + (wc+surf_ec)*por**w
+        from_dry = (dry_ec + (water**(w-1))*(por*surf_ec) - bulk_ec)/water**w - 2*surf_ec
+
+    water_ec = np.where(np.isnan(sat_ec), np.where(np.isnan(dry_ec), from_solid, from_dry), np.nan)
+    return np.where(np.isfinite(water_ec) & (water_ec >= 0), water_ec, np.nan)[()]
@@ -1,21 +1,17 @@
-from .air_perm import *
-from .bulk_ec import *
-from .bulk_ec_tc import *
-from .bulk_ec_dc import *
-from .bulk_ec_dc_tc import *
-from .bulk_perm_inf import *
-from .bulk_perm import *
-from .frequency_ec import *
-from .frequency_perm import *
-from .particle_density import *
-from .porosity import *
-from .solid_ec import *
-from .solid_perm import *
-from .temperature import *
-from .texture import *
-from .water_ec import *
-from .water_perm import *
-from .water import *
-from .water_from_ec import *
-from .water_from_perm import *
-from .salinity import *
\ No newline at end of file
+# Submodules are imported on first access of their attributes, see utils.lazy
+from pedophysics.utils.lazy import lazy_package
+
+_submodules = ['air_perm', 'bulk_ec', 'bulk_ec_tc', 'bulk_ec_dc', 'bulk_ec_dc_tc', 'bulk_perm_inf', 'bulk_perm', 'frequency_ec',
+               'frequency_perm', 'particle_density', 'porosity', 'solid_ec', 'solid_perm', 'temperature', 'texture', 'water_ec',
+               'water_perm', 'water', 'water_from_ec', 'water_from_perm', 'salinity', 'water_ensemble', 'water_sites', 'immutable', 'plan']
+
+_attributes = {'AirPerm': 'air_perm', 'BulkEC': 'bulk_ec', 'BulkECTC': 'bulk_ec_tc', 'BulkECDC': 'bulk_ec_dc', 'BulkECDCTC': 'bulk_ec_dc_tc',
+               'BulkPermInf': 'bulk_perm_inf', 'BulkPerm': 'bulk_perm', 'FrequencyEC': 'frequency_ec', 'FrequencyPerm': 'frequency_perm',
+               'ParticleDensity': 'particle_density', 'Porosity': 'porosity', 'SolidEC': 'solid_ec', 'SolidPerm': 'solid_perm',
+               'Temperature': 'temperature', 'Texture': 'texture', 'WaterEC': 'water_ec', 'WaterPerm': 'water_perm', 'Water': 'water',
+               'WaterFromEC': 'water_from_ec', 'WaterFromPerm': 'water_from_perm', 'Salinity': 'salinity',
+               'WaterEnsemble': 'water_ensemble', 'ENSEMBLE_PROPERTIES': 'water_ensemble', 'WaterSites': 'water_sites',
+               'Prediction': 'immutable', 'predict_copy': 'immutable', 'predict_targets': 'immutable',
+               'Plan': 'plan', 'explain': 'plan'}
+
+__getattr__, __dir__ = lazy_package(__name__, _submodules, _attributes)
\ No newline at end of file
@@ -1,5 +1,7 @@
 import numpy as np
+from pedophysics.utils.precision import predict_call
 
+@predict_call
 def AirPerm(soil): 
     """
     Set missing values of soil.df.air_perm and return.
@@ -40,11 +42,10 @@ def AirPerm(soil):
     """
 
     # Check if any value of air_perm is missing
-    if (np.isnan(soil.df.air_perm)).any:
+    if (np.isnan(soil.df.air_perm)).any():
 
-        soil.info['air_perm'] = ["Set as 1.2 by default" if np.isnan(soil.df.air_perm[x]) or soil.info.air_perm[x] == "Set as 1.2 by default"
-                                     else soil.info.air_perm[x] for x in range(soil.n_states)]
-
-        soil.df['air_perm'] = [1.2 if np.isnan(soil.df.air_perm[x]) else soil.df.air_perm[x] for x in range(soil.n_states)]
+        missing = np.isnan(soil.df.air_perm.values)
+        soil.info['air_perm'] = np.where(missing, "Set as 1.2 by default", soil.info.air_perm.to_numpy(dtype=object))
+        soil.df['air_perm'] = np.where(missing, 1.2, soil.df.air_perm.values)
 
     return soil.df.air_perm.values
\ No newline at end of file
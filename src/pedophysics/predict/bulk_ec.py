@@ -3,7 +3,9 @@ import numpy as np
 from .bulk_ec_dc import BulkECDC
 
 from pedophysics.pedophysical_models.bulk_ec import LongmireSmithEC
+from pedophysics.utils.precision import predict_call
 
+@predict_call
 def BulkEC(soil):
     """ 
     Calculate missing values of soil.df.bulk_ec and return
@@ -160,7 +162,7 @@ def dc_to_non_dc(soil):
     # Check for missing values
     missing_bulk_ec_before = soil.df['bulk_ec'].isna()
     
-    soil.df["bulk_ec"] = [round(LongmireSmithEC(soil.df.bulk_ec_dc[x], soil.df.frequency_ec[x]), soil.roundn+3) 
+    soil.df["bulk_ec"] = [LongmireSmithEC(soil.df.bulk_ec_dc[x], soil.df.frequency_ec[x]) 
                           if np.isnan(soil.df.bulk_ec[x]) and soil.df.frequency_ec[x] >= 5 
                           else soil.df.bulk_ec[x] for x in range(soil.n_states)]
 
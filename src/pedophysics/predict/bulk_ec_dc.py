@@ -1,9 +1,14 @@
 import numpy as np
-from scipy.optimize import minimize
 
 from pedophysics.pedophysical_models.bulk_ec import LongmireSmithEC, SheetsHendrickx
+from pedophysics.utils.precision import predict_call
+from pedophysics.utils.missing import computable
+from pedophysics.utils.solvers import tabulated_inverse
+from pedophysics.utils.strategy import choose, provenance
+from pedophysics.utils.diagnostics import record
 
 
+@predict_call
 def BulkECDC(soil):
     """
     Compute missing values of soil.df.bulk_ec_dc and return
@@ -60,7 +65,7 @@ def tc_to_non_tc(soil):
     """
     Calculate missing values of soil.df.bulk_ec_dc based on soil.df.bulk_ec_dc_tc
 
-    This function iterates through soil states to update `bulk_ec_dc` in `soil.df` where it is NaN. For soil states
+    This function updates `bulk_ec_dc` in `soil.df` where it is NaN. For soil states
     at standard temperature (298.15K), `bulk_ec_dc` is set directly equal to `bulk_ec_dc_tc`. For other temperatures,
     it uses the `SheetsHendrickx` function within a minimization process to estimate `bulk_ec_dc` from `bulk_ec_dc_tc`.
 
@@ -86,40 +91,57 @@ def tc_to_non_tc(soil):
     External functions
     --------
     SheetsHendrickx : Calculate the soil bulk real electrical conductivity using the Sheets-Hendricks model and return
+    computable : Return the mask of the states where soil.df[attribute] is missing and all the inputs of its model are known
+    choose : Return the path of an inversion for n states according to the strategy of the running predict call
+    record : Record the diagnostics of an inversion in soil.diagnostics and return its solutions
 
     Notes
     -----
     - The function uses a minimization process to estimate `bulk_ec_dc` from `bulk_ec_dc_tc` for soil states
       not at standard temperature. The objective function aims to minimize the difference between the
       temperature-corrected value obtained using `SheetsHendrickx` and the given `bulk_ec_dc_tc`.
+      With the 'fast' or 'auto' strategy, `SheetsHendrickx` is inverted in closed form instead.
     - It directly sets `bulk_ec_dc` equal to `bulk_ec_dc_tc` for soil states at standard temperature (298.15K)
       without any correction.
+    - The diagnostics of each inverted state are recorded in soil.diagnostics['predict.bulk_ec_dc.tc_to_non_tc'].
     - Updates and calculations are logged in `soil.info` for traceability.
     """    
+    from scipy.optimize import minimize
 
     # Defining minimization function to obtain DC bulk EC 
     def objective_tc_to_non_tc(bulk_ec_dc, bulk_ec_dc_tc, temperature):
         return (SheetsHendrickx(bulk_ec_dc, temperature) - bulk_ec_dc_tc)**2
 
-    for i in range(soil.n_states):
-        if soil.df.temperature[i] == 298.15 and np.isnan(soil.df.bulk_ec_dc[i]):
-            soil.info.loc[i, 'bulk_ec_dc'] = str(soil.info.bulk_ec_dc[i]) + "--> Equal to soil.df.bulk_ec_dc_tc because temperature = 298.15 in predict.bulk_ec_dc.tc_to_non_tc"
-            soil.df.loc[i, 'bulk_ec_dc'] = soil.df.bulk_ec_dc_tc[i]
-
-        elif soil.df.temperature[i] != 298.15 and np.isnan(soil.df.bulk_ec_dc[i]):
+    missing_bulk_ec_dc_before = soil.df['bulk_ec_dc'].isna().values
+    standard = missing_bulk_ec_dc_before & (soil.df.temperature.values == 298.15)
+    bulk_ec_dc = soil.df.bulk_ec_dc.values.copy()
+    bulk_ec_dc[standard] = soil.df.bulk_ec_dc_tc.values[standard]
+
+    # Calculating bulk_ec_dc only in the states where it is missing and bulk_ec_dc_tc is known
+    states = computable(soil, 'bulk_ec_dc', ['bulk_ec_dc_tc', 'temperature'], ~standard)
+    path = choose(soil, 'bulk_ec_dc from bulk_ec_dc_tc', 'bulk_ec_dc', np.sum(states))
+    bulk_ec_dc_tc, temperature = soil.df.bulk_ec_dc_tc.values[states], soil.df.temperature.values[states]
+    if path == 'closed-form': # SheetsHendrickx is proportional to bulk_ec_dc
+        solution = np.clip(bulk_ec_dc_tc/SheetsHendrickx(1, temperature), 0, 1)
+        iterations, residual, status = 0, np.abs(SheetsHendrickx(solution, temperature) - bulk_ec_dc_tc), 0
+    else:
+        solution, iterations, residual, status = np.full((4, np.sum(states)), np.nan)
+        for j, i in enumerate(np.flatnonzero(states)):
             res = minimize(objective_tc_to_non_tc, 0.05, args=(soil.df.bulk_ec_dc_tc[i], soil.df.temperature[i]), bounds=[(0, 1)])
-
-            # Check for missing values
-            missing_bulk_ec_dc_before = soil.df.loc[i, 'bulk_ec_dc'].isna()
-            soil.df.loc[i, 'bulk_ec_dc'] = np.nan if np.isnan(res.fun) else round(res.x[0], soil.roundn+2)
-            
-            # Check for missing values
-            missing_bulk_ec_dc_after = soil.df.loc[i, 'bulk_ec_dc'].isna()
-
-            if missing_bulk_ec_dc_before and not missing_bulk_ec_dc_after:    
-                soil.info.loc[i, 'bulk_ec_dc'] = str(soil.info.bulk_ec_dc[i]) + "--> Calculated from soil.df.bulk_ec_dc_tc using SheetsHendrickx function in predict.bulk_ec_dc.tc_to_non_tc"
-            elif missing_bulk_ec_dc_before and missing_bulk_ec_dc_after:  
-                soil.info.loc[i, 'bulk_ec_dc'] = str(soil.info.bulk_ec_dc[i]) + "--> Provide bulk_ec_dc; otherwise, bulk_ec_dc_tc, and temperature"
+            solution[j], iterations[j], residual[j], status[j] = res.x[0], res.nit, np.sqrt(res.fun), res.status
+    bulk_ec_dc[states] = record(soil, 'predict.bulk_ec_dc.tc_to_non_tc', states, solution, residual, iterations, bulk_ec_dc_tc, (0, 1), status)
+    soil.df['bulk_ec_dc'] = bulk_ec_dc
+
+    missing_bulk_ec_dc_after = soil.df['bulk_ec_dc'].isna().values
+    soil.info['bulk_ec_dc'] = [str(soil.info.bulk_ec_dc[x]) + (
+            "--> Equal to soil.df.bulk_ec_dc_tc because temperature = 298.15 in predict.bulk_ec_dc.tc_to_non_tc"
+            if standard[x]
+            else "--> Calculated from soil.df.bulk_ec_dc_tc using SheetsHendrickx function in predict.bulk_ec_dc.tc_to_non_tc" + provenance(soil, path)
+            if not missing_bulk_ec_dc_after[x]
+            else "--> Provide bulk_ec_dc; otherwise, bulk_ec_dc_tc, and temperature")
+        if missing_bulk_ec_dc_before[x]
+        else soil.info.bulk_ec_dc[x]
+        for x in range(soil.n_states)]
 
 
 def non_dc_to_dc(soil):
@@ -128,6 +150,8 @@ def non_dc_to_dc(soil):
 
     Given the bulk EC values at various electromagnetic frequencies, this function uses the pedophysical model
     LongmireSmithEC to estimate the bulk EC of the soil at zero Hertz (direct current).
+    LongmireSmithEC is inverted by a minimization per state, or, with the 'fast' or 'auto' strategy, by interpolation
+    in a table of its values at each frequency (see utils.strategy.choose).
 
     Parameters
     ----------
@@ -147,40 +171,57 @@ def non_dc_to_dc(soil):
     Notes
     -----
     The function modifies the soil object in-place by updating the `info` attribute to include details about the 
-    conversion method used for each state.
+    conversion method used for each state. The diagnostics of each inverted state are recorded in
+    soil.diagnostics['predict.bulk_ec_dc.non_dc_to_dc'], and bulk_ec_dc is left missing where the solver fails or the tolerance is missed if soil.drop_unconverged is True.
 
     External Functions
     ------------------
     - LongmireSmithEC : Calculate the soil bulk real electrical conductivity using the Longmire-Smith model and return
+    - computable : Return the mask of the states where soil.df[attribute] is missing and all the inputs of its model are known
+    - choose : Return the path of an inversion for n states according to the strategy of the running predict call
+    - tabulated_inverse : Invert a monotonic increasing function by linear interpolation in a table of its values and return the solutions
+    - record : Record the diagnostics of an inversion in soil.diagnostics and return its solutions
     """
+    from scipy.optimize import minimize
 
     # Defining minimization function to obtain DC bulk EC 
     def objective_non_dc_to_dc(bulk_ec_dc, frequency_ec, bulk_ec):
         return (LongmireSmithEC(bulk_ec_dc, frequency_ec) - bulk_ec)**2
 
-    for i in range(soil.n_states):
-        if (soil.df.frequency_ec[i] <= 5) and np.isnan(soil.df.bulk_ec_dc[i]):
-
-            missing_bulk_ec_dc_before = np.isnan(soil.df.loc[i, 'bulk_ec_dc'])
-
-            soil.df.loc[i, 'bulk_ec_dc'] = soil.df.bulk_ec[i]
-            missing_bulk_ec_dc_after = np.isnan(soil.df.loc[i, 'bulk_ec_dc'])
-
-            if missing_bulk_ec_dc_before and not missing_bulk_ec_dc_after:
-                soil.info.loc[i, 'bulk_ec_dc'] = str(soil.info.bulk_ec_dc[i]) + "--> Equal to soil.df.bulk_ec in predict.bulk_ec_dc.non_dc_to_dc"
-            elif missing_bulk_ec_dc_before and missing_bulk_ec_dc_after:                                 
-                soil.info.loc[i, 'bulk_ec_dc'] = str(soil.info.bulk_ec_dc[i]) + "--> Provide bulk_ec_dc; otherwise, bulk_ec, and frequency_ec"
-
-
-        elif soil.df.frequency_ec[i] > 5 and np.isnan(soil.df.bulk_ec_dc[i]):
+    missing_bulk_ec_dc_before = soil.df['bulk_ec_dc'].isna().values
+    dc = missing_bulk_ec_dc_before & (soil.df.frequency_ec.values <= 5)
+    shifted = missing_bulk_ec_dc_before & (soil.df.frequency_ec.values > 5)
+    bulk_ec_dc = soil.df.bulk_ec_dc.values.copy()
+    bulk_ec_dc[dc] = soil.df.bulk_ec.values[dc]
+
+    # Calculating bulk_ec_dc only in the states where it is missing and bulk_ec is known
+    states = computable(soil, 'bulk_ec_dc', ['bulk_ec'], shifted)
+    frequencies = np.unique(soil.df.frequency_ec.values[states])
+    path = choose(soil, 'bulk_ec_dc from bulk_ec', 'bulk_ec_dc', np.sum(states), len(frequencies))
+    bulk_ec, frequency = soil.df.bulk_ec.values[states], soil.df.frequency_ec.values[states]
+    solution, iterations, residual, status = np.full((4, np.sum(states)), np.nan)
+    if path == 'tabulated': # One table of LongmireSmithEC per frequency, kept between predict calls
+        for frequency_ec in frequencies:
+            tabulated = frequency == frequency_ec
+            solution[tabulated] = tabulated_inverse(LongmireSmithEC, bulk_ec[tabulated], 0, 1, args=(float(frequency_ec),))
+        with np.errstate(divide='ignore', invalid='ignore'): # LongmireSmithEC is zero at a zero solution
+            iterations, residual, status = 0, np.abs(np.where(solution > 0, LongmireSmithEC(solution, frequency), 0) - bulk_ec), 0
+    else:
+        for j, i in enumerate(np.flatnonzero(states)):
             res = minimize(objective_non_dc_to_dc, 0.05, args=(soil.df.frequency_ec[i], soil.df.bulk_ec[i]), bounds=[(0, 1)])
-            
-            missing_bulk_ec_dc_before = np.isnan(soil.df.loc[i, 'bulk_ec_dc'])
-
-            soil.df.loc[i, 'bulk_ec_dc'] = np.nan if np.isnan(res.fun) else round(res.x[0], soil.roundn+2)
-            missing_bulk_ec_dc_after = np.isnan(soil.df.loc[i, 'bulk_ec_dc'])
-
-            if missing_bulk_ec_dc_before and not missing_bulk_ec_dc_after:
-                soil.info.loc[i, 'bulk_ec_dc'] = str(soil.info.bulk_ec_dc[i]) + "--> EM frequency shift from actual to zero Hz using LongmireSmithEC function in predict.bulk_ec_dc.non_dc_to_dc"
-            elif missing_bulk_ec_dc_before and missing_bulk_ec_dc_after:                                 
-                soil.info.loc[i, 'bulk_ec_dc'] = str(soil.info.bulk_ec_dc[i]) + "--> Provide bulk_ec_dc; otherwise, bulk_ec, and temperature"
+            solution[j], iterations[j], residual[j], status[j] = res.x[0], res.nit, np.sqrt(res.fun), res.status
+    bulk_ec_dc[states] = record(soil, 'predict.bulk_ec_dc.non_dc_to_dc', states, solution, residual, iterations, bulk_ec, (0, 1), status)
+    soil.df['bulk_ec_dc'] = bulk_ec_dc
+
+    missing_bulk_ec_dc_after = soil.df['bulk_ec_dc'].isna().values
+    soil.info['bulk_ec_dc'] = [str(soil.info.bulk_ec_dc[x]) + (
+            "--> Provide bulk_ec_dc; otherwise, bulk_ec, and frequency_ec"
+            if dc[x] and missing_bulk_ec_dc_after[x]
+            else "--> Equal to soil.df.bulk_ec in predict.bulk_ec_dc.non_dc_to_dc"
+            if dc[x]
+            else "--> Provide bulk_ec_dc; otherwise, bulk_ec, and temperature"
+            if missing_bulk_ec_dc_after[x]
+            else "--> EM frequency shift from actual to zero Hz using LongmireSmithEC function in predict.bulk_ec_dc.non_dc_to_dc" + provenance(soil, path))
+        if dc[x] or shifted[x]
+        else soil.info.bulk_ec_dc[x]
+        for x in range(soil.n_states)]
@@ -1,5 +1,4 @@
 import numpy as np
-from scipy.optimize import minimize
 
 from .frequency_ec import *
 from .solid_ec import *
@@ -10,8 +9,10 @@ from .porosity import Porosity
 
 from pedophysics.pedophysical_models.bulk_ec import Fu, SheetsHendrickx, WunderlichEC
 from pedophysics.utils.stats import R2_score
+from pedophysics.utils.precision import predict_call
 
 
+@predict_call
 def BulkECDCTC(soil):
     """ 
     Compute missing values of soil.df.bulk_ec_dc_tc and return
@@ -278,26 +279,35 @@ def fitting(soil):
     -----
     This function modifies the soil object in-place by updating the `df` and `info` dataframes.
     The function either estimates or uses the known Lw parameter for the WunderlichEC model and 
-    fits the model to the calibration data.
+    fits the model to the calibration data. The fit is stored in soil.fits and reused by the next calls 
+    with unchanged calibration states (see Soil.update).
 
     External Functions
     ------------------
     WunderlichEC: Calculate the soil bulk real electrical conductivity using the Wunderlich model and return
     WaterEC: Calculate missing values of soil.df.water based on soil.df.bulk_ec_dc_tc 
     """
+    from scipy.optimize import minimize
     from .water_ec import WaterEC # Lazy import to avoid circular dependency
 
     WaterEC(soil)                    
 
+    # Fit of a previous call, kept by Soil.update and Soil.append_states while the calibration states are unchanged
+    fit = soil.fits.get('predict.bulk_ec_dc_tc.fitting')
+    previous_Lw = soil.Lw
+
     # Defining model parameters
-    valids = ~np.isnan(soil.df.water) & ~np.isnan(soil.df.bulk_ec_dc_tc) # States where calibration data are
-    water_init = min(soil.df.water[valids])
-    bulk_ec_dc_tc_init = min(soil.df.bulk_ec_dc_tc[valids])
-    water_final = max(soil.df.water[valids])
-    water_range = [round(water_init - (water_final-water_init)/soil.range_ratio, soil.roundn), 
-                  round(water_final + (water_final-water_init)/soil.range_ratio, soil.roundn)]
-    if water_range[0] < 0:
-        water_range[0] = 0
+    if fit is None:
+        valids = ~np.isnan(soil.df.water) & ~np.isnan(soil.df.bulk_ec_dc_tc) # States where calibration data are
+        water_init = min(soil.df.water[valids])
+        bulk_ec_dc_tc_init = min(soil.df.bulk_ec_dc_tc[valids])
+        water_final = max(soil.df.water[valids])
+        water_range = [round(water_init - (water_final-water_init)/soil.range_ratio, soil.roundn), 
+                      round(water_final + (water_final-water_init)/soil.range_ratio, soil.roundn)]
+        if water_range[0] < 0:
+            water_range[0] = 0
+    else:
+        water_init, bulk_ec_dc_tc_init, water_range, soil.Lw = fit['water_init'], fit['bulk_ec_dc_tc_init'], fit['water_range'], fit['Lw']
         
     # Obtain Lw attribute if unknown
     if np.isnan(soil.Lw):
@@ -317,11 +327,16 @@ def fitting(soil):
         if not isinstance(soil.Lw, np.floating):
             soil.Lw = soil.Lw[0]
         # Calculating the R2 score of the model fitting
-        R2 = round(R2_score(soil.df.bulk_ec_dc_tc, WunderlichEC(soil.df.water, bulk_ec_dc_tc_init, water_init, soil.df.water_ec, soil.Lw)), soil.roundn)
+        if fit is None:
+            R2 = round(R2_score(soil.df.bulk_ec_dc_tc, WunderlichEC(soil.df.water, bulk_ec_dc_tc_init, water_init, soil.df.water_ec, soil.Lw)), soil.roundn)
+            soil.fits['predict.bulk_ec_dc_tc.fitting'] = {'water_init': water_init, 'bulk_ec_dc_tc_init': bulk_ec_dc_tc_init, 'water_range': water_range, 
+                                                          'Lw': soil.Lw, 'R2': R2, 'previous': {'Lw': previous_Lw}}
+        else:
+            R2 = fit['R2']
 
         missing_bulk_ec_dc_tc_before = soil.df['bulk_ec_dc_tc'].isna() 
 
-        soil.df['bulk_ec_dc_tc'] = [round(WunderlichEC(soil.df.water[x], bulk_ec_dc_tc_init, water_init, soil.df.water_ec[x], soil.Lw), soil.roundn+3) 
+        soil.df['bulk_ec_dc_tc'] = [WunderlichEC(soil.df.water[x], bulk_ec_dc_tc_init, water_init, soil.df.water_ec[x], soil.Lw) 
                                     if np.isnan(soil.df.bulk_ec_dc_tc[x]) and (min(water_range) <= soil.water[x] <= max(water_range)) 
                                     else soil.df.bulk_ec_dc_tc[x] for x in range(soil.n_states)]
         
@@ -389,7 +404,7 @@ def non_fitting(soil):
  
     missing_bulk_ec_dc_tc_before = soil.df['bulk_ec_dc_tc'].isna() 
 
-    soil.df['bulk_ec_dc_tc'] = [round(Fu(soil.df.water[x], soil.df.clay[x], soil.df.porosity[x], soil.df.water_ec[x], soil.df.solid_ec[x], soil.df.dry_ec[x], soil.df.sat_ec[x]), soil.roundn+3) 
+    soil.df['bulk_ec_dc_tc'] = [Fu(soil.df.water[x], soil.df.clay[x], soil.df.porosity[x], soil.df.water_ec[x], soil.df.solid_ec[x], soil.df.dry_ec[x], soil.df.sat_ec[x]) 
                              if np.isnan(soil.df.bulk_ec_dc_tc[x]) 
                              else soil.df.bulk_ec_dc_tc[x] for x in range(soil.n_states)]
     
@@ -3,7 +3,9 @@ import numpy as np
 from .bulk_ec import BulkEC
 
 from pedophysics.pedophysical_models.bulk_ec import SheetsHendrickx
+from pedophysics.utils.precision import predict_call
 
+@predict_call
 def BulkECTC(soil):
     """
     Calculate missing values of soil.df.bulk_ec_tc and return
@@ -1,8 +1,10 @@
 import numpy as np
-from scipy.optimize import minimize
+import pandas as pd
 
 from pedophysics.pedophysical_models.bulk_perm import WunderlichP, LongmireSmithP, LR, LR_W, LR_MV
 from pedophysics.utils.stats import R2_score
+from pedophysics.utils.precision import predict_call
+from pedophysics.utils.validity import check
 
 from .water_perm import *
 from .frequency_perm import *
@@ -14,13 +16,15 @@ from .solid_perm import *
 from .temperature import *
 from .texture import *
 
+@predict_call
 def BulkPerm(soil):
     """ 
     Computes missing values of soil.df.bulk_perm and return.
 
     Uses the given electromagnetic frequency to determine the method to estimate bulk permittivity. 
-    If no frequency is provided or all frequencies are the same, different methods or conditions 
-    are invoked.
+    The soil states sharing the same frequency are fitted together when calibration data are available, 
+    and the remaining states are processed in one pass per frequency band, so datasets mixing instruments 
+    are handled as single-instrument ones.
 
     Parameters
     ----------
@@ -44,11 +48,13 @@ def BulkPerm(soil):
     -----
     The function modifies the soil object in-place by updating the `df` and `info` attributes based 
     on the given conditions and returns the updated values of bulk permittivity.
+    If soil.Lw is unknown, it is fitted for each frequency and soil.Lw holds the value of the last fitted frequency.
 
     External Functions
     ------------------
     - FrequencyPerm : Set missing values of soil.df.frequency_perm and return 
-    - fixed_freq, changing_freq : Functions invoked based on the condition of the EM frequency provided.
+    - fixed_freq : Calculate missing values of soil.df.bulk_perm for the states sharing one frequency using a fitting approach
+    - non_fitting : Calculate missing values of soil.df.bulk_perm using a non fitting approach.
 
     Example
     -------
@@ -63,28 +69,33 @@ def BulkPerm(soil):
 
     if (np.isnan(soil.df.bulk_perm)).any():  # Go over if any value is missing        
         FrequencyPerm(soil)
+        frequency_perm = soil.df.frequency_perm.values
 
         # Condition to ask for frequency data
-        if (np.isnan(soil.df.frequency_perm)).all():
+        if (np.isnan(frequency_perm)).all():
             soil.info['bulk_perm'] = [str(soil.info.bulk_perm[x]) + "--> Provide  frequency_perm" for x in range(soil.n_states)]
 
-        # Condition for fixed EM frequency
-        elif np.all(soil.df.frequency_perm == soil.df.frequency_perm[0]):
-            fixed_freq(soil)
-
-        # Condition for changing EM frequency
         else:
-            changing_freq(soil)
+            Lw = soil.Lw
+
+            # Fitting approach for each group of states sharing the same EM frequency
+            for freq in np.unique(frequency_perm[~np.isnan(frequency_perm)]):
+                soil.Lw = Lw # Unless given, Lw is fitted for each frequency
+                fixed_freq(soil, frequency_perm == freq)
+
+            # Condition for non-fitting approach
+            if np.any(np.isnan(soil.df.bulk_perm.values) & (frequency_perm >= 5) & (frequency_perm <= 30e9)):
+                non_fitting(soil)
 
     return soil.df.bulk_perm.values
 
 
-def fixed_freq(soil):
+def fixed_freq(soil, states=None):
     """ 
-    Decide between fitting and non-fitting approaches.
+    Calculate missing values of soil.df.bulk_perm for the states sharing one frequency using a fitting approach
 
-    Based on the given soil state data, chooses between two methodologies - fitting or non-fitting 
-    to determine the bulk permittivity values for a fixed frequency.
+    Applies the fitting approach to a group of soil states measured at the same EM frequency 
+    if there are at least three states of the group with known water and bulk permittivity.
 
     Parameters
     ----------
@@ -96,6 +107,8 @@ def fixed_freq(soil):
             Includes: bulk_perm, water, and frequency_perm.
         - n_states : int
             Number of soil states
+    states : array-like of bool, optional
+        Soil states of the group. Default is all states.
 
     Returns
     -------
@@ -108,19 +121,15 @@ def fixed_freq(soil):
     External Functions
     ------------------
     - fitting : Calculate missing values of soil.df.bulk_perm using a fitting approach
-    - non_fitting : Calculate missing values of soil.df.bulk_perm using a non fitting approach.
     """
+    states = np.ones(soil.n_states, dtype=bool) if states is None else np.asarray(states)
 
     # Condition for fitting approach
-    if sum(not np.isnan(soil.water[x]) and not np.isnan(soil.bulk_perm[x]) for x in range(soil.n_states)) >= 3 :
-        fitting(soil)
-
-    # Condition for non-fitting approach
-    if any(np.isnan(soil.df.bulk_perm[x]) and not np.isnan(soil.df.water[x]) and soil.df.frequency_perm[x] >= 5 and soil.df.frequency_perm[x] <= 30e9 for x in range(soil.n_states) ):
-        non_fitting(soil)
+    if np.sum(states & ~np.isnan(soil.df.water.values) & ~np.isnan(soil.df.bulk_perm.values)) >= 3:
+        fitting(soil, states)
 
         
-def fitting(soil):
+def fitting(soil, states=None):
     """ 
     Calculate missing values of soil.df.bulk_perm using a fitting approach
 
@@ -146,6 +155,8 @@ def fitting(soil):
             Ratio to extend the domain of the regression by fitting approach.
         - n_states : int
             Number of soil states
+    states : array-like of bool, optional
+        Soil states used for calibration and prediction. Default is all states.
 
     Returns
     -------
@@ -155,6 +166,7 @@ def fitting(soil):
     Notes
     -----
     The function modifies the soil object in-place by updating the `df` and `info` attributes based on the fitting results.
+    The fit is stored in soil.fits and reused by the next calls with unchanged calibration states (see Soil.update).
     
     External Functions
     ------------------
@@ -162,19 +174,30 @@ def fitting(soil):
     - WaterPerm : Calculate or set missing values of soil.df.water_perm and return
     - WunderlichP : Calculate the soil bulk real relative dielectric permittivity using the Wunderlich model and return
     """
+    from scipy.optimize import minimize
 
     Temperature(soil)
     WaterPerm(soil)                      
 
+    states = np.ones(soil.n_states, dtype=bool) if states is None else np.asarray(states)
+
+    # Fit of a previous call, kept by Soil.update and Soil.append_states while the calibration states are unchanged
+    key = 'predict.bulk_perm.fitting frequency_perm=' + str(np.unique(soil.df.frequency_perm.values[states]).tolist())
+    fit = soil.fits.get(key)
+    previous_Lw = soil.Lw
+
     # Defining model parameters
-    valids = ~np.isnan(soil.df.water) & ~np.isnan(soil.df.bulk_perm) # States where calibration data are
-    water_init = min(soil.df.water[valids])
-    bulk_perm_init = min(soil.df.bulk_perm[valids])
-    water_final = max(soil.df.water[valids])
-    water_range = [round(water_init - (water_final-water_init)/soil.range_ratio, soil.roundn), 
-                  round(water_final + (water_final-water_init)/soil.range_ratio, soil.roundn)]
-    if water_range[0] < 0:
-        water_range[0] = 0
+    if fit is None:
+        valids = ~np.isnan(soil.df.water) & ~np.isnan(soil.df.bulk_perm) & states # States where calibration data are
+        water_init = min(soil.df.water[valids])
+        bulk_perm_init = min(soil.df.bulk_perm[valids])
+        water_final = max(soil.df.water[valids])
+        water_range = [round(water_init - (water_final-water_init)/soil.range_ratio, soil.roundn), 
+                      round(water_final + (water_final-water_init)/soil.range_ratio, soil.roundn)]
+        if water_range[0] < 0:
+            water_range[0] = 0
+    else:
+        water_init, bulk_perm_init, water_range, soil.Lw = fit['water_init'], fit['bulk_perm_init'], fit['water_range'], fit['Lw']
 
     # Obtain Lw attribute if unknown
     if np.isnan(soil.Lw):
@@ -194,13 +217,18 @@ def fitting(soil):
         if not isinstance(soil.Lw, np.floating):
             soil.Lw = soil.Lw[0]
         # Calculating the R2 score of the model fitting
-        R2 = round(R2_score(soil.df.bulk_perm, WunderlichP(soil.df.water, bulk_perm_init, water_init, soil.df.water_perm, soil.Lw)), soil.roundn)
+        if fit is None:
+            R2 = round(R2_score(soil.df.bulk_perm.values[states], WunderlichP(soil.df.water.values[states], bulk_perm_init, water_init, soil.df.water_perm.values[states], soil.Lw)), soil.roundn)
+            soil.fits[key] = {'water_init': water_init, 'bulk_perm_init': bulk_perm_init, 'water_range': water_range, 
+                              'Lw': soil.Lw, 'R2': R2, 'previous': {'Lw': previous_Lw}}
+        else:
+            R2 = fit['R2']
 
         # Check for missing values
         missing_bulk_perm_before = soil.df['bulk_perm'].isna()
 
-        soil.df['bulk_perm'] = [round(WunderlichP(soil.df.water[x], bulk_perm_init, water_init, soil.df.water_perm[x], soil.Lw), soil.roundn) 
-                              if (min(water_range) <= soil.water[x] <= max(water_range)) and np.isnan(soil.df.bulk_perm[x]) 
+        soil.df['bulk_perm'] = [WunderlichP(soil.df.water[x], bulk_perm_init, water_init, soil.df.water_perm[x], soil.Lw) 
+                              if states[x] and (min(water_range) <= soil.water[x] <= max(water_range)) and np.isnan(soil.df.bulk_perm[x]) 
                               else soil.df.bulk_perm[x] for x in range(soil.n_states)]
 
         missing_bulk_perm_after = soil.df['bulk_perm'].isna()
@@ -212,7 +240,7 @@ def fitting(soil):
                 else "--> Provide bulk_perm; otherwise, water. Regression valid for water values between"+str(water_range)
                 if missing_bulk_perm_before[x] and missing_bulk_perm_after[x]
                 else "")
-            if missing_bulk_perm_before[x]
+            if missing_bulk_perm_before[x] and states[x]
             else soil.info.bulk_perm[x]
             for x in range(soil.n_states)]
 
@@ -222,7 +250,8 @@ def non_fitting(soil):
     Calculate missing values of soil.df.bulk_perm using a non fitting approach
 
     This function determines the bulk permittivity of soil based on given conditions and known empirical relationships. 
-    Depending on the electromagnetic (EM) frequency range provided, various functions are used.
+    Depending on the electromagnetic (EM) frequency range of each state, various functions are used.
+    The states of each frequency band are evaluated together, so states measured with different instruments are processed in the same call.
 
     Parameters
     ----------
@@ -255,24 +284,68 @@ def non_fitting(soil):
     - WaterPerm : Calculate or set missing values of soil.df.water_perm and return
     - Texture : Calculate missing values of soil.df.sand, soil.df.silt, and soil.df.clay and return
     - LongmireSmithP : Calculate the soil bulk real relative dielectric permittivity using the Longmire-Smith model and return
+    - check : Flag the states outside the validity domain of a model in soil.flags, warn once about the newly flagged ones and return them
     - LR_MV : Calculate the soil volumetric water content using the Lichtenecker and Rother model modified by Mendoza-Veirana and return
     - LR : Calculate the soil volumetric water content using the Lichtenecker and Rother model.
     - LR_W : Calculate the soil volumetric water content using the Lichtenecker and Rother model modified by Wunderlich and return
     """
+    frequency_perm = soil.df.frequency_perm.values
+    em_freq = (frequency_perm >= 30e6) & (frequency_perm <= 30e9)
 
-    # Condition for lowest EM frequency
-    if any(np.isnan(soil.df.bulk_perm[x]) and soil.df.frequency_perm[x] >= 5 and soil.df.frequency_perm[x] < 30e6 for x in range(soil.n_states)):
+    # Condition for EM frequency of common moisture sensors and GPR
+    if np.any(np.isnan(soil.df.bulk_perm.values) & ~np.isnan(soil.df.water.values) & em_freq): 
+        Temperature(soil)
+        Porosity(soil)                      
+        AirPerm(soil)                   
+        SolidPerm(soil)                  
+        WaterPerm(soil)               
+        Texture(soil)                    
+
+        soil.alpha = np.where(np.isnan(soil.alpha), 0.5, soil.alpha)
+        alpha = np.broadcast_to(soil.alpha, soil.n_states)
+
+        # Frequency bands, each evaluated in one pass over its states
+        bands = [((frequency_perm >= 30e6) & (frequency_perm < 100e6), LR_MV, lambda m: soil.df.CEC.values[m],
+                  "--> Calculated using LR_MV (reported R2=0.93) function in predict.bulk_perm.non_fitting",
+                  "--> Provide bulk_perm; otherwise, water, porosity, and CEC"),
+                 ((frequency_perm >= 100e6) & (frequency_perm < 200e6), LR, lambda m: alpha[m],
+                  "--> Calculated using LR function (reported RMSE=0.032) in predict.bulk_perm.non_fitting",
+                  "--> Provide bulk_perm; otherwise, water and porosity"),
+                 ((frequency_perm >= 200e6) & (frequency_perm <= 30e9), LR_W, lambda m: soil.df.clay.values[m],
+                  "--> Calculated using LR_W function in predict.bulk_perm.non_fitting",
+                  "--> Provide bulk_perm; otherwise, water, porosity, and clay")]
+
+        missing_bulk_perm = soil.df['bulk_perm'].isna().values & ~np.isnan(soil.df.water.values)
+        bulk_perm = soil.df.bulk_perm.values.copy()
+        info = soil.info['bulk_perm'].to_numpy(dtype=object).copy()
+
+        for band, model, extra_arg, calculated, provide in bands:
+            states = band & missing_bulk_perm
+            if states.any():
+                bulk_perm[states] = model(soil.df.water.values[states], soil.df.porosity.values[states], soil.df.air_perm.values[states], 
+                                                   soil.df.solid_perm.values[states], soil.df.water_perm.values[states], extra_arg(states))
+                info[states] = [str(i) + (provide if np.isnan(b) else calculated) for i, b in zip(info[states], bulk_perm[states])]
+
+        soil.df['bulk_perm'] = bulk_perm
+        soil.info['bulk_perm'] = info
+
+    # Condition for lowest EM frequency, and for higher frequencies where the band models left bulk_perm missing
+    low_freq = (frequency_perm >= 5) & (frequency_perm < 30e6)
+    from_ec = np.isnan(soil.df.bulk_perm.values) & (low_freq | em_freq)
+    if from_ec.any():
 
         BulkPermInf(soil)              
         BulkECDC(soil)
-        
-        missing_bulk_perm_before = soil.df['bulk_perm'].isna()
 
-        soil.df['bulk_perm'] = [round(LongmireSmithP(soil.df.bulk_ec_dc[x], soil.df.bulk_perm_inf[x], soil.df.frequency_perm[x]), soil.roundn) 
-                                if np.isnan(soil.df.bulk_perm[x]) 
-                                else soil.df.bulk_perm[x] for x in range(soil.n_states)]
+        missing_bulk_perm_before = pd.Series(from_ec)
+
+        bulk_perm = soil.df.bulk_perm.values.copy()
+        with np.errstate(divide='ignore'): # Zero bulk_ec_dc results in bulk_perm_inf
+            bulk_perm[from_ec] = LongmireSmithP(soil.df.bulk_ec_dc.values[from_ec], soil.df.bulk_perm_inf.values[from_ec], frequency_perm[from_ec])
+        soil.df['bulk_perm'] = bulk_perm
 
         missing_bulk_perm_after = soil.df['bulk_perm'].isna()
+        check(soil, 'LongmireSmithP', from_ec & ~missing_bulk_perm_after.values)
 
         # Saving calculated bulk_perm and its info        
         soil.info['bulk_perm'] = [str(soil.info.bulk_perm[x]) + (
@@ -284,151 +357,3 @@ def non_fitting(soil):
             if missing_bulk_perm_before[x]
             else soil.info.bulk_perm[x]
             for x in range(soil.n_states)]
-        
-    # Condition for EM frequency of common moisture sensors and GPR
-    elif (np.isnan(soil.df.bulk_perm)).any() & ((soil.df.frequency_perm >= 30e6) & (soil.df.frequency_perm <= 30e9)).all(): 
-        Temperature(soil)
-        Porosity(soil)                      
-        AirPerm(soil)                   
-        SolidPerm(soil)                  
-        WaterPerm(soil)               
-        Texture(soil)                    
-
-        if ((soil.df.frequency_perm >= 30e6) & (soil.df.frequency_perm < 100e6)).all():
-            
-            missing_bulk_perm_before = soil.df['bulk_perm'].isna()
-            soil.df['bulk_perm'] = [np.round(LR_MV(soil.df.water[x], soil.df.porosity[x], soil.df.air_perm[x], soil.df.solid_perm[x], soil.df.water_perm[x], soil.df.CEC[x]), soil.roundn) 
-                                    if np.isnan(soil.df.bulk_perm[x]) 
-                                    else soil.df.bulk_perm[x] for x in range(soil.n_states)]
-            
-            missing_bulk_perm_after = soil.df['bulk_perm'].isna()
-            
-            soil.info['bulk_perm'] = [str(soil.info.bulk_perm[x]) + (
-                    "--> Calculated using LR_MV (reported R2=0.93) function in predict.bulk_perm.non_fitting" 
-                    if missing_bulk_perm_before[x] and not missing_bulk_perm_after[x]
-                    else "--> Provide bulk_perm; otherwise, water, porosity, and CEC" 
-                    if missing_bulk_perm_before[x] and missing_bulk_perm_after[x]
-                    else "")
-                if missing_bulk_perm_before[x]
-                else soil.info.bulk_perm[x]
-                for x in range(soil.n_states)]
-            
-
-        elif ((soil.df.frequency_perm >= 100e6) & (soil.df.frequency_perm < 200e6)).all():
-
-            if np.isnan(soil.alpha): soil.alpha = 0.5 
-            
-            missing_bulk_perm_before = soil.df['bulk_perm'].isna()
-            soil.df['bulk_perm'] = [np.round(LR(soil.df.water[x], soil.df.porosity[x], soil.df.air_perm[x], soil.df.solid_perm[x], soil.df.water_perm[x], soil.alpha[x]), soil.roundn) 
-                                    if np.isnan(soil.df.bulk_perm[x]) 
-                                    else soil.df.bulk_perm[x] for x in range(soil.n_states)]
-            missing_bulk_perm_after = soil.df['bulk_perm'].isna()
-            
-            soil.info['bulk_perm'] = [str(soil.info.bulk_perm[x]) + (
-                    "--> Calculated using LR function (reported RMSE=0.032) in predict.bulk_perm.non_fitting" 
-                    if missing_bulk_perm_before[x] and not missing_bulk_perm_after[x]
-                    else "--> Provide bulk_perm; otherwise, water and porosity" 
-                    if missing_bulk_perm_before[x] and missing_bulk_perm_after[x]
-                    else "")
-                if missing_bulk_perm_before[x]
-                else soil.info.bulk_perm[x]
-                for x in range(soil.n_states)]
-            
-        elif ((soil.df.frequency_perm >= 200e6) & (soil.df.frequency_perm <= 30e9)).all(): 
-            
-            missing_bulk_perm_before = soil.df['bulk_perm'].isna()
-
-            soil.df['bulk_perm'] = [np.round(LR_W(soil.df.water[x], soil.df.porosity[x], soil.df.air_perm[x], soil.df.solid_perm[x], soil.df.water_perm[x], soil.df.clay[x]), soil.roundn) 
-                                    if np.isnan(soil.df.bulk_perm[x]) 
-                                    else soil.df.bulk_perm[x] for x in range(soil.n_states)] 
-            
-            missing_bulk_perm_after = soil.df['bulk_perm'].isna()
-            
-            soil.info['bulk_perm'] = [str(soil.info.bulk_perm[x]) + (
-                    "--> Calculated using LR_W function in predict.bulk_perm.non_fitting" 
-                    if missing_bulk_perm_before[x] and not missing_bulk_perm_after[x]
-                    else "--> Provide bulk_perm; otherwise, water, porosity, and clay" 
-                    if missing_bulk_perm_before[x] and missing_bulk_perm_after[x]
-                    else "")
-                if missing_bulk_perm_before[x]
-                else soil.info.bulk_perm[x]
-                for x in range(soil.n_states)]
-
-
-def changing_freq(soil):
-    """ 
-    calculate missing values of soil.df.bulk_perm based on soil.df.bulk_ec_dc
-
-    This function determines the bulk permittivity of soil based on given conditions and the LongmireSmithP pedophysical model. 
-    It specifically addresses cases where the electromagnetic (EM) frequency is not constant.
-
-    Parameters
-    ----------
-    soil : object
-        A custom soil object containing:
-
-        - df : DataFrame
-            Data Frame containing the quantitative information of all soil array-like attributes for each state.
-            Includes: bulk_perm, frequency_perm, bulk_ec_dc, clay, sand, and bulk_perm_inf.
-        - roundn : int
-            Number of decimal places to round results.
-
-    Returns
-    -------
-    None
-        The function directly modifies the `soil` object's `df` and `info` attributes and does not return any value.
-        
-    Notes
-    -----
-    The function modifies the soil object in-place by updating the `df` and `info` attributes.
-
-    External Functions
-    ------------------
-    - BulkPermInf : Set missing values of soil.df.bulk_perm_inf and return
-    - BulkECDC : Compute missing values of soil.df.bulk_ec_dc and return
-    - LongmireSmithP : Calculate the soil bulk real relative dielectric permittivity using the Wunderlich model and return
-    """
-    Texture(soil)
-    BulkPermInf(soil)             
-    BulkECDC(soil)
-
-    def warn_states(soil):
-        # Warn about applying LongmireSmithP function to non-validated soil conditions
-        mask_invalid = (
-            (soil.df.frequency_perm > 200e6) &
-            (soil.df.water > 0.22) &
-            (soil.df.porosity > 0.255) &
-            (soil.df.water_ec > 3.3) | (soil.df.water_ec < 0.0016) &
-            (soil.df.clay > 10) | (soil.df.sand < 85) &
-            np.isnan(soil.df.bulk_perm)
-        )
-
-        # Find the indices of the invalid states
-        states_warns = np.where(mask_invalid)[0]
-
-        if states_warns.size > 0:
-            warnings.warn(
-                f"LongmireSmithP function is applied to soil states {states_warns} with conditions "
-                f"frequency_perm > 200e6, and water > 0.22, and porosity > 0.255, and water_ec > 3.3 or water_ec < 0.0016, and clay > 10 or sand < 85"
-                f", for which the validity of such model is uncertain."
-                )   
-
-    warn_states(soil)
-    missing_bulk_perm_before = soil.df['bulk_perm'].isna()
-    
-    soil.df['bulk_perm'] = [round(LongmireSmithP(soil.df.bulk_ec_dc[x], soil.df.bulk_perm_inf[x], soil.df.frequency_perm[x]), soil.roundn) 
-                            if (np.isnan(soil.df.bulk_perm[x])) 
-                            else soil.df.bulk_perm[x] 
-                            for x in range(soil.n_states)]
-    
-    missing_bulk_perm_after = soil.df['bulk_perm'].isna()
-    
-    soil.info['bulk_perm'] = [str(soil.info.bulk_perm[x]) + (
-            "--> Calculated using LongmireSmithP function in predict.bulk_perm.changing_freq" 
-            if missing_bulk_perm_before[x] and not missing_bulk_perm_after[x]
-            else "--> Provide bulk_perm; otherwise, bulk_ec_dc and frequency_perm" 
-            if missing_bulk_perm_before[x] and missing_bulk_perm_after[x]
-            else "")
-        if missing_bulk_perm_before[x]
-        else soil.info.bulk_perm[x]
-        for x in range(soil.n_states)]
\ No newline at end of file
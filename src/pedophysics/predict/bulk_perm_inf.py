@@ -1,5 +1,7 @@
 import numpy as np
+from pedophysics.utils.precision import predict_call
 
+@predict_call
 def BulkPermInf(soil):
     """
     Set missing values of soil.df.bulk_perm_inf and return.
@@ -42,9 +44,8 @@ def BulkPermInf(soil):
     # Check if any value of bulk_perm_inf is missing
     if (np.isnan(soil.df.bulk_perm_inf)).any():
 
-        soil.info['bulk_perm_inf'] = ["Set as 5 by default" if np.isnan(soil.df.bulk_perm_inf[x]) or soil.info.bulk_perm_inf[x] == "Set as 5 by default"
-                                     else soil.info.bulk_perm_inf[x] for x in range(soil.n_states)]
-
-        soil.df['bulk_perm_inf'] = [5 if np.isnan(soil.df.bulk_perm_inf[x]) else soil.df.bulk_perm_inf[x] for x in range(soil.n_states)]
+        missing = np.isnan(soil.df.bulk_perm_inf.values)
+        soil.info['bulk_perm_inf'] = np.where(missing, "Set as 5 by default", soil.info.bulk_perm_inf.to_numpy(dtype=object))
+        soil.df['bulk_perm_inf'] = np.where(missing, 5, soil.df.bulk_perm_inf.values)
 
     return soil.df.bulk_perm_inf.values
\ No newline at end of file
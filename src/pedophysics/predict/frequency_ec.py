@@ -1,6 +1,8 @@
 import numpy as np
 from pedophysics import instruments
+from pedophysics.utils.precision import predict_call
 
+@predict_call
 def FrequencyEC(soil): 
     """
     Return and set missing values of the soil.df.frequency_ec attribute.
@@ -46,9 +48,8 @@ def FrequencyEC(soil):
     if (np.isnan(soil.df.frequency_ec)).any():
         instruments.Inst2FreqEC(soil)
 
-        soil.info['frequency_ec'] = ["Set as 0 Hz (direct current) by default" if np.isnan(soil.df.frequency_ec[x]) or soil.info.frequency_ec[x] == "Set as 0 Hz (direct current) by default"
-                                     else soil.info.frequency_ec[x] for x in range(soil.n_states)]
-        
-        soil.df['frequency_ec'] = [0 if np.isnan(soil.df.frequency_ec[x]) else soil.df.frequency_ec[x] for x in range(soil.n_states)]
+        missing = np.isnan(soil.df.frequency_ec.values)
+        soil.info['frequency_ec'] = np.where(missing, "Set as 0 Hz (direct current) by default", soil.info.frequency_ec.to_numpy(dtype=object))
+        soil.df['frequency_ec'] = np.where(missing, 0, soil.df.frequency_ec.values)
 
     return soil.df.frequency_ec.values
\ No newline at end of file
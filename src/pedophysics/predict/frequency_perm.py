@@ -1,6 +1,8 @@
 import numpy as np
 from pedophysics import instruments
+from pedophysics.utils.precision import predict_call
 
+@predict_call
 def FrequencyPerm(soil): 
     """
     Set missing values of soil.df.frequency_perm and return 
@@ -0,0 +1,80 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Result of a predict function called on a copy of a soil: its returned values and the completed copy
+Prediction = namedtuple('Prediction', ['values', 'soil'])
+
+
+def predict_copy(soil, target, *args, **kwargs):
+    """
+    Call a predict function on a copy of the soil and return its values and the completed copy, leaving the soil unchanged
+
+    Predict functions write their results, provenance, fits and fitted single-value attributes (e.g. Lw, E, F) into
+    the soil they are given. Called through predict_copy, they write into a copy (see Soil.copy) instead, so that
+    the same soil can be shared by threads and predicted concurrently.
+
+    Parameters
+    ----------
+    soil : object
+        Soil object, which is not modified.
+    target : callable or str
+        Predict function, or its name in pedophysics.predict (e.g. 'Water').
+    *args, **kwargs :
+        Other arguments of the predict function.
+
+    Returns
+    -------
+    Prediction
+        Named tuple of the values returned by the predict function and the completed copy of the soil.
+
+    Example
+    -------
+    >>> sample = Soil(bulk_perm = [7, 10, 14], frequency_perm = 1e9, porosity = 0.4, clay = 20)
+    >>> predict_copy(sample, 'Water').values
+    array([0.106, 0.165, 0.234])
+    >>> sample.df.water.values
+    array([nan, nan, nan])
+    """
+    if isinstance(target, str):
+        from pedophysics import predict
+        target = getattr(predict, target)
+    copy = soil.copy()
+    return Prediction(target(copy, *args, **kwargs), copy)
+
+
+def predict_targets(soil, targets, n_jobs=None):
+    """
+    Call independent predict functions on copies of the soil in a pool of threads and return their predictions, leaving the soil unchanged
+
+    Each target is predicted on its own copy of the soil, as if called on its own, so that e.g. BulkPerm and BulkEC
+    of the same states overlap in the numpy and scipy calls that release the GIL.
+
+    Parameters
+    ----------
+    soil : object
+        Soil object, which is not modified.
+    targets : list of callable or str
+        Predict functions, or their names in pedophysics.predict.
+    n_jobs : int, optional
+        Number of threads. Default is one per target.
+
+    Returns
+    -------
+    dict
+        Prediction of each target, by name of its predict function.
+
+    External functions
+    --------
+    predict_copy : Call a predict function on a copy of the soil and return its values and the completed copy, leaving the soil unchanged
+
+    Example
+    -------
+    >>> sample = Soil(water = [0.1, 0.2], clay = 20, porosity = 0.4, water_ec = 0.1, frequency_perm = 1e9)
+    >>> predictions = predict_targets(sample, ['BulkPerm', 'BulkEC'])
+    >>> predictions['BulkPerm'].values
+    array([ 6.731, 11.97 ])
+    """
+    names = [target if isinstance(target, str) else target.__name__ for target in targets]
+    with ThreadPoolExecutor(max_workers=n_jobs or max(len(targets), 1)) as pool:
+        futures = [pool.submit(predict_copy, soil, target) for target in targets]
+        return {name: future.result() for name, future in zip(names, futures)}
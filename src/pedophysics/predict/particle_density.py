@@ -1,7 +1,10 @@
 import numpy as np
 from pedophysics.pedotransfer_functions.particle_density import Schjonnen
+from pedophysics.utils.precision import predict_call
+from pedophysics.utils.unique import evaluate_unique
 from .texture import Texture
 
+@predict_call
 def ParticleDensity(soil):
     """
     Calculate or set missing values of soil.df.particle_density and return
@@ -59,16 +62,14 @@ def ParticleDensity(soil):
     if (np.isnan(soil.df.particle_density)).any(): 
         Texture(soil)
 
-        soil.info['particle_density'] = ["Calculated using Schjonnen function (RMSE = 0.011 g/cm3)" if np.isnan(soil.df.particle_density[x]) 
-                                         or soil.info.particle_density[x] == "Calculated using Schjonnen function (RMSE = 0.011 g/cm3)"
-                                         else soil.info.particle_density[x] for x in range(soil.n_states)]
-        
-        soil.df['particle_density'] = [Schjonnen(soil.df.clay[x], soil.df.orgm[x]) if np.isnan(soil.df.particle_density[x])  
-                                       else soil.df.particle_density[x] for x in range(soil.n_states)]
-        
-        soil.info['particle_density'] = ["Set as 2.65 by default" if np.isnan(soil.df.particle_density[x]) or soil.info.particle_density[x] == "Set as 2.65 by default"
-                                     else soil.info.particle_density[x] for x in range(soil.n_states)]
-        
-        soil.df['particle_density'] = [2.65 if np.isnan(soil.df.particle_density[x]) else soil.df.particle_density[x] for x in range(soil.n_states)]
+        missing = np.isnan(soil.df.particle_density.values)
+        particle_density = soil.df.particle_density.values.copy()
+        particle_density[missing] = evaluate_unique(Schjonnen, soil.df.clay.values[missing], soil.df.orgm.values[missing])
+
+        # States without clay or orgm are set to the default value
+        default = np.isnan(particle_density)
+        soil.info['particle_density'] = np.where(default, "Set as 2.65 by default", 
+                                                 np.where(missing, "Calculated using Schjonnen function (RMSE = 0.011 g/cm3)", soil.info.particle_density.to_numpy(dtype=object)))
+        soil.df['particle_density'] = np.where(default, 2.65, particle_density)
 
     return soil.df.particle_density.values
@@ -0,0 +1,387 @@
+import warnings
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .temperature import Temperature
+from .frequency_perm import FrequencyPerm
+from .frequency_ec import FrequencyEC
+from .porosity import Porosity
+from .texture import Texture
+from .air_perm import AirPerm
+from .solid_perm import SolidPerm
+from .water_perm import WaterPerm
+from .bulk_perm_inf import BulkPermInf
+from .solid_ec import SolidEC
+from pedophysics.utils.strategy import STRATEGIES, choose
+
+# Result of explain: model of each state and attribute, expected scipy minimize calls by function, and reasons of the states left missing
+Plan = namedtuple('Plan', ['models', 'solver_calls', 'missing'])
+
+# Attribute completed by each predict function accepted by explain, and the attributes it is calculated from
+_TARGETS = {'Water': ('water', 'bulk_perm or bulk_ec'), 'BulkPerm': ('bulk_perm', 'water or bulk_ec'),
+           'WaterEC': ('water_ec', 'salinity, or water and bulk_ec')}
+
+
+def explain(soil, target, strategy=None):
+    """
+    Return the models that a predict function would use for each state, its expected solver calls and the reasons of the states it would leave missing, without running it
+
+    The branching conditions of the predict function and of the predict functions it calls (fitting or non-fitting
+    approach, frequency band, Rhoades or Hilhorst fitting, conversions of bulk_ec to bulk_ec_dc_tc) are evaluated on a
+    copy of the soil. The inputs that predict functions set by default or by closed-form expressions (temperature,
+    frequency_perm, porosity from bulk_density, texture, water_perm, ...) are completed on the copy; no model is fitted
+    or inverted, and the soil is not modified.
+
+    Parameters
+    ----------
+    soil : object
+        Soil object, which is not modified.
+    target : callable or str
+        Predict function, or its name: 'Water', 'BulkPerm' or 'WaterEC'.
+    strategy : str, optional
+        Strategy of the predict call, 'exact' (default), 'fast' or 'auto', which selects the inversion paths counted in solver_calls.
+
+    Returns
+    -------
+    Plan
+        Named tuple of:
+
+        - models : DataFrame
+            Model completing each attribute of each state, one column per attribute of the plan (the target first).
+            'given' for known values, '' for states left missing.
+        - solver_calls : dict
+            Expected number of scipy.optimize.minimize calls, by predict function (e.g. 'predict.water_from_ec.non_fitting').
+            Inversions taking a path without minimize under the strategy (see utils.strategy.choose) are not counted.
+        - missing : DataFrame
+            Unknown inputs of the models tried for the states left missing, '' for the others.
+
+    Notes
+    -----
+    Values calculated during the run are not known in advance. When the calibration states or the values checked against
+    the range of a fitting approach are calculated (e.g. bulk_ec_dc_tc converted from bulk_ec in the fitting approach of
+    WaterFromEC), the states are assumed inside the range, and its solver calls are an upper bound.
+
+    External functions
+    --------
+    Temperature : Set missing values of soil.df.temperature and return
+    FrequencyPerm : Set missing values of soil.df.frequency_perm and return
+    FrequencyEC : Set missing values of soil.df.frequency_ec and return
+    Porosity : Calculate missing values of soil.df.porosity and return
+    Texture : Calculate missing values of soil.df.sand, soil.df.silt, and soil.df.clay and return
+    AirPerm : Set missing values of soil.df.air_perm and return
+    SolidPerm : Set missing values of soil.df.solid_perm and return
+    WaterPerm : Calculate or set missing values of soil.df.water_perm and return
+    BulkPermInf : Set missing values of soil.df.bulk_perm_inf and return
+    SolidEC : Set missing values of soil.df.solid_ec and return
+
+    Example
+    -------
+    >>> sample = Soil(bulk_perm = [10, 12, 15, np.nan], bulk_ec = [np.nan, np.nan, np.nan, 0.02],
+                      frequency_perm = [50e6, 150e6, 1e9, np.nan], frequency_ec = 1e3, porosity = 0.45, clay = 20, water_ec = 0.1)
+    >>> plan = explain(sample, 'Water')
+    >>> plan.models.water.tolist()
+    ['', 'LR', 'LR_W', 'Fu']
+    >>> plan.solver_calls
+    {'predict.bulk_ec_dc.non_dc_to_dc': 1, 'predict.water_from_ec.non_fitting': 1}
+    >>> plan.missing.water[0]
+    'LR_MV requires CEC'
+    """
+    name = target if isinstance(target, str) else target.__name__
+    if name not in _TARGETS:
+        raise ValueError(f"'{name}' cannot be explained. Must be one of {list(_TARGETS)}")
+    if strategy is not None and strategy not in STRATEGIES:
+        raise ValueError(f"'strategy' must be one of {STRATEGIES}")
+
+    copy = soil.copy()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore') # Validity warnings are raised again by the predict function
+        for setter in [Temperature, FrequencyPerm, FrequencyEC, Porosity, Texture, AirPerm, SolidPerm, WaterPerm, BulkPermInf, SolidEC]:
+            setter(copy)
+    copy._strategy = strategy
+
+    attribute, sources = _TARGETS[name]
+    plan = _Plan(copy)
+    plan.column(attribute)
+    {'Water': _water, 'BulkPerm': _bulk_perm, 'WaterEC': _water_ec}[name](plan)
+    plan.note(attribute, ~plan.has(attribute) & ~np.array([bool(r) for r in plan.reasons[attribute]]), 'Provide ' + sources)
+
+    index = copy.df.index
+    models = pd.DataFrame({a: plan.models[a] for a in plan.models}, index=index)
+    missing = pd.DataFrame({a: ['; '.join(r) if m == '' else '' for r, m in zip(plan.reasons[a], plan.models[a])] for a in plan.models}, index=index)
+    return Plan(models, plan.calls, missing)
+
+
+class _Plan:
+    """
+    Known values, models and solver calls of the attributes completed while evaluating the branches of predict functions
+    """
+    def __init__(self, soil):
+        self.soil = soil
+        self.Lw = soil.Lw
+        self.known, self.models, self.reasons, self.calls, self.done = {}, {}, {}, {}, set()
+
+    def has(self, attribute):
+        """Return the mask of the states where the attribute is known, or would be calculated before the current step"""
+        if attribute not in self.known:
+            self.known[attribute] = ~np.isnan(self.soil.df[attribute].values)
+        return self.known[attribute]
+
+    def column(self, attribute):
+        """Start the models and reasons of an attribute, with 'given' for its known values"""
+        if attribute not in self.models:
+            self.models[attribute] = np.where(self.has(attribute), 'given', '').astype(object)
+            self.reasons[attribute] = [[] for _ in range(self.soil.n_states)]
+
+    def assign(self, attribute, states, model, inputs):
+        """Assign a model to the states where the attribute is missing and its inputs are known, record the unknown inputs of the others and return the assigned states"""
+        self.column(attribute)
+        states = np.asarray(states, dtype=bool) & ~self.has(attribute)
+        assigned = states.copy()
+        for input in inputs:
+            assigned &= self.has(input)
+        self.models[attribute][assigned] = model
+        self.known[attribute] = self.has(attribute) | assigned
+        for x in np.flatnonzero(states & ~assigned):
+            self.reasons[attribute][x].append(model + ' requires ' + ', '.join(i for i in inputs if not self.has(i)[x]))
+        return assigned
+
+    def note(self, attribute, states, reason):
+        """Record the reason why the states are not calculated by a step"""
+        self.column(attribute)
+        for x in np.flatnonzero(states):
+            self.reasons[attribute][x].append(reason)
+
+    def solve(self, function, n, inversion=None, attribute=None, tables=1):
+        """Count n expected solver calls of a predict function, unless the strategy takes a path of the inversion without them"""
+        n = int(np.sum(n))
+        if n and (inversion is None or choose(self.soil, inversion, attribute, n, tables) == 'optimizer'):
+            self.calls[function] = self.calls.get(function, 0) + n
+
+
+def _fitted_range(plan, fit, key, x, y, states, range_key):
+    """
+    Return the calibration range of the y attribute of a fitting approach on x, as computed by its predict function, and count its Lw fit
+    """
+    soil = plan.soil
+    if fit is not None:
+        plan.Lw = fit['Lw']
+        return fit[range_key]
+    if np.isnan(plan.Lw):
+        plan.solve(key, 1)
+        plan.Lw = 0. # Fitted
+    calibration = states & plan.has(x) & plan.has(y)
+    valids = calibration & ~np.isnan(soil.df[x].values) & ~np.isnan(soil.df[y].values)
+    if not valids.any() or (calibration & ~valids).any(): # Calibration states calculated during the run
+        return [-np.inf, np.inf]
+    init, final = np.min(soil.df[y].values[valids]), np.max(soil.df[y].values[valids])
+    range_ = [round(init - (final - init)/soil.range_ratio, soil.roundn), round(final + (final - init)/soil.range_ratio, soil.roundn)]
+    range_[0] = max(range_[0], 0)
+    return range_
+
+
+def _inside(plan, attribute, range_):
+    """Return the mask of the states where the attribute is inside the range, or is calculated during the run"""
+    values = plan.soil.df[attribute].values
+    with np.errstate(invalid='ignore'):
+        return np.isnan(values) | ((values >= min(range_)) & (values <= max(range_)))
+
+
+def _water(plan):
+    """Branches of predict.Water"""
+    soil = plan.soil
+    frequency_perm = soil.df.frequency_perm.values
+
+    from_perm = ~plan.has('water') & plan.has('bulk_perm')
+    if from_perm.any() and np.isnan(frequency_perm).all():
+        plan.note('water', from_perm, 'WaterFromPerm requires frequency_perm')
+    elif from_perm.any():
+        _water_from_perm(plan)
+
+    _shift_to_bulk_ec_dc_tc(plan)
+    if (~plan.has('water') & plan.has('bulk_ec_dc_tc')).any():
+        _water_from_ec(plan)
+
+
+def _water_from_perm(plan):
+    """Branches of predict.water_from_perm.WaterFromPerm"""
+    soil = plan.soil
+    frequency_perm = soil.df.frequency_perm.values
+    Lw = plan.Lw
+
+    for freq in np.unique(frequency_perm[~np.isnan(frequency_perm)]):
+        plan.Lw = Lw
+        group = frequency_perm == freq
+        if np.sum(group & plan.has('water') & plan.has('bulk_perm')) >= 3:
+            key = 'predict.water_from_perm.fitting frequency_perm=' + str([float(freq)])
+            fit = soil.fits.get(key)
+            range_ = _fitted_range(plan, fit, 'predict.water_from_perm.fitting', 'water', 'bulk_perm', group, 'bulk_perm_range')
+            inside = group & plan.has('bulk_perm') & _inside(plan, 'bulk_perm', range_)
+            plan.solve('predict.water_from_perm.fitting', inside if fit is None else inside & ~plan.has('water'), 'water from bulk_perm', 'water')
+            plan.note('water', group & ~plan.has('water') & plan.has('bulk_perm') & ~inside, 'WunderlichP fitted for bulk_perm between ' + str(range_))
+            plan.assign('water', inside, 'WunderlichP', [])
+    plan.note('water', ~plan.has('water') & plan.has('bulk_perm') & np.isnan(frequency_perm), 'WaterFromPerm requires frequency_perm')
+
+    # Non-fitting approach
+    if np.any(~plan.has('water') & plan.has('bulk_perm') & (frequency_perm >= 5) & (frequency_perm <= 30e9)):
+        low_freq = (frequency_perm >= 5) & (frequency_perm < 30e6)
+        if low_freq.any():
+            states = low_freq & ~plan.has('bulk_ec_dc') & plan.has('bulk_perm_inf') & plan.has('bulk_perm')
+            plan.solve('predict.water_from_perm.non_fitting', states, 'bulk_ec_dc from bulk_perm', 'bulk_ec_dc', len(np.unique(frequency_perm[states])))
+            plan.assign('bulk_ec_dc', low_freq, 'LongmireSmithP', ['bulk_perm_inf', 'bulk_perm'])
+
+        inputs = ['bulk_perm', 'porosity', 'air_perm', 'solid_perm', 'water_perm']
+        plan.assign('water', (frequency_perm >= 30e6) & (frequency_perm < 100e6), 'LR_MV', inputs + ['CEC'])
+        plan.assign('water', (frequency_perm >= 100e6) & (frequency_perm < 200e6), 'LR', inputs)
+        plan.assign('water', (frequency_perm >= 200e6) & (frequency_perm <= 30e9), 'LR_W', inputs + ['clay'])
+
+
+def _water_from_ec(plan):
+    """Branches of predict.water_from_ec.WaterFromEC"""
+    soil = plan.soil
+
+    # Fitting approach
+    if np.sum(plan.has('water') & plan.has('bulk_ec_dc_tc')) >= 3:
+        fit = soil.fits.get('predict.water_from_ec.fitting')
+        states = np.ones(soil.n_states, dtype=bool)
+        range_ = _fitted_range(plan, fit, 'predict.water_from_ec.fitting', 'water', 'bulk_ec_dc_tc', states, 'bulk_ec_range')
+        inside = plan.has('bulk_ec_dc_tc') & _inside(plan, 'bulk_ec_dc_tc', range_)
+        plan.solve('predict.water_from_ec.fitting', inside if fit is None else inside & ~plan.has('water'), 'water from bulk_ec_dc_tc', 'water')
+        plan.note('water', ~plan.has('water') & plan.has('bulk_ec_dc_tc') & ~inside, 'WunderlichEC fitted for bulk_ec_dc_tc between ' + str(range_))
+        plan.assign('water', inside, 'WunderlichEC', ['water_ec'])
+
+    # Non-fitting approach
+    states = ~plan.has('water') & plan.has('bulk_ec_dc_tc')
+    if states.any():
+        _water_ec(plan)
+        plan.solve('predict.water_from_ec.non_fitting', states & plan.has('clay') & plan.has('porosity'))
+        plan.assign('water', states, 'Fu', ['clay', 'porosity', 'water_ec'])
+
+
+def _water_ec(plan):
+    """Branches of predict.WaterEC"""
+    if 'WaterEC' in plan.done:
+        return
+    plan.done.add('WaterEC')
+    soil = plan.soil
+    _shift_to_bulk_ec_dc_tc(plan)
+    plan.assign('water_ec', plan.has('salinity'), 'SenGoode', ['salinity', 'temperature'])
+
+    missing = ~plan.has('water_ec')
+    bulk_perm = soil.df.bulk_perm.values
+    with np.errstate(invalid='ignore'):
+        hilhorst = plan.has('bulk_ec_dc_tc') & plan.has('bulk_perm') & (bulk_perm >= 10) & missing
+    if 'predict.water_ec.fitting_rhoades' in soil.fits:
+        plan.assign('water_ec', missing, 'Rhoades', [])
+    elif 'predict.water_ec.fitting_hilhorst' in soil.fits:
+        plan.assign('water_ec', missing, 'Hilhorst', [])
+    elif np.sum(plan.has('bulk_ec_dc_tc') & plan.has('water') & missing) >= 2:
+        plan.solve('predict.water_ec.fitting_rhoades', 2)
+        plan.assign('water_ec', missing, 'Rhoades', [])
+    elif np.sum(hilhorst) >= 2:
+        plan.assign('water_ec', missing, 'Hilhorst', [])
+
+    plan.assign('water_ec', plan.has('water') & plan.has('bulk_ec_dc_tc'), 'FuWaterEC', ['clay', 'porosity'])
+
+
+def _bulk_perm(plan):
+    """Branches of predict.BulkPerm"""
+    soil = plan.soil
+    frequency_perm = soil.df.frequency_perm.values
+    if plan.has('bulk_perm').all():
+        return
+    if np.isnan(frequency_perm).all():
+        plan.note('bulk_perm', ~plan.has('bulk_perm'), 'BulkPerm requires frequency_perm')
+        return
+
+    # Fitting approach for each group of states sharing the same frequency
+    Lw = plan.Lw
+    for freq in np.unique(frequency_perm[~np.isnan(frequency_perm)]):
+        plan.Lw = Lw
+        group = frequency_perm == freq
+        if np.sum(group & plan.has('water') & plan.has('bulk_perm')) >= 3:
+            key = 'predict.bulk_perm.fitting frequency_perm=' + str([float(freq)])
+            range_ = _fitted_range(plan, soil.fits.get(key), 'predict.bulk_perm.fitting', 'bulk_perm', 'water', group, 'water_range')
+            inside = group & plan.has('water') & _inside(plan, 'water', range_)
+            plan.note('bulk_perm', group & ~plan.has('bulk_perm') & plan.has('water') & ~inside, 'WunderlichP fitted for water between ' + str(range_))
+            plan.assign('bulk_perm', inside, 'WunderlichP', [])
+    plan.note('bulk_perm', ~plan.has('bulk_perm') & np.isnan(frequency_perm), 'BulkPerm requires frequency_perm')
+
+    # Non-fitting approach
+    if np.any(~plan.has('bulk_perm') & (frequency_perm >= 5) & (frequency_perm <= 30e9)):
+        em_freq = (frequency_perm >= 30e6) & (frequency_perm <= 30e9)
+        inputs = ['water', 'porosity', 'air_perm', 'solid_perm', 'water_perm']
+        from_water = plan.has('water')
+        plan.assign('bulk_perm', from_water & (frequency_perm >= 30e6) & (frequency_perm < 100e6), 'LR_MV', inputs + ['CEC'])
+        plan.assign('bulk_perm', from_water & (frequency_perm >= 100e6) & (frequency_perm < 200e6), 'LR', inputs)
+        plan.assign('bulk_perm', from_water & (frequency_perm >= 200e6) & (frequency_perm <= 30e9), 'LR_W', inputs + ['clay'])
+
+        low_freq = (frequency_perm >= 5) & (frequency_perm < 30e6)
+        from_ec = ~plan.has('bulk_perm') & (low_freq | em_freq)
+        if from_ec.any():
+            _bulk_ec_dc(plan)
+            plan.assign('bulk_perm', from_ec, 'LongmireSmithP', ['bulk_ec_dc', 'bulk_perm_inf'])
+
+
+def _bulk_ec_dc(plan):
+    """Branches of predict.BulkECDC"""
+    soil = plan.soil
+    if plan.has('bulk_ec_dc').all():
+        return
+    _bulk_ec_dc_tc(plan)
+
+    missing = ~plan.has('bulk_ec_dc')
+    if (missing & plan.has('bulk_ec_dc_tc')).any():
+        standard = soil.df.temperature.values == 298.15
+        plan.assign('bulk_ec_dc', standard, 'equal to bulk_ec_dc_tc', ['bulk_ec_dc_tc'])
+        plan.solve('predict.bulk_ec_dc.tc_to_non_tc', ~standard & ~plan.has('bulk_ec_dc') & plan.has('bulk_ec_dc_tc') & plan.has('temperature'),
+                   'bulk_ec_dc from bulk_ec_dc_tc', 'bulk_ec_dc')
+        plan.assign('bulk_ec_dc', ~standard, 'SheetsHendrickx', ['bulk_ec_dc_tc', 'temperature'])
+
+    if (~plan.has('bulk_ec_dc') & plan.has('bulk_ec')).any():
+        _non_dc_to_dc(plan)
+
+
+def _bulk_ec_dc_tc(plan):
+    """Branches of predict.BulkECDCTC"""
+    soil = plan.soil
+    if plan.has('bulk_ec_dc_tc').all():
+        return
+    _shift_to_bulk_ec_dc_tc(plan)
+
+    # Fitting approach
+    if np.sum(plan.has('water') & plan.has('bulk_ec_dc_tc')) >= 3:
+        _water_ec(plan)
+        states = np.ones(soil.n_states, dtype=bool)
+        fit = soil.fits.get('predict.bulk_ec_dc_tc.fitting')
+        range_ = _fitted_range(plan, fit, 'predict.bulk_ec_dc_tc.fitting', 'bulk_ec_dc_tc', 'water', states, 'water_range')
+        plan.assign('bulk_ec_dc_tc', plan.has('water') & _inside(plan, 'water', range_), 'WunderlichEC', ['water_ec'])
+
+    # Non-fitting approach
+    if (plan.has('water') & ~plan.has('bulk_ec_dc_tc')).any():
+        _water_ec(plan)
+        plan.assign('bulk_ec_dc_tc', plan.has('water'), 'Fu', ['clay', 'porosity', 'water_ec'])
+
+
+def _non_dc_to_dc(plan):
+    """Branches of predict.bulk_ec_dc.non_dc_to_dc"""
+    frequency_ec = plan.soil.df.frequency_ec.values
+    missing = ~plan.has('bulk_ec_dc')
+    plan.assign('bulk_ec_dc', missing & (frequency_ec <= 5), 'equal to bulk_ec', ['bulk_ec'])
+    states = missing & (frequency_ec > 5) & plan.has('bulk_ec')
+    plan.solve('predict.bulk_ec_dc.non_dc_to_dc', states, 'bulk_ec_dc from bulk_ec', 'bulk_ec_dc', len(np.unique(frequency_ec[states])))
+    plan.assign('bulk_ec_dc', missing & (frequency_ec > 5), 'LongmireSmithEC', ['bulk_ec'])
+
+
+def _shift_to_bulk_ec_dc_tc(plan):
+    """Branches of predict.bulk_ec_dc_tc.shift_to_bulk_ec_dc_tc"""
+    soil = plan.soil
+    if not ((plan.has('bulk_ec') | plan.has('bulk_ec_dc')) & ~plan.has('bulk_ec_dc_tc')).any():
+        return
+    _non_dc_to_dc(plan)
+
+    standard = soil.df.temperature.values == 298.15
+    plan.assign('bulk_ec_dc_tc', standard & (soil.df.frequency_ec.values <= 5), 'equal to bulk_ec', ['bulk_ec'])
+    plan.assign('bulk_ec_dc_tc', standard, 'equal to bulk_ec_dc', ['bulk_ec_dc'])
+    plan.assign('bulk_ec_dc_tc', ~standard, 'SheetsHendrickx', ['bulk_ec_dc', 'temperature'])
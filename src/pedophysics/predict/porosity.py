@@ -1,6 +1,8 @@
 import numpy as np
 from pedophysics.predict.particle_density import ParticleDensity
+from pedophysics.utils.precision import predict_call
 
+@predict_call
 def Porosity(soil):
     """
     Calculate missing values of soil.df.porosity and return
@@ -39,28 +41,18 @@ def Porosity(soil):
     """
     ParticleDensity(soil)
 
-    # Check for missing values
-    missing_porosity_before = soil.df['porosity'].isna()
-
     # Calculate missing porosity values where possible
-    soil.df['porosity'] = [
-        round(1 - soil.df.bulk_density[x] / soil.df.particle_density[x], soil.roundn)
-        if np.isnan(soil.df.porosity[x]) and not np.isnan(soil.df.bulk_density[x]) and not np.isnan(soil.df.particle_density[x])
-        else soil.df.porosity[x] 
-        for x in range(soil.n_states)
-    ]
-    missing_porosity_after = soil.df['porosity'].isna()
-
-    # Update info for calculated porosity
-    soil.info['porosity'] = [str(soil.info.porosity[x]) + (
-            "--> Calculated based on bulk density"
-            if missing_porosity_before[x] and not missing_porosity_after[x]
-            else "--> Provide porosity or bulk_density"
-            if missing_porosity_before[x] and missing_porosity_after[x]
-            else "")
-        if missing_porosity_before[x]
-        else soil.info.porosity[x]
-        for x in range(soil.n_states)]
+    missing = soil.df['porosity'].isna().values
+    if missing.any():
+        porosity = soil.df.porosity.values.copy()
+        porosity[missing] = 1 - soil.df.bulk_density.values[missing] / soil.df.particle_density.values[missing]
+        soil.df['porosity'] = porosity
+
+        # Update info for calculated porosity
+        info = soil.info['porosity'].to_numpy(dtype=object).copy()
+        info[missing] = [str(i) + ("--> Provide porosity or bulk_density" if np.isnan(p) else "--> Calculated based on bulk density") 
+                         for i, p in zip(info[missing], porosity[missing])]
+        soil.info['porosity'] = info
     
     return soil.df.porosity.values
 
@@ -1,10 +1,13 @@
 import numpy as np
-from scipy.optimize import minimize
 
 from pedophysics.pedophysical_models.water_ec import SenGoode
+from pedophysics.utils.precision import predict_call
+from pedophysics.utils.diagnostics import record
+from pedophysics.utils.unique import evaluate_unique, memoize
 from .temperature import *
 from .water_ec import *
 
+@predict_call
 def Salinity(soil):
     """
     Calculate missing values of soil.df.salinity and return
@@ -39,13 +42,15 @@ def Salinity(soil):
     Notes
     -----
     This function modifies the soil object in-place, updating the `df` dataframe and `info`
-    dataframe if necessary.
+    dataframe if necessary. The diagnostics of the inversion of each state are recorded in
+    soil.diagnostics['predict.salinity.Salinity'], and salinity is left missing where the solver fails or the tolerance is missed if soil.drop_unconverged is True.
 
     External functions
     --------
     WaterEC : Compute missing values of soil.df.water_ec and return  
     Temperature : Set missing values of soil.df.temperature and return 
     SenGoode : Calculate soil water real electrical conductivity using the Sen and Goode model and return
+    record : Record the diagnostics of an inversion in soil.diagnostics and return its solutions
 
     Example
     -------
@@ -58,24 +63,22 @@ def Salinity(soil):
     0    0.00846
     Name: salinity, dtype: float64
     """
-
     if any(np.isnan(soil.df.salinity[x])for x in range(soil.n_states)):  # Go over if any value is missing 
 
         WaterEC(soil)
         Temperature(soil)
-        sal = []
-
-        def objective_salinity(salinity, water_ec, temperature):
-            return (SenGoode(temperature, salinity) - water_ec)**2
 
-        for x in range(soil.n_states):
-            result = minimize(objective_salinity, 0.01, args=(soil.df.water_ec[x], soil.df.temperature[x]), bounds=[(0, 1)])
-            sal.append(np.nan if np.isnan(result.fun) else round(result.x[0], soil.roundn+2))
+        # Inverted once per distinct water_ec and temperature
+        missing = np.isnan(soil.df.salinity.values)
+        states = missing & ~np.isnan(soil.df.water_ec.values) & ~np.isnan(soil.df.temperature.values)
+        sal = np.full(soil.n_states, np.nan)
+        sal[states], iterations, residual, status = evaluate_unique(np.vectorize(_salinity, otypes=[float, float, float, float]),
+                                                                    soil.df.water_ec.values[states], soil.df.temperature.values[states])
+        sal[states] = record(soil, 'predict.salinity.Salinity', states, sal[states], residual, iterations, soil.df.water_ec.values[states], (0, 1), status)
 
         missing_salinity_before = soil.df['salinity'].isna()
 
-        soil.df['salinity'] = [sal[x] if np.isnan(soil.df.salinity[x]) 
-                               else soil.df.salinity[x] for x in range(soil.n_states)]
+        soil.df['salinity'] = np.where(missing, sal, soil.df.salinity.values)
         
         missing_salinity_after = soil.df['salinity'].isna()
 
@@ -90,4 +93,15 @@ def Salinity(soil):
             for x in range(soil.n_states)]
         
 
-    return soil.df.salinity.values 
+    return soil.df.salinity.values
+
+
+@memoize
+def _salinity(water_ec, temperature):
+    """
+    Invert the SenGoode function for the salinity of a soil state and return it with the solver iterations, final residual and status
+    """
+    from scipy.optimize import minimize
+
+    result = minimize(lambda salinity: (SenGoode(temperature, salinity) - water_ec)**2, 0.01, bounds=[(0, 1)])
+    return result.x[0], result.nit, np.sqrt(result.fun), result.status
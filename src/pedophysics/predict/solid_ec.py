@@ -1,5 +1,7 @@
 import numpy as np
+from pedophysics.utils.precision import predict_call
 
+@predict_call
 def SolidEC(soil):
     """
     Set missing values of soil.df.solid_ec and return
@@ -42,9 +44,8 @@ def SolidEC(soil):
     # Check if any value of solid_ec is missing
     if (np.isnan(soil.df.solid_ec)).any():
 
-        soil.info['solid_ec'] = ["Set as zero by default" if np.isnan(soil.df.solid_ec[x]) or soil.info.solid_ec[x] == "Set as zero by default"
-                                 else soil.info.solid_ec[x] for x in range(soil.n_states)]
-
-        soil.df['solid_ec'] = [0 if np.isnan(soil.df.solid_ec[x]) else soil.df.solid_ec[x] for x in range(soil.n_states)]
+        missing = np.isnan(soil.df.solid_ec.values)
+        soil.info['solid_ec'] = np.where(missing, "Set as zero by default", soil.info.solid_ec.to_numpy(dtype=object))
+        soil.df['solid_ec'] = np.where(missing, 0, soil.df.solid_ec.values)
 
     return soil.df.solid_ec.values
\ No newline at end of file
@@ -1,5 +1,7 @@
 import numpy as np
+from pedophysics.utils.precision import predict_call
 
+@predict_call
 def SolidPerm(soil):
     """
     Set missing values of soil.df.solid_perm and return
@@ -40,11 +42,10 @@ def SolidPerm(soil):
     """
 
     # Check if any value of solid_perm is missing
-    if (np.isnan(soil.df.solid_perm)).any:  
+    if (np.isnan(soil.df.solid_perm)).any():  
 
-        soil.info['solid_perm'] = ["Set as 4 by default" if np.isnan(soil.df.solid_perm[x]) or soil.info.solid_perm[x] == "Set as 4 by default"
-                                     else soil.info.solid_perm[x] for x in range(soil.n_states)]
-        
-        soil.df.loc[np.isnan(soil.df['solid_perm']), ['solid_perm']] = 4
+        missing = np.isnan(soil.df.solid_perm.values)
+        soil.info['solid_perm'] = np.where(missing, "Set as 4 by default", soil.info.solid_perm.to_numpy(dtype=object))
+        soil.df['solid_perm'] = np.where(missing, 4, soil.df.solid_perm.values)
 
     return soil.df.solid_perm.values
\ No newline at end of file
@@ -1,5 +1,7 @@
 import numpy as np
+from pedophysics.utils.precision import predict_call
 
+@predict_call
 def Temperature(soil):
     """
     Set missing values of soil.df.temperature and return 
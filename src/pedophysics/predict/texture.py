@@ -1,6 +1,19 @@
-import warnings
 import numpy as np
+from pedophysics.utils.precision import predict_call
+from pedophysics.utils.validity import check
+from pedophysics.simulate import TEXTURES
 
+FRACTIONS = ['sand', 'silt', 'clay']
+
+# Descriptions of a fraction completed from the other two
+COMPLETED = {'sand': "Fraction calculated using: 100 - clay - silt", 'silt': "Fraction calculated using: 100 - clay - sand",
+             'clay': "Fraction calculated using: 100 - sand - silt"}
+
+# Sand, silt and clay fractions of each USDA texture class of TEXTURES, assigned to the states without fractions
+TEXTURE_FRACTIONS = np.array([(95, 3, 2), (82, 12, 6), (65, 25, 10), (40, 40, 20), (20, 65, 15), (8, 86, 6), (60, 25, 15),
+                              (30, 35, 35), (10, 55, 35), (50, 10, 40), (15, 20, 65), (7, 48, 45)], dtype=np.float64)
+
+@predict_call
 def Texture(soil):
     """
     Calculate missing values of soil.df.sand, soil.df.silt, and soil.df.clay and return
@@ -8,7 +21,8 @@ def Texture(soil):
     If any value of the sand, silt, or clay attribute is missing, this function will:
     1. Warn if the sum of texture fractions does not equate to 100%.
     2. Calculate missing texture fraction if only two out of three are given.
-    3. Assign default texture fractions based on the `texture` attribute of the soil object.
+    3. Assign default texture fractions based on the `texture` attribute of the soil object, for all states or for each state
+       (see Soil.texture_codes), as one lookup in TEXTURE_FRACTIONS.
 
     Parameters
     ----------
@@ -21,8 +35,8 @@ def Texture(soil):
             Soil sand content [g/g]*100
         - silt : array-like
             Soil silt content [g/g]*100
-        - texture : str
-            Soil texture according to USDA convention: "Sand", "Loamy sand", "Sandy loam", "Loam", "Silt loam", "Silt", "Sandy clay loam", "Clay loam", "Silty clay loam", "Sandy clay", "Clay", "Silty clay"
+        - texture : str or array-like of str
+            Soil texture for all states or for each state, according to USDA convention: "Sand", "Loamy sand", "Sandy loam", "Loam", "Silt loam", "Silt", "Sandy clay loam", "Clay loam", "Silty clay loam", "Sandy clay", "Clay", "Silty clay"
         - df : DataFrame
             Data Frame containing all the quantitative information of soil array-like attributes for each state
         - info : DataFrame
@@ -32,11 +46,12 @@ def Texture(soil):
 
     Notes
     -----
-    This function modifies the soil object in-place, updating the `df` and `info` dataframes.
+    This function modifies the soil object in-place, updating the `df` and `info` dataframes, and flags in `soil.flags` the states
+    whose texture fractions do not sum 100.
 
     External functions
     --------
-    warnings.warn : Issue a warning, or maybe ignore it or raise an exception.
+    check : Flag the states outside the validity domain of a model in soil.flags, warn once about the newly flagged ones and return them
 
     Example
     -------
@@ -55,48 +70,66 @@ def Texture(soil):
     if (np.isnan(soil.df.sand)).any() or (np.isnan(soil.df.silt)).any() or (np.isnan(soil.df.clay)).any() : 
 
         # Warn texture fractions that does not sum 100
-        if any(not np.isnan(soil.df.sand[x]) and not np.isnan(soil.df.silt[x]) and not np.isnan(soil.df.clay[x]) and soil.df.sand[x] + soil.df.silt[x] + soil.df.clay[x] != 100 for x in range(soil.n_states)):
-            states_warns = []
-            total_percents = []
-            for x in range(soil.n_states):
-                if ~np.isnan(soil.df.sand[x]) & ~np.isnan(soil.df.silt[x]) & ~np.isnan(soil.df.clay[x]):
-                    total_percent = soil.df.sand[x] + soil.df.silt[x] + soil.df.clay[x]
-                    if total_percent != 100:
-                        total_percents.append(total_percent)
-                        states_warns.append(x)
-
-            warnings.warn(f"Total percentage of texture fractions in states: {states_warns} are equal to {total_percents}")
+        check(soil, 'texture')
+
+        fractions = np.column_stack([soil.df.sand.values, soil.df.silt.values, soil.df.clay.values])
+        info = [soil.info[fraction].to_numpy(dtype=object).copy() for fraction in FRACTIONS]
+        missing = np.isnan(fractions)
 
         # Complete a third fraction if just two are given
-        soil.info['sand'] = ["Fraction calculated using: 100 - clay - silt" if (np.isnan(soil.df.sand[x]) & ~np.isnan(soil.df.silt[x]) & ~np.isnan(soil.df.clay[x])) 
-                                    or (soil.info.sand[x] == "Fraction completed using: 100 - clay - silt") else soil.info.sand[x] for x in range(soil.n_states)]
-        soil.df['sand'] = [100 - soil.df.clay[x] - soil.df.silt[x] if ((np.isnan(soil.df.sand[x]) ) & (~np.isnan(soil.df.silt[x])  ) & (~np.isnan(soil.df.clay[x])  )) else soil.df.sand[x] for x in range(soil.n_states)]
-        
-        soil.info['silt'] = ["Fraction calculated using: 100 - clay - sand" if (np.isnan(soil.df.silt[x]) & ~np.isnan(soil.df.sand[x]) & ~np.isnan(soil.df.clay[x]))
-                             or (soil.info.silt[x] == "Fraction completed using: 100 - clay - sand") else soil.info.silt[x] for x in range(soil.n_states)]
-        soil.df['silt'] = [100 - soil.df.clay[x] - soil.df.sand[x] if ((np.isnan(soil.df.silt[x]) ) & (~np.isnan(soil.df.sand[x])  ) & (~np.isnan(soil.df.clay[x])  )) else soil.df.silt[x] for x in range(soil.n_states)]
-        
-        soil.info['clay'] = ["Fraction calculated using: 100 - sand - silt" if (np.isnan(soil.df.clay[x]) & ~np.isnan(soil.df.silt[x]) & ~np.isnan(soil.df.sand[x]))
-                             or (soil.info.clay[x] == "Fraction completed using: 100 - sand - silt") else soil.info.clay[x] for x in range(soil.n_states)]
-        soil.df['clay'] = [100 - soil.df.sand[x] - soil.df.silt[x] if ((np.isnan(soil.df.clay[x]) ) & (~np.isnan(soil.df.silt[x])  ) & (~np.isnan(soil.df.sand[x])  )) else soil.df.clay[x] for x in range(soil.n_states)]
-
-    # Create a dictionary mapping soil textures to their corresponding fractions
-    texture_to_fractions = {
-        "Sand": (95, 3, 2),
-        "Loamy sand": (82, 12, 6),
-        "Sandy loam": (65, 25, 10),
-        "Loam": (40, 40, 20),
-        "Silt loam": (20, 65, 15),
-        "Silt": (8, 86, 6),
-        "Sandy clay loam": (60, 25, 15),
-        "Clay loam": (30, 35, 35),
-        "Silty clay loam": (10, 55, 35),
-        "Sandy clay": (50, 10, 40),
-        "Clay": (15, 20, 65),
-        "Silty clay": (7, 48, 45)
-    }
-
-    # Go over each texture and assign the corresponding fractions where needed
-    for texture, fractions in texture_to_fractions.items():
-        soil.info.loc[(np.isnan(soil.df['sand'])) & (np.isnan(soil.df['silt'])) & (np.isnan(soil.df['clay'])) & (soil.texture == texture), ['sand', 'silt', 'clay']] = ('Fraction calculated using soil.texture', 'Fraction calculated using soil.texture', 'Fraction calculated using soil.texture')
-        soil.df.loc[(np.isnan(soil.df['sand'])) & (np.isnan(soil.df['silt'])) & (np.isnan(soil.df['clay'])) & (soil.texture == texture), ['sand', 'silt', 'clay']] = fractions
\ No newline at end of file
+        third = missing & (missing.sum(axis=1) == 1)[:, None]
+        fractions[third] = (100 - np.nansum(fractions, axis=1))[third.any(axis=1)]
+
+        # Assign the fractions of the texture class of the states where none is given
+        codes = soil.texture_codes()
+        textured = missing.all(axis=1) & (codes >= 0)
+        fractions[textured] = TEXTURE_FRACTIONS[codes[textured]]
+
+        for i, fraction in enumerate(FRACTIONS):
+            info[i][third[:, i]] = COMPLETED[fraction]
+            info[i][textured] = 'Fraction calculated using soil.texture'
+            soil.df[fraction] = fractions[:, i]
+            soil.info[fraction] = info[i]
+
+
+def classify_texture(sand, silt, clay):
+    """
+    Classify texture fractions into USDA texture classes and return their codes
+
+    The limits of the USDA texture triangle are evaluated on all the states at once.
+
+    Parameters
+    ----------
+    sand : array_like
+        Soil sand content [g/g]*100
+    silt : array_like
+        Soil silt content [g/g]*100
+    clay : array_like
+        Soil clay content [g/g]*100
+
+    Returns
+    -------
+    np.ndarray
+        int8 codes of the texture classes, i.e. positions in simulate.TEXTURES, with -1 where a fraction is NaN.
+
+    Example
+    -------
+    >>> codes = classify_texture([95, 40, 15], [3, 40, 20], [2, 20, 65])
+    >>> np.array(TEXTURES)[codes]
+    array(['Sand', 'Loam', 'Clay'], dtype='<U15')
+    """
+    sand, silt, clay = np.broadcast_arrays(*[np.asarray(fraction, dtype=np.float64) for fraction in (sand, silt, clay)])
+    conditions = {"Sand": silt + 1.5*clay < 15,
+                  "Loamy sand": (silt + 1.5*clay >= 15) & (silt + 2*clay < 30),
+                  "Sandy loam": ((clay >= 7) & (clay < 20) & (sand > 52) | (clay < 7) & (silt < 50)) & (silt + 2*clay >= 30),
+                  "Loam": (clay >= 7) & (clay < 27) & (silt >= 28) & (silt < 50) & (sand <= 52),
+                  "Silt loam": (silt >= 50) & (clay >= 12) & (clay < 27) | (silt >= 50) & (silt < 80) & (clay < 12),
+                  "Silt": (silt >= 80) & (clay < 12),
+                  "Sandy clay loam": (clay >= 20) & (clay < 35) & (silt < 28) & (sand > 45),
+                  "Clay loam": (clay >= 27) & (clay < 40) & (sand > 20) & (sand <= 45),
+                  "Silty clay loam": (clay >= 27) & (clay < 40) & (sand <= 20),
+                  "Sandy clay": (clay >= 35) & (sand > 45),
+                  "Clay": (clay >= 40) & (sand <= 45) & (silt < 40),
+                  "Silty clay": (clay >= 40) & (silt >= 40)}
+    codes = np.select([conditions[texture] for texture in TEXTURES], np.arange(len(TEXTURES)), default=-1)
+    return np.where(np.isnan(sand + silt + clay), -1, codes).astype(np.int8)
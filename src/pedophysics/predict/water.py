@@ -1,4 +1,5 @@
 import numpy as np
+from pedophysics.utils.precision import predict_call
 
 from .water_from_ec import WaterFromEC
 from .water_from_perm import WaterFromPerm
@@ -7,6 +8,7 @@ from .frequency_ec import FrequencyEC
 from .temperature import Temperature
 from .bulk_ec_dc_tc import shift_to_bulk_ec_dc_tc
 
+@predict_call
 def Water(soil):
     """
     Return and compute missing values of the soil.df.water attribute using soil.df.bulk_perm or soil.df.bulk_ec.
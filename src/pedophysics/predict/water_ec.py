@@ -1,10 +1,14 @@
 import numpy as np
-from scipy.optimize import minimize, Bounds
+import pandas as pd
+import warnings
 
-from pedophysics.pedophysical_models.water_ec import SenGoode
-from pedophysics.pedophysical_models.bulk_ec import Fu, Rhoades
-from pedophysics.pedophysical_models.bulk_perm import Hilhorst
+from pedophysics.pedophysical_models.water_ec import SenGoode, FuWaterEC
+from pedophysics.pedophysical_models.bulk_ec import Rhoades
 from pedophysics.utils.stats import R2_score
+from pedophysics.utils.solvers import bounded_lstsq2
+from pedophysics.utils.parallel import map_chunks
+from pedophysics.utils.precision import predict_call
+from pedophysics.utils.unique import evaluate_unique
 
 from .temperature import Temperature
 from .porosity import Porosity
@@ -15,6 +19,7 @@ from .water_perm import WaterPerm
 
 from .bulk_ec_dc_tc import shift_to_bulk_ec_dc_tc
 
+@predict_call
 def WaterEC(soil):
     """
     Compute missing values of soil.df.water_ec and return  
@@ -74,8 +79,15 @@ def WaterEC(soil):
     if any(np.isnan(soil.df.water_ec[x]) and not np.isnan(soil.salinity[x]) for x in range(soil.n_states)):
         from_salinity(soil)
 
+    # Fits of previous calls with unchanged calibration states (see Soil.update)
+    if 'predict.water_ec.fitting_rhoades' in soil.fits:
+        fitting_rhoades(soil)
+
+    elif 'predict.water_ec.fitting_hilhorst' in soil.fits:
+        fitting_hilhorst(soil)
+
     # Conditions for fitting approaches
-    if sum(not np.isnan(soil.df.bulk_ec_dc_tc[x]) and not np.isnan(soil.df.water[x]) and np.isnan(soil.df.water_ec[x]) for x in range(soil.n_states)) >= 2 or sum(not np.isnan(soil.df.bulk_ec_dc_tc[x]) and not np.isnan(soil.df.bulk_perm[x]) and soil.df.bulk_perm[x]>=10 and np.isnan(soil.df.water_ec[x]) for x in range(soil.n_states)) >= 2:
+    elif sum(not np.isnan(soil.df.bulk_ec_dc_tc[x]) and not np.isnan(soil.df.water[x]) and np.isnan(soil.df.water_ec[x]) for x in range(soil.n_states)) >= 2 or sum(not np.isnan(soil.df.bulk_ec_dc_tc[x]) and not np.isnan(soil.df.bulk_perm[x]) and soil.df.bulk_perm[x]>=10 and np.isnan(soil.df.water_ec[x]) for x in range(soil.n_states)) >= 2:
 
         # Condition for fitting approach using Rhoades function
         if sum(not np.isnan(soil.df.bulk_ec_dc_tc[x]) and not np.isnan(soil.df.water[x]) and np.isnan(soil.df.water_ec[x]) for x in range(soil.n_states)) >= 2:
@@ -125,9 +137,10 @@ def from_salinity(soil):
     # Check for missing values
     missing_water_ec_before = soil.df['water_ec'].isna()
 
-    soil.df['water_ec'] = [SenGoode(soil.df.temperature[x], soil.df.salinity[x]) 
-                            if np.isnan(soil.df.water_ec[x]) 
-                            else soil.df.water_ec[x] for x in range(soil.n_states)]
+    missing = missing_water_ec_before.values
+    water_ec = soil.df.water_ec.values.copy()
+    water_ec[missing] = evaluate_unique(SenGoode, soil.df.temperature.values[missing], soil.df.salinity.values[missing])
+    soil.df['water_ec'] = water_ec
     missing_water_ec_after = soil.df['water_ec'].isna()
     
     soil.info['water_ec'] = [str(soil.info.water_ec[x]) + (
@@ -145,8 +158,9 @@ def from_ec(soil):
     """
     Calculate missing values of soil.df.water_ec based on soil.df.bulk_ec_dc_tc
 
-    This function applies the Fu function within a minimization process to estimate soil water EC based on soil properties such as 
-    water content, clay content, porosity, solid EC, dry EC, and saturated EC. The estimation is performed for each soil state where water EC is unknown.
+    This function inverts the Fu function in closed form to estimate soil water EC based on soil properties such as 
+    water content, clay content, porosity, solid EC, and dry EC. The estimation is performed in one pass over the soil states where water EC is unknown.
+    States with saturated EC given, for which the Fu function does not depend on water EC, and states matched only by a negative water EC are left missing.
 
     Parameters
     ----------
@@ -172,31 +186,20 @@ def from_ec(soil):
     - Texture : Calculate missing values of soil.df.sand, soil.df.silt, and soil.df.clay and return
     - Porosity : Calculate missing values of soil.df.porosity and return
     - SolidEC : Set missing values of soil.df.solid_ec and return
-    - Fu : Calculate the soil bulk real electrical conductivity using the Fu model and return
+    - FuWaterEC : Calculate soil water real electrical conductivity by inverting the Fu model and return
 
     """
     Texture(soil)
     Porosity(soil)
     SolidEC(soil)
 
-    # Defining minimization function to obtain water_ec
-    def objective_wat_ec(water_ec, wat, clay, porosity, solid_ec, dry_ec, sat_ec, EC):
-        return abs(Fu(wat, clay, porosity, water_ec, solid_ec, dry_ec, sat_ec) - EC)
-    
-    # Calculating optimal water_ec
-    wat_ec = []
-    for i in range(soil.n_states):
-        res = minimize(objective_wat_ec, 0.14, args=(soil.df.water[i], soil.df.clay[i], soil.df.porosity[i], soil.df.solid_ec[i], 
-                                                     soil.df.dry_ec[i], soil.df.sat_ec[i], soil.df.bulk_ec_dc_tc[i]), bounds=[(0, 2)] )
-        wat_ec.append(np.nan if np.isnan(res.fun) else round(res.x[0], soil.roundn) )
-
-    # Saving calculated water_ec and its info
+    # Calculating water_ec in closed form, in the states where it is missing
     missing_water_ec_before = soil.df['water_ec'].isna()
+    missing = missing_water_ec_before.values
+    water_ec = soil.df.water_ec.values.copy()
+    water_ec[missing] = FuWaterEC(*[soil.df[attribute].values[missing] for attribute in ['water', 'clay', 'porosity', 'bulk_ec_dc_tc', 'solid_ec', 'dry_ec', 'sat_ec']])
+    soil.df['water_ec'] = water_ec
 
-    soil.df['water_ec'] = [round(wat_ec[x], soil.roundn+3) 
-                           if np.isnan(soil.df.water_ec[x]) 
-                           else soil.df.water[x] for x in range(soil.n_states) ]
-    
     missing_water_ec_after = soil.df['water_ec'].isna()
     
     soil.info['water_ec'] = [str(soil.info.water_ec[x]) + (
@@ -241,64 +244,74 @@ def fitting_rhoades(soil):
     -----
     - The fitting process involves two steps: first, estimating `water_ec` and `s_ec` with fixed `E` and `F`, and second, estimating `E` and `F` with fixed `water_ec` and `s_ec`.
     - The process uses calibration data where both water content and bulk electrical conductivity are known.
+    - The fit is stored in soil.fits and reused by the next calls with unchanged calibration states (see Soil.update).
 
     External Functions
     ------------------
     - Rhoades : Calculate the soil bulk real electrical conductivity using the Rhoades model and return
     - R2_score : Calculate the coefficient of determination (R^2) of a prediction and return.
     """
-    # Selecting calibration data
+    from scipy.optimize import minimize, Bounds
 
-    arg_EC_wn = np.array([soil.df.bulk_ec_dc_tc[x] if not np.isnan(soil.df.bulk_ec_dc_tc[x]) and not np.isnan(soil.df.water[x]) else np.nan for x in range(soil.n_states)])
-    arg_water_wn = np.array([soil.df.water[x] if not np.isnan(soil.df.bulk_ec_dc_tc[x]) and not np.isnan(soil.df.water[x]) else np.nan for x in range(soil.n_states)])
+    # Fit of a previous call, kept by Soil.update and Soil.append_states while the calibration states are unchanged
+    fit = soil.fits.get('predict.water_ec.fitting_rhoades')
+    if fit is None:
+        # Selecting calibration data
+
+        arg_EC_wn = np.array([soil.df.bulk_ec_dc_tc[x] if not np.isnan(soil.df.bulk_ec_dc_tc[x]) and not np.isnan(soil.df.water[x]) else np.nan for x in range(soil.n_states)])
+        arg_water_wn = np.array([soil.df.water[x] if not np.isnan(soil.df.bulk_ec_dc_tc[x]) and not np.isnan(soil.df.water[x]) else np.nan for x in range(soil.n_states)])
     
-    # Removing NaNs from calibration data
-    valid_indices = ~np.isnan(arg_EC_wn) & ~np.isnan(arg_water_wn)
-    arg_EC = arg_EC_wn[valid_indices]
-    arg_water = arg_water_wn[valid_indices]
+        # Removing NaNs from calibration data
+        valid_indices = ~np.isnan(arg_EC_wn) & ~np.isnan(arg_water_wn)
+        arg_EC = arg_EC_wn[valid_indices]
+        arg_water = arg_water_wn[valid_indices]
     
-    # Define the initial guesses
-    bounds = Bounds([0.00001, 0], [2, 0.1])
-    initial_guess_watec = 0.15
-    initial_guess_s_ec = 0
-    initial_guess_E = 1
-    initial_guess_F = 0.38
-
-    # Defining minimization function to obtain water_ec and s_ec while fixing E and F
-    def objective_water_ec(params, wat, bulk_ec_dc_tc, E, F):
-        water_ec, s_ec = params
-        residuals = (Rhoades(wat, water_ec, s_ec, E, F) - bulk_ec_dc_tc)**2
-        return np.sum(residuals)
-
-    # Calculating optimal water_ec and s_ec
-    res1 = minimize(objective_water_ec, [initial_guess_watec, initial_guess_s_ec], args=(arg_water, arg_EC, initial_guess_E, initial_guess_F), bounds=bounds)
-    best_water_ec, best_s_ecs = res1.x
+        # Define the initial guesses
+        bounds = Bounds([0.00001, 0], [2, 0.1])
+        initial_guess_watec = 0.15
+        initial_guess_s_ec = 0
+        initial_guess_E = 1
+        initial_guess_F = 0.38
+
+        # Defining minimization function to obtain water_ec and s_ec while fixing E and F
+        def objective_water_ec(params, wat, bulk_ec_dc_tc, E, F):
+            water_ec, s_ec = params
+            residuals = (Rhoades(wat, water_ec, s_ec, E, F) - bulk_ec_dc_tc)**2
+            return np.sum(residuals)
+
+        # Calculating optimal water_ec and s_ec
+        res1 = minimize(objective_water_ec, [initial_guess_watec, initial_guess_s_ec], args=(arg_water, arg_EC, initial_guess_E, initial_guess_F), bounds=bounds)
+        best_water_ec, best_s_ecs = res1.x
  
+        # Defining minimization function to obtain E and F while fixing water_ec and s_ec
+        def objective_others(params, wat, bulk_ec_dc_tc, water_ec, s_ec):
+            E, F = params
+            residuals = np.sum((Rhoades(wat, water_ec, s_ec, E, F) - bulk_ec_dc_tc)**2)
+            return residuals
+
+        # Calculating optimal E and F
+        res2 = minimize(objective_others, [initial_guess_E, initial_guess_F], args=(arg_water, arg_EC, best_water_ec, best_s_ecs))
+        best_E, best_F = res2.x
+
+        # Calculating the R2 score of the fitting
+        R2 = round(R2_score(arg_EC, Rhoades(arg_water, best_water_ec, best_s_ecs, best_E, best_F)), soil.roundn)
+        soil.fits['predict.water_ec.fitting_rhoades'] = {'water_ec': best_water_ec, 's_ec': best_s_ecs, 'E': best_E, 'F': best_F, 'R2': R2, 
+                                                         'previous': {'E': soil.E, 'F': soil.F}}
+    else:
+        best_water_ec, best_s_ecs, best_E, best_F, R2 = fit['water_ec'], fit['s_ec'], fit['E'], fit['F'], fit['R2']
+    soil.E = best_E
+    soil.F = best_F
+
     # Saving calculated s_ec and its info
     soil.info['s_ec'] = [str(soil.info.s_ec[x]) + "--> Calculated by fitting Rhoades function in predict.water_ec.fitting_rhoades" if np.isnan(soil.df.s_ec[x])
                             or soil.info.s_ec[x] == str(soil.info.s_ec[x]) + "--> Calculated by fitting Rhoades function in predict.water_ec.fitting_rhoades"
                             else soil.info.s_ec[x] for x in range(soil.n_states)]
     
-    soil.df['s_ec'] = [round(best_s_ecs, soil.roundn+3) if np.isnan(soil.df.s_ec[x]) else soil.df.s_ec[x] for x in range(soil.n_states) ]
-
-    # Defining minimization function to obtain E and F while fixing water_ec and s_ec
-    def objective_others(params, wat, bulk_ec_dc_tc, water_ec, s_ec):
-        E, F = params
-        residuals = np.sum((Rhoades(wat, water_ec, s_ec, E, F) - bulk_ec_dc_tc)**2)
-        return residuals
-
-    # Calculating optimal E and F
-    res2 = minimize(objective_others, [initial_guess_E, initial_guess_F], args=(arg_water, arg_EC, best_water_ec, best_s_ecs))
-    best_E, best_F = res2.x
-    soil.E = best_E
-    soil.F = best_F
-
-    # Calculating the R2 score of the fitting
-    R2 = round(R2_score(arg_EC, Rhoades(arg_water, best_water_ec, best_s_ecs, best_E, best_F)), soil.roundn)
+    soil.df['s_ec'] = [best_s_ecs if np.isnan(soil.df.s_ec[x]) else soil.df.s_ec[x] for x in range(soil.n_states) ]
 
     missing_water_ec_before = soil.df['water_ec'].isna()
 
-    soil.df['water_ec'] = [round(best_water_ec, soil.roundn+3) 
+    soil.df['water_ec'] = [best_water_ec 
                            if np.isnan(soil.df.water_ec[x]) 
                            else soil.df.water_ec[x] for x in range(soil.n_states) ]
 
@@ -315,13 +328,113 @@ def fitting_rhoades(soil):
         for x in range(soil.n_states)]
     
 
-def fitting_hilhorst(soil):
+def fitting_rhoades_bootstrap(soil, n_resamples=200, quantiles=(0.05, 0.5, 0.95), n_jobs=1, seed=None):
+    """
+    Bootstrap the fitting approach of predict.water_ec.fitting_rhoades and return parameter distributions and water_ec intervals
+
+    The calibration states (known water and bulk_ec_dc_tc) are resampled with replacement and the Rhoades model is refitted
+    on each resample with the same two steps as fitting_rhoades. As Rhoades is linear in (water_ec, s_ec) and in (E, F),
+    both steps are solved exactly for all resamples at once by bounded linear least squares.
+    Chunks of resamples can be distributed over a pool of worker processes.
+
+    Parameters
+    ----------
+    soil : Soil Object
+        An object representing the soil, which must have the following attributes:
+        - df: DataFrame
+            Data Frame containing the quantitative information of all soil array-like attributes for each state.
+            includes: `water`, `bulk_ec_dc_tc` and `water_ec`.
+        - roundn: int
+            The number of decimal places for rounding estimated parameter values.
+    n_resamples : int, optional
+        Number of bootstrap resamples.
+    quantiles : sequence of float, optional
+        Quantiles of water_ec returned for each state.
+    n_jobs : int, optional
+        Number of worker processes.
+    seed : int or np.random.Generator, optional
+        Seed of the random number generator.
+
+    Returns
+    -------
+    tuple
+        (parameters, water_ec): DataFrame with the water_ec, s_ec, E, F and R2 of each resample, and DataFrame
+        with the requested quantiles (columns 'q0.05', 'q0.5', ...) of water_ec for each state.
+        States with known water_ec keep their value in every quantile.
+
+    Notes
+    -----
+    The soil object is not modified.
+
+    External Functions
+    ------------------
+    - Rhoades : Calculate the soil bulk real electrical conductivity using the Rhoades model and return
+    - bounded_lstsq2 : Solve a batch of bounded two-parameter linear least-squares problems and return the parameters
+    - map_chunks : Apply a function to each chunk of arguments, optionally in a pool of worker processes, and return the results
+
+    Example
+    -------
+    >>> sample = Soil(water = [0.1, 0.15, 0.2, 0.25, 0.3], bulk_ec_dc_tc = [0.005, 0.009, 0.014, 0.019, 0.027])
+    >>> parameters, water_ec = fitting_rhoades_bootstrap(sample, seed=0)
+    >>> water_ec.loc[0]
+    q0.05    0.118125
+    q0.5     0.125194
+    q0.95    0.130192
+    Name: 0, dtype: float64
+    """
+    # Selecting calibration data
+    valids = ~np.isnan(soil.df.bulk_ec_dc_tc.values) & ~np.isnan(soil.df.water.values)
+    arg_EC = soil.df.bulk_ec_dc_tc.values[valids]
+    arg_water = soil.df.water.values[valids]
+
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    samples = rng.integers(0, len(arg_EC), (n_resamples, len(arg_EC)))
+    chunks = [(arg_water, arg_EC, chunk) for chunk in np.array_split(samples, max(1, min(n_jobs, n_resamples)))]
+    water_ec, s_ec, E, F = [np.concatenate(param) for param in zip(*map_chunks(_fit_rhoades, chunks, n_jobs))]
+
+    # R2 score of each resample over the calibration states, as in fitting_rhoades
+    predicted = Rhoades(arg_water, water_ec[:, np.newaxis], s_ec[:, np.newaxis], E[:, np.newaxis], F[:, np.newaxis])
+    R2 = 1 - np.sum((predicted - arg_EC)**2, axis=1)/np.sum((arg_EC - np.mean(arg_EC))**2)
+    parameters = pd.DataFrame({'water_ec': np.round(water_ec, soil.roundn+3), 's_ec': np.round(s_ec, soil.roundn+3),
+                               'E': E, 'F': F, 'R2': np.round(R2, soil.roundn)})
+
+    known = ~np.isnan(soil.df.water_ec.values)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning) # Resamples without any valid fit
+        intervals = pd.DataFrame({f'q{q:g}': np.where(known, soil.df.water_ec.values, np.nanquantile(parameters.water_ec.values, q))
+                                  for q in quantiles}, index=soil.df.index)
+
+    return parameters, intervals
+
+
+def _fit_rhoades(water, bulk_ec_dc_tc, samples):
+    """
+    Fit the Rhoades model on each resample of the calibration data in the two steps of fitting_rhoades
+
+    Returns
+    -------
+    tuple
+        (water_ec, s_ec, E, F): arrays of shape (n_resamples,).
+    """
+    wat, ec = water[samples], bulk_ec_dc_tc[samples]
+
+    # water_ec and s_ec while fixing E = 1 and F = 0.38
+    water_ec, s_ec, _ = bounded_lstsq2(wat**2 + 0.38*wat, np.ones(wat.shape), ec, lower=(0.00001, 0), upper=(2, 0.1))
+
+    # E and F while fixing water_ec and s_ec
+    E, F, _ = bounded_lstsq2(water_ec[:, np.newaxis]*wat**2, water_ec[:, np.newaxis]*wat, ec - s_ec[:, np.newaxis])
+    return water_ec, s_ec, E, F
+
+
+@predict_call
+def fitting_hilhorst(soil, groups=None):
     """
     Calculate missing values of soil.df.water_ec using the Hilhorst function in a fitting approach
     
-    This function selects calibration data based on available bulk electrical conductivity, bulk permeability, and water permeability, and applies the Hilhorst function
+    This function selects calibration data based on available bulk electrical conductivity, bulk permeability, and water permeability, and fits the Hilhorst function
       to estimate soil water electrical conductivity and an offset parameter for permeability. 
-      It then performs a fitting process to optimize parameters using the objective function that minimizes the residuals between the calculated and observed bulk permeability.
+      As the Hilhorst function is linear in 1/water_ec and offset_perm, the fit is solved exactly as a bounded linear least-squares problem.
+      Stacked sensors can be fitted separately by giving the group of each state, all groups being solved in one vectorized step.
 
     Parameters
     ----------
@@ -337,78 +450,104 @@ def fitting_hilhorst(soil):
             Data Frame containing descriptive information about how each array-like attribute was calculated.
         roundn : int
             Number of decimal places to round results.
+    groups : array-like, optional
+        Group of each state, e.g. the sensor that measured it. Each group is fitted on its own calibration states,
+        and states with a NaN or None group are not fitted. Default is a single group.
 
     Returns
     -------
-    None
-        The function updates the `soil` object's `df` and `info` attributes with estimated values and additional information regarding the calculation.
+    DataFrame
+        Fit report of each group: water_ec, offset_perm, R2 and RMSE of bulk_perm, and number of calibration states.
 
     External Functions
     ------------------
+    Temperature : Set missing values of soil.df.temperature and return
+    FrequencyEC : Return and set missing values of the soil.df.frequency_ec attribute
+    shift_to_bulk_ec_dc_tc : Compute missing values of soil.df.bulk_ec_dc_tc based on soil.df.bulk_ec or soil.df.bulk_ec_dc
     WaterPerm : Calculate or set missing values of soil.df.water_perm and return
     Hilhorst : Calculate the soil bulk real relative dielectric permittivity using the Hilhorst model and return
-    R2_score : Calculate the coefficient of determination (R^2) of a prediction and return.
+    bounded_lstsq2 : Solve a batch of bounded two-parameter linear least-squares problems and return the parameters
 
     Notes
     -----
     - The function targets soil states with known bulk electrical conductivity and bulk permeability greater than or equal to 10.
-    - A least squares optimization is used to find the best parameters that fit the Hilhorst function to the calibration data.
+    - water_ec is bounded between 0.00001 and 2 S/m, and offset_perm between -10 and 10.
+    - The fit is stored in soil.fits and reused by the next calls with unchanged calibration states and groups (see Soil.update).
+      The groups of a stored fit are used when no groups are given, new states having no group.
+
+    Example
+    -------
+    >>> sample = Soil(bulk_ec = [0.02, 0.03, 0.04, 0.02, 0.03, 0.04], bulk_perm = [11.5, 14.8, 17, 12.5, 16.8, 20], water_ec = np.nan)
+    >>> fitting_hilhorst(sample, groups = ['A', 'A', 'A', 'B', 'B', 'B'])
+       water_ec  offset_perm     R2      RMSE  n_states
+    A  0.290909     6.183333  0.987  0.259272         3
+    B  0.213333     5.183333  0.993  0.259272         3
     """
+    Temperature(soil)
+    FrequencyEC(soil)
+    shift_to_bulk_ec_dc_tc(soil)
     WaterPerm(soil)
 
-    # Selecting calibration data
-    arg_EC_wn = np.array([soil.df.bulk_ec_dc_tc[x] if not np.isnan(soil.df.bulk_ec_dc_tc[x]) and not np.isnan(soil.df.bulk_perm[x]) and soil.df.bulk_perm[x]>=10 
-                            else np.nan for x in range(soil.n_states)])
-    arg_bulk_perm_wn = np.array([soil.df.bulk_perm[x] if not np.isnan(soil.df.bulk_ec_dc_tc[x]) and not np.isnan(soil.df.bulk_perm[x]) and soil.df.bulk_perm[x]>=10 
-                              else np.nan for x in range(soil.n_states)])
-    arg_water_perm_wn = np.array([soil.df.water_perm[x] if not np.isnan(soil.df.bulk_ec_dc_tc[x]) and not np.isnan(soil.df.bulk_perm[x]) and soil.df.bulk_perm[x]>=10 
-                               else np.nan for x in range(soil.n_states)])
-
-    # Removing NaNs from calibration data
-    valid_indices = ~np.isnan(arg_EC_wn) & ~np.isnan(arg_bulk_perm_wn)
-    arg_EC = arg_EC_wn[valid_indices]
-    arg_bulk_perm = arg_bulk_perm_wn[valid_indices]
-    arg_water_perm = arg_water_perm_wn[valid_indices]
-    
-    # Define the initial guesses
-    bounds = Bounds([0.00001, -10], [2, 10])
-    initial_guess_offset_perm = 4
-    initial_guess_watec = 0.15
-
-    # Defining minimization function
-    def objective_water_ec(param, bulk_perm, bulk_ec_dc_tc, water_perm):
-        water_ec, offset_perm = param
-        residuals = (Hilhorst(bulk_ec_dc_tc, water_ec, water_perm, offset_perm) - bulk_perm)**2
-        return np.sum(residuals)
-
-    # Calculating optimal water_ec and offset_perm
-    res = minimize(objective_water_ec, [initial_guess_watec, initial_guess_offset_perm], args=(arg_bulk_perm, arg_EC, arg_water_perm), bounds=bounds)
-    best_water_ec, best_offset_perm = res.x
+    # Fit of a previous call, kept by Soil.update and Soil.append_states while the calibration states are unchanged
+    fit = soil.fits.get('predict.water_ec.fitting_hilhorst')
+    stored = None if fit is None else fit.get('groups')
+    if groups is None and stored is not None:
+        groups = list(stored) + [None]*(soil.n_states - len(stored))
+    codes, labels = pd.factorize(np.zeros(soil.n_states, dtype=int) if groups is None else np.asarray(groups, dtype=object))
+
+    # Calibration states of each group, as rows of weights
+    bulk_ec_dc_tc, bulk_perm, water_perm = soil.df.bulk_ec_dc_tc.values, soil.df.bulk_perm.values, soil.df.water_perm.values
+    calibration = ~np.isnan(bulk_ec_dc_tc) & ~np.isnan(bulk_perm) & (bulk_perm >= 10)
+    weights = calibration & (codes == np.arange(len(labels))[:, np.newaxis])
+    n_calibration = weights.sum(axis=1)
+
+    # The fit is reused while the states of the stored fit keep their groups
+    regrouped = groups is not None and (stored is None or not pd.Series(list(groups)[:len(stored)], dtype=object).equals(pd.Series(stored, dtype=object)))
+    if fit is None or regrouped or list(labels) != list(fit.get('labels', [0])):
+        shape = weights.shape
+        inverse_water_ec, best_offset_perm, sse = bounded_lstsq2(np.broadcast_to(bulk_ec_dc_tc*water_perm, shape), np.ones(shape), np.broadcast_to(bulk_perm, shape),
+                                                                 lower=(1/2, -10), upper=(1/0.00001, 10), weights=weights)
+        best_water_ec = np.where(n_calibration > 0, 1/inverse_water_ec, np.nan)
+        best_offset_perm = np.where(n_calibration > 0, best_offset_perm, np.nan)
+
+        # R2 score and RMSE of the fitting of each group
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.nansum(np.where(weights, bulk_perm, 0), axis=1)/n_calibration
+            ss_tot = np.nansum(np.where(weights, (bulk_perm - mean[:, np.newaxis])**2, 0), axis=1)
+            R2 = np.round(1 - sse/ss_tot, soil.roundn)
+            RMSE = np.sqrt(sse/n_calibration)
+        soil.fits['predict.water_ec.fitting_hilhorst'] = {'water_ec': best_water_ec, 'offset_perm': best_offset_perm, 'R2': R2, 'RMSE': RMSE,
+                                                          'labels': list(labels), 'groups': None if groups is None else list(groups), 'previous': {}}
+    else:
+        best_water_ec, best_offset_perm, R2 = [np.atleast_1d(np.asarray(fit[key], dtype=np.float64)) for key in ['water_ec', 'offset_perm', 'R2']]
+        RMSE = np.atleast_1d(np.asarray(fit.get('RMSE', np.nan), dtype=np.float64))
+
+    # Parameters of the group of each state
+    fitted = codes >= 0
+    state_water_ec = np.where(fitted, best_water_ec[codes], np.nan)
+    state_offset_perm = np.where(fitted, best_offset_perm[codes], np.nan)
+    state_R2 = np.where(fitted, R2[codes], np.nan)
 
     # Saving calculated offset_perm and its info
-    soil.info['offset_perm'] = [str(soil.info.offset_perm[x]) + "--> Calculated by fitting Hilhorst function in predict.water_ec.fitting_hilhorst" if np.isnan(soil.df.offset_perm[x]) 
-                                or soil.info.offset_perm[x] == str(soil.info.offset_perm[x]) + "--> Calculated by fitting Hilhorst function in predict.water_ec.fitting_hilhorst"
-                                 else soil.info.offset_perm[x] for x in range(soil.n_states)]
-    
-    soil.df['offset_perm'] = [round(best_offset_perm, soil.roundn+3) if np.isnan(soil.df.offset_perm[x]) else soil.df.offset_perm[x] for x in range(soil.n_states) ]
-
-    # Calculating the R2 score of the fitting
-    R2 = round(R2_score(arg_bulk_perm, Hilhorst(arg_EC, best_water_ec, arg_water_perm, best_offset_perm)), soil.roundn)
-    
-    missing_water_ec_before = soil.df['water_ec'].isna()
-
-    soil.df['water_ec'] = [round(best_water_ec, soil.roundn+3) 
-                           if np.isnan(soil.df.water_ec[x]) 
-                           else soil.df.water_ec[x] for x in range(soil.n_states) ]
-
-    missing_water_ec_after = soil.df['water_ec'].isna()
-    
-    soil.info['water_ec'] = [str(soil.info.water_ec[x]) + (
-            "--> Calculated by fitting (R2="+str(R2)+") Hilhorst function in predict.water_ec.fitting_hilhorst"
-            if missing_water_ec_before[x] and not missing_water_ec_after[x]
-            else "--> Provide water_ec; otherwise, bulk_perm and bulk_ec_dc_tc"
-            if missing_water_ec_before[x] and missing_water_ec_after[x]
-            else "")
-        if missing_water_ec_before[x]
-        else soil.info.water_ec[x]
-        for x in range(soil.n_states)]
+    missing_offset_perm_before = np.isnan(soil.df.offset_perm.values)
+    soil.df['offset_perm'] = np.where(missing_offset_perm_before, state_offset_perm, soil.df.offset_perm.values)
+    missing_offset_perm_after = soil.df['offset_perm'].isna().values
+
+    info = soil.info['offset_perm'].to_numpy(dtype=object).copy()
+    info[missing_offset_perm_before] = [str(i) + ("--> Calculated by fitting Hilhorst function in predict.water_ec.fitting_hilhorst"
+                                                  if not missing else "--> Provide offset_perm; otherwise, bulk_perm and bulk_ec_dc_tc")
+                                        for i, missing in zip(info[missing_offset_perm_before], missing_offset_perm_after[missing_offset_perm_before])]
+    soil.info['offset_perm'] = info
+
+    missing_water_ec_before = soil.df['water_ec'].isna().values
+    soil.df['water_ec'] = np.where(missing_water_ec_before, state_water_ec, soil.df.water_ec.values)
+    missing_water_ec_after = soil.df['water_ec'].isna().values
+
+    info = soil.info['water_ec'].to_numpy(dtype=object).copy()
+    info[missing_water_ec_before] = [str(i) + ("--> Calculated by fitting (R2="+str(r2)+") Hilhorst function in predict.water_ec.fitting_hilhorst"
+                                               if not missing else "--> Provide water_ec; otherwise, bulk_perm and bulk_ec_dc_tc")
+                                     for i, r2, missing in zip(info[missing_water_ec_before], state_R2[missing_water_ec_before], missing_water_ec_after[missing_water_ec_before])]
+    soil.info['water_ec'] = info
+
+    return pd.DataFrame({'water_ec': best_water_ec, 'offset_perm': best_offset_perm, 'R2': R2, 'RMSE': RMSE,
+                         'n_states': n_calibration}, index=pd.Index(labels) if groups is not None else None)
@@ -0,0 +1,185 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+from pedophysics.pedophysical_models.water import LR, LR_W, LR_MV, Fu
+from pedophysics.utils.precision import predict_call
+
+from .temperature import Temperature
+from .frequency_perm import FrequencyPerm
+from .frequency_ec import FrequencyEC
+from .texture import Texture
+from .porosity import Porosity
+from .air_perm import AirPerm
+from .solid_perm import SolidPerm
+from .water_perm import WaterPerm
+from .solid_ec import SolidEC
+from .bulk_ec_dc_tc import shift_to_bulk_ec_dc_tc
+
+# Soil properties that can be given as distributions or sample arrays
+ENSEMBLE_PROPERTIES = ['bulk_perm', 'bulk_ec_dc_tc', 'clay', 'porosity', 'water_ec', 'water_perm', 'air_perm',
+                       'solid_perm', 'CEC', 'solid_ec', 'dry_ec', 'sat_ec']
+
+
+@predict_call
+def WaterEnsemble(soil, samples, n_samples=1000, quantiles=(0.05, 0.5, 0.95), seed=None, return_samples=False):
+    """
+    Propagate input uncertainty to soil.df.water and return per-state quantiles
+
+    Every ensemble member is evaluated in one vectorized pass: the uncertain inputs are carried as
+    (n_samples, n_states) arrays through the closed-form inversions used by predict.Water in its non-fitting approaches.
+    States with known bulk_perm are inverted with LR_MV, LR or LR_W depending on the frequency_perm band,
+    and the remaining states with known bulk_ec_dc_tc are inverted with Fu. States with known water are returned as constants.
+
+    Parameters
+    ----------
+    soil : object
+        A custom soil object containing:
+
+        - df : DataFrame
+            Data Frame containing the quantitative information of all soil array-like attributes for each state.
+            Includes: water, bulk_perm, bulk_ec_dc_tc, frequency_perm and the properties of the inversion models.
+        - alpha : single-value or array-like
+            Soil alpha exponent as defined in volumetric mixing theory [-]
+        - n_states : int
+            Number of soil states.
+    samples : dict
+        Uncertain inputs, mapping a property of ENSEMBLE_PROPERTIES to either:
+
+        - an array broadcastable to (n_samples, n_states), e.g. (n_samples, 1) for a draw shared by all states.
+        - a tuple ('normal', sd) for absolute gaussian noise around the soil.df value of each state.
+        - a tuple ('relative', rsd) for relative gaussian noise around the soil.df value of each state.
+        - a tuple ('uniform', half_width) for absolute uniform noise around the soil.df value of each state.
+    n_samples : int, optional
+        Number of ensemble members for distribution inputs.
+    quantiles : sequence of float, optional
+        Quantiles returned for each state.
+    seed : int or np.random.Generator, optional
+        Seed of the random number generator.
+    return_samples : bool, optional
+        If True, the (n_samples, n_states) water array is also returned.
+
+    Returns
+    -------
+    DataFrame
+        Mean, standard deviation and the requested quantiles (columns 'q0.05', 'q0.5', ...) of the water content of each state.
+        If return_samples is True, a tuple (DataFrame, np.ndarray) is returned.
+
+    Notes
+    -----
+    Missing deterministic inputs are first completed in-place as in predict.Water (e.g. temperature, water_perm, porosity).
+    Negative water contents are set to zero. States whose water can only be obtained by fitting approaches, or
+    with frequency_perm below 30 MHz, are returned as NaN.
+
+    External functions
+    --------
+    Temperature, FrequencyPerm, FrequencyEC, Texture, Porosity, AirPerm, SolidPerm, WaterPerm, SolidEC : Set or calculate missing values of the deterministic inputs
+    shift_to_bulk_ec_dc_tc : Compute missing values of soil.df.bulk_ec_dc_tc based on soil.df.bulk_ec or soil.df.bulk_ec_dc
+    LR_MV, LR, LR_W : Calculate the soil volumetric water content using the Lichtenecker and Rother models
+    Fu : Calculate the soil volumetric water content using the Fu model and return
+
+    Example
+    -------
+    >>> sample = Soil(bulk_perm = [8, 12, 20], clay = 10, porosity = 0.45, instrument = 'GPR')
+    >>> WaterEnsemble(sample, {'bulk_perm': ('relative', 0.05), 'clay': ('normal', 3)}, seed=0)
+        mean    std     q0.05   q0.5    q0.95
+    0   0.121   0.008   0.108   0.121   0.134
+    1   0.193   0.010   0.177   0.193   0.209
+    2   0.301   0.012   0.281   0.301   0.320
+    """
+    Temperature(soil)
+    FrequencyPerm(soil)
+    FrequencyEC(soil)
+    shift_to_bulk_ec_dc_tc(soil)
+    Texture(soil)
+    Porosity(soil)
+    AirPerm(soil)
+    SolidPerm(soil)
+    WaterPerm(soil)
+    SolidEC(soil)
+
+    for prop in samples:
+        if prop not in ENSEMBLE_PROPERTIES:
+            raise ValueError(f"'{prop}' must be one of {ENSEMBLE_PROPERTIES}")
+
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    draws = {prop: ensemble_draws(soil.df[prop].values, samples.get(prop), n_samples, rng) for prop in ENSEMBLE_PROPERTIES}
+    n_samples = max([draw.shape[0] for draw in draws.values() if draw.ndim == 2], default=1)
+
+    def given(prop):
+        return ~np.isnan(draws[prop]).all(axis=0) if draws[prop].ndim == 2 else ~np.isnan(draws[prop])
+
+    def at(prop, mask):
+        return draws[prop][..., mask]
+
+    water = np.full((n_samples, soil.n_states), np.nan)
+    known_water = ~np.isnan(soil.df.water.values)
+    water[:, known_water] = soil.df.water.values[known_water]
+
+    # Non-fitting inversions of bulk_perm by frequency band, as in predict.water_from_perm.non_fitting
+    freq = soil.df.frequency_perm.values
+    alpha = np.broadcast_to(np.where(np.isnan(soil.alpha), 0.5, soil.alpha), soil.n_states)
+    from_perm = ~known_water & given('bulk_perm')
+    bands = [((freq >= 30e6) & (freq < 100e6), lambda m: LR_MV(at('bulk_perm', m), at('porosity', m), at('air_perm', m), at('solid_perm', m), at('water_perm', m), at('CEC', m))),
+             ((freq >= 100e6) & (freq < 200e6), lambda m: LR(at('bulk_perm', m), at('porosity', m), at('air_perm', m), at('solid_perm', m), at('water_perm', m), alpha[m])),
+             ((freq >= 200e6) & (freq <= 30e9), lambda m: LR_W(at('bulk_perm', m), at('porosity', m), at('air_perm', m), at('solid_perm', m), at('water_perm', m), at('clay', m)))]
+    for band, model in bands:
+        mask = from_perm & band
+        if mask.any():
+            water[:, mask] = model(mask)
+
+    # Non-fitting inversion of bulk_ec_dc_tc, as in predict.water_from_ec.non_fitting
+    from_ec = ~known_water & np.isnan(water).all(axis=0) & given('bulk_ec_dc_tc')
+    if from_ec.any():
+        water[:, from_ec] = Fu(at('bulk_ec_dc_tc', from_ec), at('clay', from_ec), at('porosity', from_ec), at('water_ec', from_ec),
+                               at('solid_ec', from_ec), at('dry_ec', from_ec), at('sat_ec', from_ec))
+
+    water = np.where(water < 0, 0, water) # Converting negative results to zero as in predict.Water
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning) # States without any valid ensemble member
+        result = pd.DataFrame({'mean': np.nanmean(water, axis=0), 'std': np.nanstd(water, axis=0)}, index=soil.df.index)
+        for q in quantiles:
+            result[f'q{q:g}'] = np.nanquantile(water, q, axis=0)
+
+    return (result, water) if return_samples else result
+
+
+def ensemble_draws(values, spec, n_samples, rng):
+    """
+    Build the ensemble of one soil property and return
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Soil property value of each state.
+    spec : None, array-like or tuple
+        Sample array broadcastable to (n_samples, n_states), or distribution tuple ('normal', sd),
+        ('relative', rsd) or ('uniform', half_width) around `values`. If None, `values` is returned unchanged.
+    n_samples : int
+        Number of ensemble members for distribution specifications.
+    rng : np.random.Generator
+        Random number generator.
+
+    Returns
+    -------
+    np.ndarray
+        `values` if the property is certain, otherwise an array of shape (n_samples, n_states).
+    """
+    if spec is None:
+        return values
+
+    if isinstance(spec, tuple):
+        kind, width = spec
+        if kind == 'normal':
+            return values + rng.normal(0, width, (n_samples, len(values)))
+        if kind == 'relative':
+            return values*(1 + rng.normal(0, width, (n_samples, len(values))))
+        if kind == 'uniform':
+            return values + rng.uniform(-width, width, (n_samples, len(values)))
+        raise ValueError(f"Unknown distribution '{kind}'. Must be one of ['normal', 'relative', 'uniform']")
+
+    spec = np.asarray(spec, dtype=float)
+    if spec.ndim == 1:
+        spec = spec[:, np.newaxis]
+    return np.broadcast_to(spec, (spec.shape[0], len(values)))
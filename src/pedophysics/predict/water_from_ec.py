@@ -1,8 +1,12 @@
 import numpy as np
-from scipy.optimize import minimize
 
 from pedophysics.utils.stats import R2_score
 from pedophysics.pedophysical_models.bulk_ec import Fu, WunderlichEC
+from pedophysics.utils.precision import predict_call
+from pedophysics.utils.missing import computable
+from pedophysics.utils.solvers import bisection
+from pedophysics.utils.strategy import choose, provenance
+from pedophysics.utils.diagnostics import TOLERANCES, record
 
 from .water_ec import WaterEC
 from .porosity import Porosity
@@ -11,6 +15,7 @@ from .frequency_ec import FrequencyEC
 from .texture import Texture
 
 
+@predict_call
 def WaterFromEC(soil):
     """ 
     Calculate missing values of soil.df.water based on soil.df.bulk_ec_dc_tc 
@@ -102,7 +107,8 @@ def non_fitting(soil):
     Notes
     -----
     - The Fu function is utilized in a minimization process to estimate water content by minimizing the difference between the estimated and actual bulk ECDCTC.
-    - The estimation process is applied to each soil state where water content is unknown.
+    - The estimation process is applied to each soil state where water content is unknown and bulk_ec_dc_tc, clay and porosity are known.
+    - The diagnostics of each inverted state are recorded in soil.diagnostics['predict.water_from_ec.non_fitting'].
 
 
     External functions
@@ -112,28 +118,35 @@ def non_fitting(soil):
     Porosity: Calculate missing values of soil.df.porosity and return
     WaterEC: Compute missing values of soil.df.water_ec and return  
     SolidEC: Set missing values of soil.df.solid_ec and return
+    computable: Return the mask of the states where soil.df[attribute] is missing and all the inputs of its model are known
+    record: Record the diagnostics of an inversion in soil.diagnostics and return its solutions
     """    
+    from scipy.optimize import minimize
     Texture(soil)
     Porosity(soil)
     WaterEC(soil)
     SolidEC(soil)
 
-    # Defining minimization function to obtain water using Fu
-    def objective_func_wat(x, clay, porosity, water_ec, solid_ec, dry_ec, sat_ec, EC):
-        return (Fu(x, clay, porosity, water_ec, solid_ec, dry_ec, sat_ec) - EC)**2
-    wat = []
-
-    # Calculating water
-    for i in range(soil.n_states):
-        
+    # Defining minimization function to obtain water using Fu, relative to the scale of bulk_ec_dc_tc so that the
+    # solver's tolerances on the objective and its gradient hold for small bulk_ec_dc_tc as for large ones
+    def objective_func_wat(x, clay, porosity, water_ec, solid_ec, dry_ec, sat_ec, EC, scale):
+        return ((Fu(x, clay, porosity, water_ec, solid_ec, dry_ec, sat_ec) - EC)/scale)**2
+    water = soil.df.water.values.copy()
+
+    # Calculating water only in the states where it is missing and bulk_ec_dc_tc is known
+    states = computable(soil, 'water', ['clay', 'porosity', 'bulk_ec_dc_tc'])
+    scale = np.maximum(np.abs(soil.df.bulk_ec_dc_tc.values), TOLERANCES['predict.water_from_ec.non_fitting'][1])
+    solution, iterations, residual, status = np.full((4, np.sum(states)), np.nan)
+    for j, i in enumerate(np.flatnonzero(states)):
         res = minimize(objective_func_wat, 0.15, args=(soil.df.clay[i], soil.df.porosity[i], soil.df.water_ec[i], soil.df.solid_ec[i], 
-                                                        soil.df.dry_ec[i], soil.df.sat_ec[i], soil.df.bulk_ec_dc_tc[i]), bounds=[(0, .65)] )
-        wat.append(np.nan if np.isnan(res.fun) else round(res.x[0], soil.roundn) )
+                                                        soil.df.dry_ec[i], soil.df.sat_ec[i], soil.df.bulk_ec_dc_tc[i], scale[i]), bounds=[(0, .65)] )
+        solution[j], iterations[j], residual[j], status[j] = res.x[0], res.nit, np.sqrt(res.fun)*scale[i], res.status
+    water[states] = record(soil, 'predict.water_from_ec.non_fitting', states, solution, residual, iterations, soil.df.bulk_ec_dc_tc.values[states], (0, .65), status)
 
     # Check for missing values
     missing_water_before = soil.df['water'].isna()
 
-    soil.df['water'] = [round(wat[i], soil.roundn) if np.isnan(soil.df.water[i]) else soil.df.water[i] for i in range(soil.n_states) ]
+    soil.df['water'] = water
     missing_water_after = soil.df['water'].isna()
 
     # Update info for calculated water
@@ -183,25 +196,38 @@ def fitting(soil):
     -----
     This function modifies the soil object in-place by updating the `df` and `info` dataframes.
     The function either estimates or uses the known Lw parameter for the WunderlichEC model and 
-    fits the model to the calibration data.
+    fits the model to the calibration data. The fit is stored in soil.fits, and the next calls 
+    with unchanged calibration states only calculate the missing water values (see Soil.update).
+    The diagnostics of each inverted state are recorded in soil.diagnostics['predict.water_from_ec.fitting'].
 
     External Functions
     ------------------
     WunderlichEC: Calculate the soil bulk real electrical conductivity using the Wunderlich model and return
     WaterEC: Compute missing values of soil.df.water_ec and return  
+    bisection: Solve a batch of monotonic equations function(x) = 0 inside bounds and return the solutions
+    choose: Return the path of an inversion for n states according to the strategy of the running predict call
+    record: Record the diagnostics of an inversion in soil.diagnostics and return its solutions
     """
+    from scipy.optimize import minimize
 
     WaterEC(soil) 
+
+    # Fit of a previous call, kept by Soil.update and Soil.append_states while the calibration states are unchanged
+    fit = soil.fits.get('predict.water_from_ec.fitting')
+    previous_Lw = soil.Lw
     
     # Defining model parameters
-    valids = ~np.isnan(soil.df.water) & ~np.isnan(soil.df.bulk_ec_dc_tc) # States where calibration data are
-    water_init = np.nanmin(soil.df.water[valids])
-    bulk_ec_init = np.nanmin(soil.df.bulk_ec_dc_tc[valids])
-    bulk_ec_final = np.nanmax(soil.df.bulk_ec_dc_tc[valids])
-    bulk_ec_range = [round(bulk_ec_init - (bulk_ec_final-bulk_ec_init)/soil.range_ratio, soil.roundn), 
-                     round(bulk_ec_final + (bulk_ec_final-bulk_ec_init)/soil.range_ratio, soil.roundn)]
-    if bulk_ec_range[0] < 0:
-        bulk_ec_range[0] = 0
+    if fit is None:
+        valids = ~np.isnan(soil.df.water) & ~np.isnan(soil.df.bulk_ec_dc_tc) # States where calibration data are
+        water_init = np.nanmin(soil.df.water[valids])
+        bulk_ec_init = np.nanmin(soil.df.bulk_ec_dc_tc[valids])
+        bulk_ec_final = np.nanmax(soil.df.bulk_ec_dc_tc[valids])
+        bulk_ec_range = [round(bulk_ec_init - (bulk_ec_final-bulk_ec_init)/soil.range_ratio, soil.roundn), 
+                         round(bulk_ec_final + (bulk_ec_final-bulk_ec_init)/soil.range_ratio, soil.roundn)]
+        if bulk_ec_range[0] < 0:
+            bulk_ec_range[0] = 0
+    else:
+        water_init, bulk_ec_init, bulk_ec_range, soil.Lw = fit['water_init'], fit['bulk_ec_init'], fit['bulk_ec_range'], fit['Lw']
 
     # Obtain Lw attribute if unknown
     if np.isnan(soil.Lw):
@@ -220,24 +246,37 @@ def fitting(soil):
     if ~np.isnan(soil.Lw):
         if not isinstance(soil.Lw, np.floating):
             soil.Lw = soil.Lw[0]
-        Wat_wund = []
 
         # Defining minimization function to obtain water
         def objective_wat(wat, i):
             Wat_RMSE = np.sqrt((WunderlichEC(wat, bulk_ec_init, water_init, soil.df.water_ec[i], soil.Lw) - soil.df.bulk_ec_dc_tc[i])**2)
             return Wat_RMSE
         
-        # Looping over soil states to obtain water using WunderlichEC function
-        for i in range(soil.n_states):
-            if (min(bulk_ec_range) <= soil.df.bulk_ec_dc_tc[i] <= max(bulk_ec_range)) & ~np.isnan(soil.df.bulk_ec_dc_tc[i]):
+        # Inverting WunderlichEC in the states inside the regression range
+        bulk_ec_dc_tc = soil.df.bulk_ec_dc_tc.values
+        with np.errstate(invalid='ignore'):
+            solved = ((fit is None) | np.isnan(soil.df.water.values)) & (bulk_ec_dc_tc >= min(bulk_ec_range)) & (bulk_ec_dc_tc <= max(bulk_ec_range))
+        Wat_wund = np.full(soil.n_states, np.nan)
+        path = choose(soil, 'water from bulk_ec_dc_tc', 'water', np.sum(solved))
+        if path == 'bisection':
+            water_ec = soil.df.water_ec.values[solved]
+            wunderlich = lambda wat: WunderlichEC(wat, bulk_ec_init, water_init, water_ec, soil.Lw) - bulk_ec_dc_tc[solved]
+            solution, iterations = bisection(wunderlich, np.zeros(np.sum(solved)), .65, full_output=True)
+            residual, status = np.abs(wunderlich(solution)), 0
+        else:
+            solution, iterations, residual, status = np.full((4, np.sum(solved)), np.nan)
+            for j, i in enumerate(np.flatnonzero(solved)):
                 result = minimize(objective_wat, 0.15, args=(i), bounds=[(0, .65)], method='L-BFGS-B')
-                Wat_wund.append(np.nan if np.isnan(result.fun) else round(result.x[0], soil.roundn))
-
-            else:
-                Wat_wund.append(np.nan)
+                solution[j], iterations[j], residual[j], status[j] = result.x[0], result.nit, result.fun, result.status
+        Wat_wund[solved] = record(soil, 'predict.water_from_ec.fitting', solved, solution, residual, iterations, bulk_ec_dc_tc[solved], (0, .65), status)
 
         # Calculating the R2 score of the model fitting
-        R2 = round(R2_score(soil.df.water[valids], np.array(Wat_wund)[valids]), soil.roundn)
+        if fit is None:
+            R2 = round(R2_score(soil.df.water[valids], np.array(Wat_wund)[valids]), soil.roundn)
+            soil.fits['predict.water_from_ec.fitting'] = {'water_init': water_init, 'bulk_ec_init': bulk_ec_init, 'bulk_ec_range': bulk_ec_range, 
+                                                          'Lw': soil.Lw, 'R2': R2, 'previous': {'Lw': previous_Lw}}
+        else:
+            R2 = fit['R2']
     
         missing_water_before = soil.df['water'].isna()  
 
@@ -246,7 +285,7 @@ def fitting(soil):
         missing_water_after = soil.df['water'].isna()  
 
         soil.info['water'] = [str(soil.info.water[x]) + (
-                "--> Calculated by fitting (R2="+str(R2)+") WunderlichEC function in predict.water_from_ec.fitting, for soil.bulk_ec values between: "+str(bulk_ec_range)
+                "--> Calculated by fitting (R2="+str(R2)+") WunderlichEC function in predict.water_from_ec.fitting, for soil.bulk_ec values between: "+str(bulk_ec_range)+provenance(soil, path)
                 if missing_water_before[x] and not missing_water_after[x]
                 else "--> Provide water; otherwise, bulk_ec_dc_tc and water_ec. Regression valid for bulk_ec_dc_tc values between: "+str(bulk_ec_range)
                 if missing_water_before[x] and missing_water_after[x]
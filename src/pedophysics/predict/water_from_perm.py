@@ -1,10 +1,17 @@
 import numpy as np
-from scipy.optimize import minimize
+import pandas as pd
 import warnings
 
 from pedophysics.utils.stats import R2_score
+from pedophysics.utils.solvers import golden_section, bisection, tabulated_inverse
+from pedophysics.utils.parallel import map_chunks
 from pedophysics.pedophysical_models.water import LR, LR_W, LR_MV
 from pedophysics.pedophysical_models.bulk_perm import WunderlichP, LongmireSmithP
+from pedophysics.utils.precision import predict_call
+from pedophysics.utils.validity import check
+from pedophysics.utils.missing import computable
+from pedophysics.utils.strategy import choose, provenance
+from pedophysics.utils.diagnostics import record
 
 from .bulk_perm_inf import BulkPermInf
 from .porosity import Porosity
@@ -14,13 +21,14 @@ from .water_perm import WaterPerm
 from .texture import Texture
 
 
+@predict_call
 def WaterFromPerm(soil):
     """ 
     Calculate missing values of soil.df.water based on soil.df.bulk_perm
 
-    This function checks if the permittivity frequency (`frequency_perm`) across all soil states is constant. 
-    If it is, a specific adjustment is made using the `fixed_freq` function. 
-    If the frequencies vary across soil states, a different adjustment is applied using the `changing_freq` function.
+    This function partitions the soil states by permittivity frequency (`frequency_perm`). 
+    The states sharing the same frequency are processed together with the `fixed_freq` function, which applies the fitting approach when calibration data are available.
+    The remaining states are then processed in one pass per frequency band by the `non_fitting` function, so datasets mixing instruments are handled as single-instrument ones.
 
     Parameters
     ----------
@@ -32,6 +40,8 @@ def WaterFromPerm(soil):
             Includes: water and frequency_perm.
         - info : DataFrame
             Data Frame containing descriptive information about how each attribute was determined or modified.
+        - Lw : float
+            Soil scalar depolarization factor of water aggregates (effective medium theory)
         - n_states : int
             Number of states or records in the dataframe.
 
@@ -39,10 +49,14 @@ def WaterFromPerm(soil):
     -------
     None
 
+    Notes
+    -----
+    If soil.Lw is unknown, it is fitted for each frequency and soil.Lw holds the value of the last fitted frequency.
+
     External functions
     --------
-    fixed_freq: Decide between fitting and non-fitting approaches to calculate soil.df.water
-    changing_freq: Calculate missing values of soil.df.bulk_dc_ec when soil.df.frequency_perm is not constant
+    fixed_freq: Calculate missing values of soil.df.water for the states sharing one frequency using a fitting approach
+    non_fitting: Calculate missing values of soil.df.water using a non-fitting approach.
 
     Example
     -------
@@ -57,118 +71,25 @@ def WaterFromPerm(soil):
     2    0.246
     Name: water, dtype: float64
     """
-    # Condition for constant permittivity frequency
-    if np.all(soil.df.frequency_perm == soil.df.frequency_perm[0]):
-        fixed_freq(soil)
-
-    # Condition for changing permittivity frequency
-    else:
-        changing_freq(soil)
-
+    frequency_perm = soil.df.frequency_perm.values
+    Lw = soil.Lw
 
-def changing_freq(soil):    
-    """ 
-    Calculate missing values of soil.df.bulk_dc_ec when soil.df.frequency_perm is not constant.
-
-    This function iterates through soil states to calculate the bulk EC for states where it is undefined. 
-    The calculation is performed by minimizing the difference between the calculated permeability using the Longmire-Smith P function and the known bulk permeability. 
-    Warnings are issued for soil states where the Longmire-Smith P function's applicability is uncertain due to soil conditions.
+    # Fitting approach for each group of states sharing the same permittivity frequency
+    for freq in np.unique(frequency_perm[~np.isnan(frequency_perm)]):
+        soil.Lw = Lw # Unless given, Lw is fitted for each frequency
+        fixed_freq(soil, frequency_perm == freq)
 
-    Parameters
-    ----------
-    soil : object
-        A custom soil object that contains:
-
-        - df : DataFrame
-            Data Frame containing the quantitative information of all soil array-like attributes for each state.
-            Includes: frequency_perm, frequency_ec, bulk_ec_dc, and bulk_perm.
-        - info : DataFrame
-            Data Frame containing descriptive information about how each array-like attribute was determined or modified.
-        - n_states : int
-            Number of soil states.
-
-    Returns
-    -------
-    None
-        The function directly modifies the `soil` object's `df` and `info` attributes and does not return any value.
-
-    External Functions
-    ------------------
-    Texture : Calculate missing values of soil.df.sand, soil.df.silt, and soil.df.clay and return
-    BulkPermInf : Set missing values of soil.df.bulk_perm_inf and return
-    LongmireSmithP : Calculate the soil bulk real relative dielectric permittivity using the Wunderlich model and return
-
-    Notes
-    -----
-    - The function uses the `scipy.optimize.minimize` method for the minimization process.
-    - Warnings are issued for soil states where the frequency of permittivity exceeds 200 MHz and either clay content is above 10% or sand content is below 90%, as the validity of the Longmire-Smith P model is uncertain in these conditions.
+    # Condition for non-fitting approach
+    if np.any(np.isnan(soil.df.water.values) & ~np.isnan(soil.df.bulk_perm.values) & (frequency_perm >= 5) & (frequency_perm <= 30e9)):
+        non_fitting(soil)
 
 
-    """
-    Texture(soil)
-    BulkPermInf(soil)    
-    bulk_ec_dc = []
-
-    # Defining minimization function to obtain EC
-    def objective(bulk_ec_dc, perm_inf, freq, bulk_perm):
-        LS_perm = LongmireSmithP(bulk_ec_dc, perm_inf, freq)
-        return (LS_perm - bulk_perm)**2
-
-    # Calculating bulk EC from bulk perm when unknown
-    for x in range(soil.n_states):
-        if np.isnan(soil.df.bulk_ec_dc[x]):
-            result = minimize(objective, 0.05, args=(soil.df.bulk_perm_inf[x], soil.df.frequency_perm[x], soil.bulk_perm[x]), bounds=[(1e-6, 1)])
-            bulk_ec_dc.append(np.nan if np.isnan(result.fun) else round(result.x[0], soil.roundn+2))
-        else:
-            bulk_ec_dc.append(np.nan)
-
-    def warn_states(soil):
-        # Warn about applying LongmireSmithP function to non-validated soil conditions
-        mask_invalid = (
-            (soil.df.frequency_perm > 200e6) &
-            (soil.df.water > 0.22) &
-            (soil.df.porosity > 0.255) &
-            (soil.df.water_ec > 3.3) | (soil.df.water_ec < 0.0016) &
-            (soil.df.clay > 10) | (soil.df.sand < 85) &
-            np.isnan(soil.df.bulk_ec_dc)
-        )
-
-        # Find the indices of the invalid states
-        states_warns = np.where(mask_invalid)[0]
-
-        if states_warns.size > 0:
-            warnings.warn(
-                f"LongmireSmithP function is applied to soil states {states_warns} with conditions "
-                f"frequency_perm > 200e6, and water > 0.22, and porosity > 0.255, and water_ec > 3.3 or water_ec < 0.0016, and clay > 10 or sand < 85"
-                f", for which the validity of such model is uncertain."
-                )   
-            
-    warn_states(soil)    
-    missing_bulk_ec_dc_before = soil.df['bulk_ec_dc'].isna()
-    soil.df['bulk_ec_dc'] = [bulk_ec_dc[x] 
-                             if np.isnan(soil.df.bulk_ec_dc[x]) 
-                             else soil.df.bulk_ec_dc[x] for x in range(soil.n_states)]
-
-    missing_bulk_ec_dc_after = soil.df['bulk_ec_dc'].isna()
-    
-    soil.info['bulk_ec_dc'] = [str(soil.info.bulk_ec_dc[x]) + (
-                                "--> Calculated using LongmireSmithP function in predict.water_from_perm.changing_freq" 
-                                if missing_bulk_ec_dc_before[x] and not missing_bulk_ec_dc_after[x]
-                                else "--> Provide bulk_ec_dc; otherwise, bulk_perm" 
-                                if missing_bulk_ec_dc_before[x] and missing_bulk_ec_dc_after[x]
-                                else "")
-                            if missing_bulk_ec_dc_before[x]
-                            else soil.info.bulk_ec_dc[x]
-                            for x in range(soil.n_states)]
-
-
-def fixed_freq(soil):
+def fixed_freq(soil, states=None):
     """ 
-    Decide between fitting and non-fitting approaches to calculate soil.df.water
+    Calculate missing values of soil.df.water for the states sharing one frequency using a fitting approach
 
-    This function determines the calculation approach for soil water content based on the availability of data for water content and bulk permeability, 
-    as well as the range of frequency of permittivity. It applies a fitting approach if there are at least three soil states with known water content and bulk permeability. 
-    Otherwise, it considers a non-fitting approach when water content is unknown, bulk permeability is known, and the frequency of permittivity falls within a specified range.
+    This function applies the fitting approach to a group of soil states measured at the same permittivity frequency 
+    if there are at least three states of the group with known water content and bulk permeability.
 
     Parameters
     ----------
@@ -179,6 +100,8 @@ def fixed_freq(soil):
             Includes: frequency_perm, water, and bulk_perm.
         - n_states : int
             Number of soil states.
+    states : array-like of bool, optional
+        Soil states of the group. Default is all states.
 
     Returns
     -------
@@ -187,25 +110,20 @@ def fixed_freq(soil):
 
     Notes
     -----
-    This function modifies the soil object in-place, using either the `fitting` or the `non_fitting` function
-    depending on the criteria described above.
+    This function modifies the soil object in-place, using the `fitting` function if the criteria described above are met.
 
     External functions
     --------
     fitting: Calculate missing values of soil.df.water using a fitting approach.
-    non_fitting: Calculate missing values of soil.df.water using a non-fitting approach.
     """
+    states = np.ones(soil.n_states, dtype=bool) if states is None else np.asarray(states)
 
     # Condition for fitting approach
-    if sum(not np.isnan(soil.water[x]) and not np.isnan(soil.bulk_perm[x]) for x in range(soil.n_states)) >= 3:
-        fitting(soil)
-
-    # Condition for non-fitting approach
-    if any(np.isnan(soil.df.water[x]) and not np.isnan(soil.df.bulk_perm[x]) and 5 <= soil.df.frequency_perm[x] <=30e9 for x in range(soil.n_states)):
-        non_fitting(soil)
+    if np.sum(states & ~np.isnan(soil.df.water.values) & ~np.isnan(soil.df.bulk_perm.values)) >= 3:
+        fitting(soil, states)
 
 
-def fitting(soil):
+def fitting(soil, states=None):
     """ 
     Calculate missing values of soil.df.water using a fitting approach.
 
@@ -232,6 +150,8 @@ def fitting(soil):
             Ratio to extend the domain of the regression by fitting approach.
         - n_states : int
             Number of soil states
+    states : array-like of bool, optional
+        Soil states used for calibration and prediction. Default is all states.
 
     Returns
     -------
@@ -242,25 +162,40 @@ def fitting(soil):
     -----
     This function modifies the soil object in-place by updating the `df` and `info` dataframes.
     The function either estimates or uses the known Lw parameter for the WunderlichP model and 
-    fits the model to the calibration data.
+    fits the model to the calibration data. The fit is stored in soil.fits, and the next calls 
+    with unchanged calibration states only calculate the missing water values (see Soil.update).
+    The diagnostics of each inverted state are recorded in soil.diagnostics['predict.water_from_perm.fitting'].
 
     External functions
     --------
     WunderlichP : Calculate the soil bulk real relative dielectric permittivity using the Wunderlich model and return
     WaterPerm : Calculate or set missing values of soil.df.water_perm and return
     R2_score : Calculate the coefficient of determination (R^2) of a prediction and return.
+    bisection : Solve a batch of monotonic equations function(x) = 0 inside bounds and return the solutions
+    choose : Return the path of an inversion for n states according to the strategy of the running predict call
+    record : Record the diagnostics of an inversion in soil.diagnostics and return its solutions
     """
+    from scipy.optimize import minimize
     WaterPerm(soil)                   
+    states = np.ones(soil.n_states, dtype=bool) if states is None else np.asarray(states)
+
+    # Fit of a previous call, kept by Soil.update and Soil.append_states while the calibration states are unchanged
+    key = 'predict.water_from_perm.fitting frequency_perm=' + str(np.unique(soil.df.frequency_perm.values[states]).tolist())
+    fit = soil.fits.get(key)
+    previous_Lw = soil.Lw
 
     # Defining model parameters
-    valids = ~np.isnan(soil.df.water) & ~np.isnan(soil.df.bulk_perm) # States where calibration data are
-    water_init = np.nanmin(soil.df.water[valids])
-    bulk_perm_init = np.nanmin(soil.df.bulk_perm[valids])
-    bulk_perm_final = np.nanmax(soil.df.bulk_perm[valids])
-    bulk_perm_range = [round(bulk_perm_init - (bulk_perm_final-bulk_perm_init)/soil.range_ratio, soil.roundn), 
-                       round(bulk_perm_final + (bulk_perm_final-bulk_perm_init)/soil.range_ratio, soil.roundn)]
-    if bulk_perm_range[0] < 0:
-        bulk_perm_range[0] = 0
+    if fit is None:
+        valids = ~np.isnan(soil.df.water) & ~np.isnan(soil.df.bulk_perm) & states # States where calibration data are
+        water_init = np.nanmin(soil.df.water[valids])
+        bulk_perm_init = np.nanmin(soil.df.bulk_perm[valids])
+        bulk_perm_final = np.nanmax(soil.df.bulk_perm[valids])
+        bulk_perm_range = [round(bulk_perm_init - (bulk_perm_final-bulk_perm_init)/soil.range_ratio, soil.roundn), 
+                           round(bulk_perm_final + (bulk_perm_final-bulk_perm_init)/soil.range_ratio, soil.roundn)]
+        if bulk_perm_range[0] < 0:
+            bulk_perm_range[0] = 0
+    else:
+        water_init, bulk_perm_init, bulk_perm_range, soil.Lw = fit['water_init'], fit['bulk_perm_init'], fit['bulk_perm_range'], fit['Lw']
         
     # Obtain Lw attribute if unknown
     if np.isnan(soil.Lw):
@@ -279,24 +214,36 @@ def fitting(soil):
     if ~np.isnan(soil.Lw):
         if not isinstance(soil.Lw, np.floating):
             soil.Lw = soil.Lw[0]
-        Wat_wund = []
 
         # Defining minimization function to obtain water
         def objective_wat(wat, i):
             return (WunderlichP(wat, bulk_perm_init, water_init, soil.df.water_perm[i], soil.Lw) - soil.df.bulk_perm[i])**2
         
-        # Looping over soil states to obtain water using WunderlichP function
-        for i in range(soil.n_states):
-
-            if min(bulk_perm_range) <= soil.df.bulk_perm[i] <= max(bulk_perm_range) and ~np.isnan(soil.df.bulk_perm[i]):
+        # Inverting WunderlichP in the states of the group inside the regression range
+        bulk_perm = soil.df.bulk_perm.values
+        with np.errstate(invalid='ignore'):
+            solved = states & ((fit is None) | np.isnan(soil.df.water.values)) & (bulk_perm >= min(bulk_perm_range)) & (bulk_perm <= max(bulk_perm_range))
+        Wat_wund = np.full(soil.n_states, np.nan)
+        path = choose(soil, 'water from bulk_perm', 'water', np.sum(solved))
+        if path == 'bisection':
+            water_perm = soil.df.water_perm.values[solved]
+            wunderlich = lambda wat: WunderlichP(wat, bulk_perm_init, water_init, water_perm, soil.Lw) - bulk_perm[solved]
+            solution, iterations = bisection(wunderlich, np.zeros(np.sum(solved)), .65, full_output=True)
+            residual, status = np.abs(wunderlich(solution)), 0
+        else:
+            solution, iterations, residual, status = np.full((4, np.sum(solved)), np.nan)
+            for j, i in enumerate(np.flatnonzero(solved)):
                 result = minimize(objective_wat, 0.15, args=(i), bounds=[(0, .65)], method='L-BFGS-B')
-                Wat_wund.append(np.nan if np.isnan(result.fun) else round(result.x[0], soil.roundn))
-
-            else:
-                Wat_wund.append(np.nan)
+                solution[j], iterations[j], residual[j], status[j] = result.x[0], result.nit, np.sqrt(result.fun), result.status
+        Wat_wund[solved] = record(soil, 'predict.water_from_perm.fitting', solved, solution, residual, iterations, bulk_perm[solved], (0, .65), status)
 
         # Calculating the R2 score of the model fitting
-        R2 = round(R2_score(soil.df.water, np.array(Wat_wund)), soil.roundn)
+        if fit is None:
+            R2 = round(R2_score(soil.df.water, Wat_wund), soil.roundn)
+            soil.fits[key] = {'water_init': water_init, 'bulk_perm_init': bulk_perm_init, 'bulk_perm_range': bulk_perm_range, 
+                              'Lw': soil.Lw, 'R2': R2, 'previous': {'Lw': previous_Lw}}
+        else:
+            R2 = fit['R2']
 
         missing_water_before = soil.df['water'].isna()  
 
@@ -304,23 +251,150 @@ def fitting(soil):
         missing_water_after = soil.df['water'].isna()  
         
         soil.info['water'] = [str(soil.info.water[x]) + (
-                "--> Calculated by fitting (R2="+str(R2)+") WunderlichP function in predict.water_from_perm.fitting, for soil.bulk_perm values between: "+str(bulk_perm_range)
+                "--> Calculated by fitting (R2="+str(R2)+") WunderlichP function in predict.water_from_perm.fitting, for soil.bulk_perm values between: "+str(bulk_perm_range)+provenance(soil, path)
                 if missing_water_before[x] and not missing_water_after[x]
                 else "--> Provide water; otherwise, bulk_perm. Regression valid for bulk_perm values between"+str(bulk_perm_range)
                 if missing_water_before[x] and missing_water_after[x]
                 else "")
-            if missing_water_before[x]
+            if missing_water_before[x] and states[x]
             else soil.info.water[x]
             for x in range(soil.n_states)]
         
 
+def fitting_bootstrap(soil, n_resamples=200, quantiles=(0.05, 0.5, 0.95), n_jobs=1, seed=None):
+    """
+    Bootstrap the fitting approach of predict.water_from_perm.fitting and return Lw distribution and water intervals
+
+    The calibration states (known water and bulk_perm) are resampled with replacement and the WunderlichP model is refitted
+    on each resample. All resamples are fitted at once: the Lw objective is evaluated on (n_resamples, n_calibration) arrays
+    by a batched golden-section search, and the water content of each state is obtained by batched bisection of WunderlichP.
+    Chunks of resamples can be distributed over a pool of worker processes.
+
+    Parameters
+    ----------
+    soil : object
+        A custom soil object that contains:
+
+        - df : DataFrame
+            Data Frame containing all the quantitative information of soil array-like attributes for each state.
+            Includes: water, bulk_perm, and water_perm.
+        - roundn : int
+            Number of decimal places to round results.
+        - range_ratio : float
+            Ratio to extend the domain of the regression by fitting approach.
+        - n_states : int
+            Number of soil states
+    n_resamples : int, optional
+        Number of bootstrap resamples.
+    quantiles : sequence of float, optional
+        Quantiles of the water content returned for each state.
+    n_jobs : int, optional
+        Number of worker processes.
+    seed : int or np.random.Generator, optional
+        Seed of the random number generator.
+
+    Returns
+    -------
+    tuple
+        (parameters, water): DataFrame with the Lw and R2 of each resample, and DataFrame with the requested
+        quantiles (columns 'q0.05', 'q0.5', ...) of the water content of each state. States outside the
+        bulk_perm range of the regression are NaN.
+
+    Notes
+    -----
+    Only soil.df.water_perm is modified in-place. Lw is refitted on every resample even if soil.Lw is known.
+
+    External functions
+    --------
+    WunderlichP : Calculate the soil bulk real relative dielectric permittivity using the Wunderlich model and return
+    WaterPerm : Calculate or set missing values of soil.df.water_perm and return
+    golden_section : Minimize a batch of unimodal scalar functions by golden-section search and return the minimizers
+    bisection : Solve a batch of monotonic equations function(x) = 0 inside bounds and return the solutions
+    map_chunks : Apply a function to each chunk of arguments, optionally in a pool of worker processes, and return the results
+
+    Example
+    -------
+    >>> sample = Soil(bulk_perm = [7, 10, 14, 18, 25, 12], water = [0.05, 0.11, 0.17, 0.22, 0.31, np.nan])
+    >>> parameters, water = fitting_bootstrap(sample, seed=0)
+    >>> water.loc[5]
+    q0.05    0.127
+    q0.5     0.132
+    q0.95    0.148
+    Name: 5, dtype: float64
+    """
+    WaterPerm(soil)
+    water = soil.df.water.values
+    bulk_perm = soil.df.bulk_perm.values
+    water_perm = soil.df.water_perm.values
+
+    # Calibration states and regression range, as in predict.water_from_perm.fitting
+    valids = ~np.isnan(water) & ~np.isnan(bulk_perm)
+    bulk_perm_init = np.min(bulk_perm[valids])
+    bulk_perm_final = np.max(bulk_perm[valids])
+    bulk_perm_range = [round(bulk_perm_init - (bulk_perm_final-bulk_perm_init)/soil.range_ratio, soil.roundn),
+                       round(bulk_perm_final + (bulk_perm_final-bulk_perm_init)/soil.range_ratio, soil.roundn)]
+    if bulk_perm_range[0] < 0:
+        bulk_perm_range[0] = 0
+    in_range = (bulk_perm >= min(bulk_perm_range)) & (bulk_perm <= max(bulk_perm_range))
+
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    samples = rng.integers(0, np.sum(valids), (n_resamples, np.sum(valids)))
+    chunks = [(water[valids], bulk_perm[valids], water_perm[valids], chunk, bulk_perm[in_range], water_perm[in_range])
+              for chunk in np.array_split(samples, max(1, min(n_jobs, n_resamples)))]
+    results = map_chunks(_fit_wunderlich_p, chunks, n_jobs)
+
+    Lw = np.concatenate([result[0] for result in results])
+    water_boot = np.full((n_resamples, soil.n_states), np.nan)
+    water_boot[:, in_range] = np.round(np.vstack([result[1] for result in results]), soil.roundn)
+
+    # R2 score of each resample over the calibration states, as in predict.water_from_perm.fitting
+    scored = valids & in_range
+    ss_res = np.sum((water_boot[:, scored] - water[scored])**2, axis=1)
+    ss_tot = np.sum((water[scored] - np.mean(water[scored]))**2)
+    parameters = pd.DataFrame({'Lw': Lw, 'R2': np.round(1 - ss_res/ss_tot, soil.roundn)})
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning) # States outside the regression range
+        intervals = pd.DataFrame({f'q{q:g}': np.nanquantile(water_boot, q, axis=0) for q in quantiles}, index=soil.df.index)
+
+    return parameters, intervals
+
+
+def _fit_wunderlich_p(water, bulk_perm, water_perm, samples, target_bulk_perm, target_water_perm):
+    """
+    Fit Lw of WunderlichP on each resample of the calibration data and invert the fitted models at the target states
+
+    Returns
+    -------
+    tuple
+        (Lw, water): array of shape (n_resamples,) and array of shape (n_resamples, n_targets).
+    """
+    wat, bp, wp = water[samples], bulk_perm[samples], water_perm[samples]
+    water_init = np.min(wat, axis=1, keepdims=True)
+    bulk_perm_init = np.min(bp, axis=1, keepdims=True)
+
+    def objective_Lw(Lw):
+        return np.sqrt(np.mean((WunderlichP(wat, bulk_perm_init, water_init, wp, Lw[:, np.newaxis]) - bp)**2, axis=1))
+
+    with np.errstate(all='ignore'):
+        Lw = golden_section(objective_Lw, np.full(len(samples), -0.2), 0.8)
+
+        def residual(wat):
+            return WunderlichP(wat, bulk_perm_init, water_init, target_water_perm, Lw[:, np.newaxis]) - target_bulk_perm
+
+        water_pred = bisection(residual, np.zeros((len(samples), len(target_bulk_perm))), .65)
+
+    return Lw, water_pred
+
+
 def non_fitting(soil):
     """ 
     Return and compute soil.df.water using a non-fitting approach.
 
-    This function estimates soil bulk electrical conductivity (EC) and water content by applying different models based on the EM frequency range. 
+    This function estimates soil bulk electrical conductivity (EC) and water content by applying different models based on the EM frequency range of each state. 
     For frequencies between 5 Hz and 30 MHz, the Longmire-Smith P function is used to calculate bulk EC. 
     For frequencies between 30 MHz and 100 MHz, 100 MHz and 200 MHz, and 200 MHz and 30 GHz, different linear regression models (LR_MV, LR, LR_W) are applied to estimate water content.
+    The states of each frequency band are evaluated together, so states measured with different instruments are processed in the same call.
 
 
     Parameters
@@ -346,7 +420,8 @@ def non_fitting(soil):
     Notes
     -----
     - The function chooses the estimation model based on the EM frequency range of the soil states.
-    - For frequencies between 5 Hz and 30 MHz, bulk EC is estimated. 
+    - For frequencies between 5 Hz and 30 MHz, bulk EC is estimated, and the diagnostics of each inverted state are recorded in
+    soil.diagnostics['predict.water_from_perm.non_fitting']. 
     For higher frequencies, water content is estimated using different linear regression models tailored to specific frequency ranges.
 
 
@@ -359,40 +434,64 @@ def non_fitting(soil):
     Texture : Calculate missing values of soil.df.sand, soil.df.silt, and soil.df.clay and return
     BulkPermInf : Set missing values of soil.df.bulk_perm_inf and return
     LongmireSmithP : Calculate the soil bulk real relative dielectric permittivity using the Longmire-Smith model and return
+    check : Flag the states outside the validity domain of a model in soil.flags, warn once about the newly flagged ones and return them
+    computable : Return the mask of the states where soil.df[attribute] is missing and all the inputs of its model are known
     LR_W : Calculate the soil volumetric water content using the Lichtenecker and Rother model modified by Wunderlich and return
     LR : Calculate the soil volumetric water content using the Lichtenecker and Rother model.
     LR_MV : Calculate the soil volumetric water content using the Lichtenecker and Rother model modified by Mendoza-Veirana and return
+    tabulated_inverse : Invert a monotonic increasing function by linear interpolation in a table of its values and return the solutions
+    choose : Return the path of an inversion for n states according to the strategy of the running predict call
+    record : Record the diagnostics of an inversion in soil.diagnostics and return its solutions
     """
+    from scipy.optimize import minimize
     Porosity(soil)                     
     AirPerm(soil)                      
     SolidPerm(soil)                   
     WaterPerm(soil)              
     Texture(soil)                     
 
+    frequency_perm = soil.df.frequency_perm.values
+
     # Condition for EM frequencies between 5 and 30e6
-    if ((soil.df.frequency_perm >= 5) & (soil.df.frequency_perm < 30e6)).all():
+    low_freq = (frequency_perm >= 5) & (frequency_perm < 30e6)
+    # States where LongmireSmithP calculates bulk_ec_dc, checked once their water is calculated
+    from_perm = np.zeros(soil.n_states, dtype=bool)
+    if low_freq.any():
         BulkPermInf(soil)
 
-        bulk_ec_dc = []
+        bulk_ec_dc = np.full(soil.n_states, np.nan)
         # Defining minimization function to obtain bulk_ec_dc using LongmireSmithP
         def objective(bulk_ec_dc, perm_inf, freq_perm, bulk_perm):
             LS_perm = LongmireSmithP(bulk_ec_dc, perm_inf, freq_perm)
             return (LS_perm - bulk_perm)**2
         
-        # Calculating bulk_ec_ec
-        for i in range(soil.n_states):
-            result = minimize(objective, 0.05, args=(soil.df.bulk_perm_inf[i], soil.df.frequency_perm[i], soil.df.bulk_perm[i]), bounds=[(1e-6, 1)], method='L-BFGS-B')
-            bulk_ec_dc.append(np.nan if np.isnan(result.fun) else round(result.x[0], soil.roundn+2))
+        # Calculating bulk_ec_dc only in the states where it is missing and bulk_perm is known
+        states = computable(soil, 'bulk_ec_dc', ['bulk_perm_inf', 'bulk_perm'], low_freq)
+        frequencies = np.unique(frequency_perm[states])
+        path = choose(soil, 'bulk_ec_dc from bulk_perm', 'bulk_ec_dc', np.sum(states), len(frequencies))
+        bulk_perm, bulk_perm_inf = soil.df.bulk_perm.values[states], soil.df.bulk_perm_inf.values[states]
+        solution, iterations, residual, status = np.full((4, np.sum(states)), np.nan)
+        if path == 'tabulated': # One table of LongmireSmithP above bulk_perm_inf per frequency, kept between predict calls
+            for freq in frequencies:
+                tabulated = frequency_perm[states] == freq
+                solution[tabulated] = tabulated_inverse(LongmireSmithP, bulk_perm[tabulated] - bulk_perm_inf[tabulated], 1e-6, 1, args=(0, float(freq)))
+            iterations, residual, status = 0, np.abs(LongmireSmithP(solution, bulk_perm_inf, frequency_perm[states]) - bulk_perm), 0
+        else:
+            for j, i in enumerate(np.flatnonzero(states)):
+                result = minimize(objective, 0.05, args=(soil.df.bulk_perm_inf[i], soil.df.frequency_perm[i], soil.df.bulk_perm[i]), bounds=[(1e-6, 1)], method='L-BFGS-B')
+                solution[j], iterations[j], residual[j], status[j] = result.x[0], result.nit, np.sqrt(result.fun), result.status
+        bulk_ec_dc[states] = record(soil, 'predict.water_from_perm.non_fitting', states, solution, residual, iterations, bulk_perm, (1e-6, 1), status)
 
         # Check for missing values
-        missing_bulk_ec_dc_before = soil.df['bulk_ec_dc'].isna()
-        soil.df['bulk_ec_dc'] = [bulk_ec_dc[x] if np.isnan(soil.df.bulk_ec_dc[x]) else soil.df.bulk_ec_dc[x] for x in range(soil.n_states)]
+        missing_bulk_ec_dc_before = soil.df['bulk_ec_dc'].isna() & low_freq
+        soil.df['bulk_ec_dc'] = np.where(missing_bulk_ec_dc_before, bulk_ec_dc, soil.df.bulk_ec_dc.values)
 
         missing_bulk_ec_dc_after = soil.df['bulk_ec_dc'].isna()
+        from_perm = (missing_bulk_ec_dc_before & ~missing_bulk_ec_dc_after).values
         
         # Update info for calculated bulk_ec_dc
         soil.info['bulk_ec_dc'] = [str(soil.info.bulk_ec_dc[x]) + (
-                "--> Calculated using LongmireSmithP function in predict.water_from_perm.non_fitting"
+                "--> Calculated using LongmireSmithP function in predict.water_from_perm.non_fitting" + provenance(soil, path)
                 if missing_bulk_ec_dc_before[x] and not missing_bulk_ec_dc_after[x]
                 else "--> Provide bulk_ec_dc; otherwise, bulk_perm"
                 if missing_bulk_ec_dc_before[x] and missing_bulk_ec_dc_after[x]
@@ -400,69 +499,29 @@ def non_fitting(soil):
             if missing_bulk_ec_dc_before[x]
             else soil.info.bulk_ec_dc[x]
             for x in range(soil.n_states)]
-    
-
-    # Condition for EM frequencies between 30e6 and 100e6
-    elif ((soil.df.frequency_perm >= 30e6) & (soil.df.frequency_perm < 100e6)).all():
-
-        missing_water_before = soil.df['water'].isna()
-
-        soil.df['water'] = [round(LR_MV(soil.df.bulk_perm[x], soil.df.porosity[x], soil.df.air_perm[x], soil.df.solid_perm[x], soil.df.water_perm[x], soil.df.CEC[x]), soil.roundn) 
-                            if np.isnan(soil.df.water[x]) else soil.df.water[x] for x in range(soil.n_states)]
-
-        missing_water_after = soil.df['water'].isna()
-
-        # Update info for calculated water
-        soil.info['water'] = [str(soil.info.water[x]) + (
-                "--> Calculated using LR_MV function (reported R2=0.93) in predict.water_from_perm.non_fitting"
-                if missing_water_before[x] and not missing_water_after[x]
-                else "--> Provide water; otherwise bulk_perm, porosity, and CEC"
-                if missing_water_before[x] and missing_water_after[x]
-                else "")
-            if missing_water_before[x]
-            else soil.info.water[x]
-            for x in range(soil.n_states)]
-    
-
-    # Condition for EM frequencies between 100e6 and 200e6
-    elif ((soil.df.frequency_perm >= 100e6) & (soil.df.frequency_perm < 200e6)).all():
-
-        missing_water_before = soil.df['water'].isna()
-    
-        soil.df['water'] = [round(LR(soil.df.bulk_perm[x], soil.df.porosity[x], soil.df.air_perm[x], soil.df.solid_perm[x], soil.df.water_perm[x], soil.alpha), soil.roundn) 
-                            if np.isnan(soil.df.water[x]) else soil.df.water[x] for x in range(soil.n_states)]
-
-        missing_water_after = soil.df['water'].isna()
-
-        # Update info for calculated water
-        soil.info['water'] = [str(soil.info.water[x]) + (
-                "--> Calculated using LR function (reported RMSE=0.032) in predict.water_from_perm.non_fitting"
-                if missing_water_before[x] and not missing_water_after[x]
-                else "--> Provide water; otherwise bulk_perm, and porosity"
-                if missing_water_before[x] and missing_water_after[x]
-                else "")
-            if missing_water_before[x]
-            else soil.info.water[x]
-            for x in range(soil.n_states)]
-        
 
-    # Condition for EM frequencies between 200e6 and 30e9
-    elif ( ((soil.df.frequency_perm >= 200e6) & (soil.df.frequency_perm <= 30e9))).all():
-      
-        missing_water_before = soil.df['water'].isna()
-
-        soil.df['water'] = [round(LR_W(soil.df.bulk_perm[x], soil.df.porosity[x], soil.df.air_perm[x], soil.df.solid_perm[x], soil.df.water_perm[x], soil.df.clay[x]), soil.roundn) 
-                            if np.isnan(soil.df.water[x]) else soil.df.water[x] for x in range(soil.n_states)] 
-
-        missing_water_after = soil.df['water'].isna()
-
-        # Update info for calculated water
-        soil.info['water'] = [str(soil.info.water[x]) + (
-                "--> Calculated using LR_W function in predict.water_from_perm.non_fitting"
-                if missing_water_before[x] and not missing_water_after[x]
-                else "--> Provide water; otherwise bulk_perm, porosity, and Clay"
-                if missing_water_before[x] and missing_water_after[x]
-                else "")
-            if missing_water_before[x]
-            else soil.info.water[x]
-            for x in range(soil.n_states)]
\ No newline at end of file
+    # Frequency bands between 30e6 and 30e9, each evaluated in one pass over its states
+    bands = [((frequency_perm >= 30e6) & (frequency_perm < 100e6), LR_MV, lambda m: soil.df.CEC.values[m],
+              "--> Calculated using LR_MV function (reported R2=0.93) in predict.water_from_perm.non_fitting",
+              "--> Provide water; otherwise bulk_perm, porosity, and CEC"),
+             ((frequency_perm >= 100e6) & (frequency_perm < 200e6), LR, lambda m: np.broadcast_to(soil.alpha, soil.n_states)[m],
+              "--> Calculated using LR function (reported RMSE=0.032) in predict.water_from_perm.non_fitting",
+              "--> Provide water; otherwise bulk_perm, and porosity"),
+             ((frequency_perm >= 200e6) & (frequency_perm <= 30e9), LR_W, lambda m: soil.df.clay.values[m],
+              "--> Calculated using LR_W function in predict.water_from_perm.non_fitting",
+              "--> Provide water; otherwise bulk_perm, porosity, and Clay")]
+
+    missing_water = soil.df['water'].isna().values
+    water = soil.df.water.values.copy()
+    info = soil.info['water'].to_numpy(dtype=object).copy()
+
+    for band, model, extra_arg, calculated, provide in bands:
+        states = band & missing_water
+        if states.any():
+            water[states] = model(soil.df.bulk_perm.values[states], soil.df.porosity.values[states], soil.df.air_perm.values[states], 
+                                           soil.df.solid_perm.values[states], soil.df.water_perm.values[states], extra_arg(states))
+            info[states] = [str(i) + (provide if np.isnan(w) else calculated) for i, w in zip(info[states], water[states])]
+
+    soil.df['water'] = water
+    soil.info['water'] = info
+    check(soil, 'LongmireSmithP', from_perm)
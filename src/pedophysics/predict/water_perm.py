@@ -1,6 +1,9 @@
 import numpy as np
 from pedophysics.pedophysical_models.water_perm import *
+from pedophysics.utils.precision import predict_call
+from pedophysics.utils.unique import evaluate_unique
 
+@predict_call
 def WaterPerm(soil):
     """
     Calculate or set missing values of soil.df.water_perm and return
@@ -57,23 +60,24 @@ def WaterPerm(soil):
     Name: water_perm, dtype: float64
     """
     if (np.isnan(soil.df.water_perm)).any(): # Go over if any value is missing 
+        temperature, salinity, frequency_perm = soil.df.temperature.values, soil.df.salinity.values, soil.df.frequency_perm.values
+        water_perm = soil.df.water_perm.values.copy()
+        info = soil.info['water_perm'].to_numpy(dtype=object).copy()
 
-        soil.info['water_perm'] = ["Calculated using MalmbergMaryott function (RMSE = 0.0046)" if np.isnan(soil.df.water_perm[x]) & ((soil.df.salinity[x] == 0) or np.isnan(soil.df.salinity[x])) & (soil.df.frequency_perm[x]  <= 100e6) & (soil.df.frequency_perm[x] >= 1e5) 
-                                    or soil.info.water_perm[x] == "Calculated using MalmbergMaryott function (RMSE = 0.0046)"
-                                    else soil.info.water_perm[x] for x in range(soil.n_states)]
-        
-        soil.df['water_perm'] = [np.round(MalmbergMaryott(soil.df.temperature.values[x]), soil.roundn) if np.isnan(soil.df.water_perm[x]) & ((soil.df.salinity[x] == 0) or np.isnan(soil.df.salinity[x])) & (soil.df.frequency_perm[x]  <= 100e6) & (soil.df.frequency_perm[x] >= 1e5) else soil.df.water_perm[x] for x in range(soil.n_states)]
-        
-        soil.info['water_perm'] = ["Calculated using Olhoeft function" if np.isnan(soil.df.water_perm[x]) & ~np.isnan(soil.df.salinity[x]) & (soil.df.frequency_perm[x] < 100e6)
-                                    or soil.info.water_perm[x] == "Calculated using Olhoeft function"
-                                    else soil.info.water_perm[x] for x in range(soil.n_states)]
-                
-        soil.df['water_perm'] = [np.round(Olhoeft(soil.df.temperature.values[x], soil.df.salinity[x]), soil.roundn) if np.isnan(soil.df.water_perm[x]) & ~np.isnan(soil.df.salinity[x]) & (soil.df.frequency_perm[x] < 100e6) else soil.df.water_perm[x] for x in range(soil.n_states)]
-                
-        soil.info['water_perm'] = ["Set as 80 by default" if np.isnan(soil.df.water_perm[x])
-                                    or soil.info.water_perm[x] == "Set as 80 by default"
-                                    else soil.info.water_perm[x] for x in range(soil.n_states)]
-               
-        soil.df['water_perm'] = [80 if np.isnan(soil.df.water_perm[x]) else soil.df.water_perm[x] for x in range(soil.n_states)]
+        # Each model is evaluated once per distinct temperature and salinity of its states
+        states = np.isnan(water_perm) & ((salinity == 0) | np.isnan(salinity)) & (frequency_perm <= 100e6) & (frequency_perm >= 1e5)
+        water_perm[states] = evaluate_unique(MalmbergMaryott, temperature[states])
+        info[states] = "Calculated using MalmbergMaryott function (RMSE = 0.0046)"
+
+        states = np.isnan(water_perm) & ~np.isnan(salinity) & (frequency_perm < 100e6)
+        water_perm[states] = evaluate_unique(Olhoeft, temperature[states], salinity[states])
+        info[states] = "Calculated using Olhoeft function"
+
+        states = np.isnan(water_perm)
+        water_perm[states] = 80
+        info[states] = "Set as 80 by default"
+
+        soil.df['water_perm'] = water_perm
+        soil.info['water_perm'] = info
 
     return soil.df.water_perm.values
\ No newline at end of file
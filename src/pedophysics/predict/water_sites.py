@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+import warnings
+
+from pedophysics.pedophysical_models.bulk_perm import WunderlichP
+from pedophysics.pedophysical_models.bulk_ec import WunderlichEC
+from pedophysics.utils.solvers import golden_section, bisection
+from pedophysics.utils.parallel import map_chunks
+from pedophysics.utils.precision import predict_call
+
+from .water_perm import WaterPerm
+from .bulk_ec_dc_tc import shift_to_bulk_ec_dc_tc
+
+# Models that can be fitted per site
+WUNDERLICH_MODELS = {'WunderlichP': WunderlichP, 'WunderlichEC': WunderlichEC}
+
+
+@predict_call
+def WaterSites(soil, sites, model='WunderlichP', n_jobs=1):
+    """
+    Fit the Wunderlich model of each site, calculate missing values of soil.df.water and return the per-site fitting table
+
+    The states of all sites are held by a single soil object and grouped by `sites`. As in predict.water_from_perm.fitting
+    and predict.water_from_ec.fitting, the Lw of each site is fitted on its calibration states (known water and bulk_perm,
+    or known water and bulk_ec_dc_tc) and the model is inverted for the remaining states of the site within the
+    regression range. The Lw objective of all sites is evaluated at once on a (n_sites, max_calibration_states) array
+    by a batched golden-section search. Chunks of sites can be distributed over a pool of worker processes.
+
+    Parameters
+    ----------
+    soil : object
+        A custom soil object that contains:
+
+        - df : DataFrame
+            Data Frame containing all the quantitative information of soil array-like attributes for each state.
+            Includes: water, bulk_perm, water_perm, bulk_ec_dc_tc and water_ec.
+        - info : DataFrame
+            Data Frame containing descriptive information about how each array-like attribute was determined or modified.
+        - roundn : int
+            Number of decimal places to round results.
+        - range_ratio : float
+            Ratio to extend the domain of the regression by fitting approach.
+        - n_states : int
+            Number of soil states
+    sites : array-like
+        Site identifier of each soil state.
+    model : {'WunderlichP', 'WunderlichEC'}, optional
+        Model to fit, using bulk_perm and water_perm or bulk_ec_dc_tc and water_ec respectively.
+    n_jobs : int, optional
+        Number of worker processes.
+
+    Returns
+    -------
+    DataFrame
+        Indexed by site: Lw, number of calibration states, lower and upper bound of the regression range and R2 score.
+
+    Notes
+    -----
+    This function modifies the soil object in-place by updating the `df` and `info` dataframes.
+    Lw is fitted for every site, regardless of soil.Lw. For WunderlichEC, water_ec must be known in the calibration states.
+    Sites with less than two distinct calibration states are returned with NaN parameters.
+
+    External functions
+    --------
+    WunderlichP : Calculate the soil bulk real relative dielectric permittivity using the Wunderlich model and return
+    WunderlichEC : Calculate the soil bulk real electrical conductivity using the Wunderlich model and return
+    WaterPerm : Calculate or set missing values of soil.df.water_perm and return
+    shift_to_bulk_ec_dc_tc : Compute missing values of soil.df.bulk_ec_dc_tc based on soil.df.bulk_ec or soil.df.bulk_ec_dc
+    golden_section : Minimize a batch of unimodal scalar functions by golden-section search and return the minimizers
+    bisection : Solve a batch of monotonic equations function(x) = 0 inside bounds and return the solutions
+    map_chunks : Apply a function to each chunk of arguments, optionally in a pool of worker processes, and return the results
+
+    Example
+    -------
+    >>> sample = Soil(bulk_perm = [7, 10, 14, 12, 6, 9, 16, 11], water = [0.05, 0.11, 0.17, np.nan, 0.06, 0.1, 0.2, np.nan])
+    >>> WaterSites(sample, ['a', 'a', 'a', 'a', 'b', 'b', 'b', 'b'])
+                Lw  n_calibration  range_min  range_max     R2
+    site
+    a     0.042656              3        3.5       17.5  0.997
+    b     0.004751              3        1.0       21.0  1.000
+    >>> sample.df.water.values
+    array([0.05, 0.11, 0.17, 0.14, 0.06, 0.1 , 0.2 , 0.13])
+    """
+    if model == 'WunderlichP':
+        WaterPerm(soil)
+        bulk, water_prop = soil.df.bulk_perm.values, soil.df.water_perm.values
+    elif model == 'WunderlichEC':
+        shift_to_bulk_ec_dc_tc(soil)
+        bulk, water_prop = soil.df.bulk_ec_dc_tc.values, soil.df.water_ec.values
+    else:
+        raise ValueError("model must be one of ['WunderlichP', 'WunderlichEC']")
+
+    codes, names = pd.factorize(np.asarray(sites))
+    n_sites = len(names)
+    water = soil.df.water.values
+    valids = ~np.isnan(water) & ~np.isnan(bulk) & ~np.isnan(water_prop) & (codes >= 0)
+
+    # Padding the calibration states of each site into (n_sites, max_calibration_states) arrays
+    n_calibration = np.bincount(codes[valids], minlength=n_sites)
+    order = np.argsort(codes[valids], kind='stable')
+    site_of = codes[valids][order]
+    position = np.arange(len(order)) - np.concatenate([[0], np.cumsum(n_calibration)[:-1]])[site_of]
+    padded = [np.full((n_sites, max(n_calibration.max(initial=0), 1)), np.nan) for _ in range(3)]
+    for array, values in zip(padded, (water, bulk, water_prop)):
+        array[site_of, position] = values[valids][order]
+
+    # Regression range of each site, as in predict.water_from_perm.fitting
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning) # Sites without calibration states
+        bulk_init, bulk_final = np.nanmin(padded[1], axis=1), np.nanmax(padded[1], axis=1)
+    range_min = np.round(bulk_init - (bulk_final-bulk_init)/soil.range_ratio, soil.roundn)
+    range_min = np.where(range_min < 0, 0, range_min)
+    range_max = np.round(bulk_final + (bulk_final-bulk_init)/soil.range_ratio, soil.roundn)
+
+    chunks = [tuple(array[chunk] for array in padded) + (WUNDERLICH_MODELS[model],)
+              for chunk in np.array_split(np.arange(n_sites), max(1, min(n_jobs, n_sites)))]
+    Lw = np.concatenate(map_chunks(_fit_sites, chunks, n_jobs))
+    Lw = np.where(bulk_final > bulk_init, Lw, np.nan)
+
+    # Inverting the fitted model of each site for its states within the regression range
+    site = np.where(codes >= 0, codes, 0)
+    in_range = (codes >= 0) & (bulk >= range_min[site]) & (bulk <= range_max[site]) & ~np.isnan(Lw[site])
+    Wat_wund = np.full(soil.n_states, np.nan)
+    with np.errstate(all='ignore'):
+        water_init = np.nanmin(padded[0], axis=1, initial=np.inf, where=~np.isnan(padded[0]))
+        s = site[in_range]
+        Wat_wund[in_range] = bisection(lambda wat: WUNDERLICH_MODELS[model](wat, bulk_init[s], water_init[s], water_prop[in_range], Lw[s]) - bulk[in_range],
+                                       np.zeros(np.sum(in_range)), .65)
+
+    # R2 score of each site over its calibration states
+    scored = valids & ~np.isnan(Wat_wund)
+    mean_water = np.bincount(codes[scored], weights=water[scored], minlength=n_sites)/np.maximum(np.bincount(codes[scored], minlength=n_sites), 1)
+    ss_res = np.bincount(codes[scored], weights=(water[scored] - Wat_wund[scored])**2, minlength=n_sites)
+    ss_tot = np.bincount(codes[scored], weights=(water[scored] - mean_water[codes[scored]])**2, minlength=n_sites)
+    with np.errstate(all='ignore'):
+        R2 = np.round(np.where(ss_tot > 0, 1 - ss_res/ss_tot, np.nan), soil.roundn)
+
+    table = pd.DataFrame({'Lw': Lw, 'n_calibration': n_calibration, 'range_min': range_min, 'range_max': range_max, 'R2': R2},
+                         index=pd.Index(names, name='site'))
+
+    missing_water_before = np.isnan(water)
+    soil.df['water'] = np.where(missing_water_before, Wat_wund, water)
+    missing_water_after = soil.df['water'].isna()
+
+    soil.info['water'] = [str(soil.info.water[x]) + (
+            "--> Calculated by fitting (R2="+str(R2[codes[x]])+") "+model+" function of site "+str(names[codes[x]])+" in predict.water_sites.WaterSites, for values between: "+str([range_min[codes[x]], range_max[codes[x]]])
+            if not missing_water_after[x]
+            else "--> Provide water; otherwise, calibration data for the site of this state in predict.water_sites.WaterSites")
+        if missing_water_before[x]
+        else soil.info.water[x]
+        for x in range(soil.n_states)]
+
+    return table
+
+
+def _fit_sites(water, bulk, water_prop, model):
+    """
+    Fit Lw of the Wunderlich model for each row of padded calibration arrays and return
+
+    Returns
+    -------
+    np.ndarray
+        Lw of each site, of shape (n_sites,).
+    """
+    with np.errstate(all='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning) # Sites without calibration states
+        water_init = np.nanmin(water, axis=1, keepdims=True, initial=np.inf, where=~np.isnan(water))
+        bulk_init = np.nanmin(bulk, axis=1, keepdims=True, initial=np.inf, where=~np.isnan(bulk))
+
+        def objective_Lw(Lw):
+            return np.sqrt(np.nanmean((model(water, bulk_init, water_init, water_prop, Lw[:, np.newaxis]) - bulk)**2, axis=1))
+
+        return golden_section(objective_Lw, np.full(len(water), -0.2), 0.8)
+
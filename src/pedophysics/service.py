@@ -0,0 +1,382 @@
+"""
+Local HTTP prediction service, built on the standard library
+
+Endpoints
+---------
+POST /predict/<target>
+    Predict a target of TARGETS (see pedophysics.cli) for the soil states of the request. A JSON body
+    {"states": {"bulk_perm": [...], ...}, "attributes": {"frequency_perm": 50e6, ...}, "calibration": "name", "strategy": "fast"}
+    returns {"<attribute>": [...], "info": [...]}, with null for missing values. The strategy, 'exact' by default, selects the
+    inversion paths of the prediction (see utils.strategy.choose). An Arrow IPC stream body
+    (Content-Type application/vnd.apache.arrow.stream, requires pyarrow) holds the states as columns, the attributes,
+    calibration and strategy being given in the query string; the response is an Arrow IPC stream with the columns
+    '<attribute>' and 'info.<attribute>'.
+POST /calibrate/<name>
+    Fit the fitting approach of a target on the calibration states of a JSON body {"target": ..., "states": ..., "attributes": ...}
+    and keep the calibrated soil in memory, so that predictions with {"calibration": "name"} reuse its fits (see Soil.append_states).
+GET /metrics
+    Latency and throughput of the service, per target.
+GET /health
+    Status of the service.
+
+Concurrent requests of the same target, strategy and single-value attributes (or calibration) are coalesced for up to
+`max_wait` seconds, and predicted together in a single vectorized call. Requests with calibration states, whose
+predictions would fit on the states of other requests, are predicted on their own. The memoized models, the tables of
+the tabulated inversions (one per frequency, see utils.solvers.tabulated_inverse) and the imported predict modules are
+kept warm in the service process between requests. Errors in a request are answered with status 400, and unexpected
+errors with status 500, both with a JSON body {"error": "..."}.
+
+Usage
+-----
+python -m pedophysics.service [--host 127.0.0.1] [--port 8000]
+"""
+import argparse
+import copy
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+
+import numpy as np
+import pandas as pd
+
+from pedophysics.cli import TARGETS, parse_pairs
+from pedophysics.simulate import Soil, ARRAY_LIKE_ATTRIBUTES
+from pedophysics.utils.strategy import STRATEGIES
+
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+
+# Number of latencies per target kept for the metrics
+LATENCY_WINDOW = 1000
+
+
+class Metrics:
+    """
+    Thread-safe counters of the requests, states and batches of each target, and their latencies
+
+    Example
+    -------
+    >>> metrics = Metrics()
+    >>> metrics.record('Water', n_states=10, latency=0.002)
+    >>> metrics.snapshot()['targets']['Water']['states']
+    10
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+        self.targets = {}
+
+    def record(self, target, n_states=0, latency=None, batch_time=None, batch_requests=0):
+        """
+        Record a request (with its latency) or a batch (with its compute time and number of requests) of a target
+        """
+        with self.lock:
+            counters = self.targets.setdefault(target, {'requests': 0, 'states': 0, 'batches': 0, 'batched_requests': 0,
+                                                        'compute_time': 0., 'latencies': deque(maxlen=LATENCY_WINDOW)})
+            if latency is not None:
+                counters['requests'] += 1
+                counters['states'] += n_states
+                counters['latencies'].append(latency)
+            if batch_time is not None:
+                counters['batches'] += 1
+                counters['batched_requests'] += batch_requests
+                counters['compute_time'] += batch_time
+
+    def snapshot(self):
+        """
+        Return the metrics as a dict: uptime, and per target the counts, mean batch size, latency percentiles [ms] and throughput [states/s]
+        """
+        with self.lock:
+            uptime = time.perf_counter() - self.start
+            targets = {}
+            for target, counters in self.targets.items():
+                latencies = np.array(counters['latencies'])*1000
+                targets[target] = {'requests': counters['requests'], 'states': counters['states'], 'batches': counters['batches'],
+                                   'mean_batch_requests': counters['batched_requests']/max(counters['batches'], 1),
+                                   'latency_mean_ms': float(latencies.mean()) if len(latencies) else None,
+                                   'latency_p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+                                   'latency_p95_ms': float(np.percentile(latencies, 95)) if len(latencies) else None,
+                                   'throughput_states_per_s': counters['states']/uptime,
+                                   'compute_states_per_s': counters['states']/counters['compute_time'] if counters['compute_time'] else None}
+        return {'uptime_s': uptime, 'targets': targets}
+
+
+class PredictionService:
+    """
+    Predict targets for soil states given as DataFrames, coalescing concurrent requests into batches
+
+    Parameters
+    ----------
+    max_wait : float, optional
+        Seconds a request waits for other requests of the same batch. Default is 0.005.
+    max_states : int, optional
+        Number of states above which a batch is predicted without waiting. Default is 100000.
+    warm : bool, optional
+        If True (default), each target is predicted once per strategy on sample states as the service starts, so that its
+        modules are imported, its models are compiled and the tables of the frequencies of `frequencies` are built before the first request.
+    frequencies : list of float, optional
+        Frequencies [Hz] of the sample states of warm, as frequency_perm and frequency_ec. Default is [1e6], a low frequency
+        whose bulk_ec_dc is inverted from bulk_perm and bulk_ec.
+
+    Example
+    -------
+    >>> service = PredictionService()
+    >>> service.predict('Water', pd.DataFrame({'bulk_perm': [10, 15]}), {'frequency_perm': 150e6, 'porosity': 0.45})
+    (array([0.2 , 0.29]), array([...], dtype=object))
+    """
+    def __init__(self, max_wait=0.005, max_states=100000, warm=True, frequencies=(1e6,)):
+        self.max_wait = max_wait
+        self.max_states = max_states
+        self.metrics = Metrics()
+        self.calibrations = {}
+        self.lock = threading.Lock()
+        self.pending = {}
+        if warm:
+            self.warm(frequencies)
+
+    def warm(self, frequencies=(1e6,)):
+        """
+        Predict each target of TARGETS with each strategy on sample states, so that their modules, memoized models and tables are loaded
+        """
+        frequencies = [50e6] + list(frequencies)
+        sample = self._columns(pd.DataFrame({'bulk_perm': 15., 'bulk_ec': 0.02, 'clay': 20., 'frequency_perm': frequencies, 'frequency_ec': frequencies}),
+                               {'water_ec': 0.1})
+        for target in TARGETS:
+            for strategy in STRATEGIES:
+                self._predict_batch(target, [sample], {}, None, strategy)
+        self.metrics = Metrics()
+
+    def calibrate(self, name, target, frame, attributes=None):
+        """
+        Predict a target on calibration states, keep the calibrated soil under `name` and return the names of its fits
+        """
+        if target not in TARGETS:
+            raise ValueError(f"'{target}' is not a predict target. Must be in {list(TARGETS)}")
+        from pedophysics import predict
+
+        soil = Soil.from_frame(frame, **(attributes or {}))
+        getattr(predict, target)(soil)
+        with self.lock:
+            self.calibrations[name] = soil
+        return list(soil.fits)
+
+    def predict(self, target, frame, attributes=None, calibration=None, strategy=None):
+        """
+        Predict a target for the states of a DataFrame, together with the concurrent requests of the same batch, and return its values and provenance
+
+        Parameters
+        ----------
+        target : str
+            Name of a predict function in TARGETS.
+        frame : DataFrame
+            Soil states, one column per array-like Soil attribute.
+        attributes : dict, optional
+            Other Soil attributes, as in Soil.from_frame. Single-value attributes cannot be given with a calibration.
+        calibration : str, optional
+            Name of a calibrated soil, whose fits are reused for the states of the request.
+        strategy : str, optional
+            Strategy of the prediction: 'exact' (default), 'fast' or 'auto'.
+
+        Returns
+        -------
+        tuple
+            Values of the target attribute (np.ndarray) and their provenance (np.ndarray of str), one per state.
+        """
+        start = time.perf_counter()
+        attributes = attributes or {}
+        if target not in TARGETS:
+            raise ValueError(f"'{target}' is not a predict target. Must be in {list(TARGETS)}")
+        if calibration is not None and calibration not in self.calibrations:
+            raise ValueError(f"Unknown calibration '{calibration}'")
+        if strategy is not None and strategy not in STRATEGIES:
+            raise ValueError(f"'strategy' must be one of {STRATEGIES}")
+        single = {key: value for key, value in attributes.items() if key not in ARRAY_LIKE_ATTRIBUTES}
+        if calibration is not None and single:
+            raise ValueError(f"{list(single)} are set by the calibration '{calibration}'")
+
+        columns = self._columns(frame, attributes)
+        future = Future()
+        if self._has_calibration_states(*columns):
+            # Predicted on its own, as its fit must not include the states of other requests
+            future.set_result(self._predict_batch(target, [columns], single, calibration, strategy)[0])
+        else:
+            key = (target, calibration, strategy, json.dumps(single, sort_keys=True, default=str))
+            with self.lock:
+                batch = self.pending.setdefault(key, [])
+                batch.append((columns, future))
+                leader = len(batch) == 1
+            if leader:
+                # The first request of a batch collects the others, then predicts them all
+                deadline = time.perf_counter() + self.max_wait
+                while time.perf_counter() < deadline and sum(n for (_, n), _ in batch) < self.max_states:
+                    time.sleep(self.max_wait/10)
+                with self.lock:
+                    batch = self.pending.pop(key)
+                try:
+                    results = self._predict_batch(target, [columns for columns, _ in batch], single, calibration, strategy)
+                    for (_, waiting), result in zip(batch, results):
+                        waiting.set_result(result)
+                except Exception as error:
+                    for _, waiting in batch:
+                        waiting.set_exception(error)
+
+        result = future.result()
+        self.metrics.record(target, n_states=len(frame), latency=time.perf_counter() - start)
+        return result
+
+    def _columns(self, frame, attributes):
+        """
+        Return the given array-like attributes of a request as full columns, broadcast as in Soil(), and its number of states
+        """
+        soil = Soil.from_frame(frame, **{key: value for key, value in attributes.items() if key in ARRAY_LIKE_ATTRIBUTES})
+        columns = {attribute: soil.df[attribute].values for attribute in ARRAY_LIKE_ATTRIBUTES if not soil.df[attribute].isna().all()}
+        return columns, soil.n_states
+
+    @staticmethod
+    def _has_calibration_states(columns, n_states):
+        """
+        Return whether the states of a request include calibration states, i.e. states with at least two of water, bulk_perm and bulk_ec given
+        """
+        given = lambda attributes: np.any([~np.isnan(columns[a]) for a in attributes if a in columns] + [np.zeros(n_states, bool)], axis=0)
+        return (given(['water']).astype(int) + given(['bulk_perm']) + given(['bulk_ec', 'bulk_ec_tc', 'bulk_ec_dc', 'bulk_ec_dc_tc']) >= 2).any()
+
+    def _predict_batch(self, target, requests, single, calibration, strategy=None):
+        """
+        Predict a target for the concatenated states of the requests in one call and return the values and provenance of each request
+        """
+        from pedophysics import predict
+
+        start = time.perf_counter()
+        sizes = [n_states for _, n_states in requests]
+        names = sorted({name for columns, _ in requests for name in columns})
+        columns = {name: np.concatenate([columns.get(name, np.full(n_states, np.nan)) for columns, n_states in requests]) for name in names}
+
+        if calibration is None:
+            soil = Soil._set_columns(Soil(**single), columns, sum(sizes))
+            first = 0
+        else:
+            with self.lock:
+                soil = copy.deepcopy(self.calibrations[calibration])
+            first = soil.n_states
+            soil.append_states(**columns)
+        getattr(predict, target)(soil, strategy=strategy)
+
+        attribute = TARGETS[target]
+        values, info = soil.df[attribute].values[first:], soil.info[attribute].to_numpy(dtype=object)[first:]
+        bounds = np.cumsum([0] + sizes)
+        self.metrics.record(target, batch_time=time.perf_counter() - start, batch_requests=len(requests))
+        return [(values[a:b].copy(), info[a:b].copy()) for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    Request handler of the endpoints of the prediction service, set as `server.service`
+    """
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/metrics':
+            self._send_json(self.server.service.metrics.snapshot())
+        elif path == '/health':
+            self._send_json({'status': 'ok', 'targets': list(TARGETS), 'calibrations': list(self.server.service.calibrations)})
+        else:
+            self._send_json({'error': f"Unknown endpoint {path}"}, 404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+        try:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if len(parts) == 2 and parts[0] == 'predict':
+                if self.headers.get('Content-Type', '').startswith(ARROW_STREAM):
+                    import pyarrow
+                    import pyarrow.ipc
+
+                    frame = pyarrow.ipc.open_stream(body).read_all().to_pandas()
+                    query = parse_pairs([f"{k}={v}" for k, v in parse_qsl(url.query)], convert=True)
+                    calibration, strategy = query.pop('calibration', None), query.pop('strategy', None)
+                    values, info = self.server.service.predict(parts[1], frame, query, None if calibration is None else str(calibration),
+                                                               None if strategy is None else str(strategy))
+                    table = pyarrow.table({TARGETS[parts[1]]: values, 'info.' + TARGETS[parts[1]]: info.astype(str)})
+                    sink = pyarrow.BufferOutputStream()
+                    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+                        writer.write_table(table)
+                    self._send(sink.getvalue().to_pybytes(), ARROW_STREAM)
+                else:
+                    request = json.loads(body or b'{}')
+                    frame = pd.DataFrame({key: np.asarray(value, dtype=float) for key, value in request.get('states', {}).items()})
+                    values, info = self.server.service.predict(parts[1], frame, request.get('attributes'), request.get('calibration'), request.get('strategy'))
+                    self._send_json({TARGETS[parts[1]]: [None if np.isnan(v) else float(v) for v in values], 'info': [str(i) for i in info]})
+            elif len(parts) == 2 and parts[0] == 'calibrate':
+                request = json.loads(body or b'{}')
+                frame = pd.DataFrame({key: np.asarray(value, dtype=float) for key, value in request.get('states', {}).items()})
+                self._send_json({'calibration': parts[1], 'fits': self.server.service.calibrate(parts[1], request.get('target'), frame, request.get('attributes'))})
+            else:
+                self._send_json({'error': f"Unknown endpoint {url.path}"}, 404)
+        except (ValueError, TypeError, KeyError) as error:
+            self._send_json({'error': str(error)}, 400)
+        except Exception as error: # e.g. an Arrow stream that cannot be decoded, answered rather than dropping the connection
+            self._send_json({'error': f"{type(error).__name__}: {error}"}, 500)
+
+    def _send_json(self, content, status=200):
+        self._send(json.dumps(content).encode(), 'application/json', status)
+
+    def _send(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host='127.0.0.1', port=8000, service=None):
+    """
+    Return a threaded HTTP server of a prediction service, to be run with serve_forever() and stopped with shutdown()
+
+    Parameters
+    ----------
+    host : str, optional
+        Address to listen on. Default is localhost only.
+    port : int, optional
+        Port to listen on; 0 selects a free port, available as server.server_address[1].
+    service : PredictionService, optional
+        Service answering the requests. A new one by default.
+
+    Example
+    -------
+    >>> server = make_server(port=0)
+    >>> threading.Thread(target=server.serve_forever, daemon=True).start()
+    """
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.service = service or PredictionService()
+    return server
+
+
+def main(argv=None):
+    """
+    Run the prediction service until interrupted
+    """
+    parser = argparse.ArgumentParser(prog='python -m pedophysics.service', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on (default 8000)')
+    parser.add_argument('--max-wait', type=float, default=0.005, help='Seconds a request waits for others of the same batch (default 0.005)')
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, PredictionService(max_wait=args.max_wait))
+    print(f"Serving pedophysics predictions on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,30 @@
 import numpy as np
 import pandas as pd
 
+from pedophysics.utils.precision import PRECISIONS
+from pedophysics.utils.diagnostics import DIAGNOSTICS, not_inverted
+
+# Soil attributes with one value per state, i.e. the columns of Soil.df
+ARRAY_LIKE_ATTRIBUTES = ['temperature', 'water', 'salinity', 'sand', 'silt', 'clay', 'porosity', 'bulk_density', 'particle_density', 'CEC',
+                         'orgm', 'bulk_perm', 'bulk_perm_inf', 'air_perm', 'water_perm', 'solid_perm', 'offset_perm', 
+                         'bulk_ec', 'bulk_ec_tc', 'bulk_ec_dc', 'bulk_ec_dc_tc', 'water_ec', 'solid_ec', 'dry_ec', 'sat_ec', 's_ec', 'frequency_perm', 'frequency_ec']
+
+# Soil attributes with a single value for all states, which can be modified by fitting predict functions
+SINGLE_VALUE_ATTRIBUTES = ['L', 'Lw', 'm', 'n', 'alpha', 'texture', 'instrument', 'range_ratio', 'E', 'F', 'roundn']
+
+# USDA soil texture classes, whose positions are the codes returned by Soil.texture_codes
+TEXTURES = ["Sand", "Loamy sand", "Sandy loam", "Loam", "Silt loam", "Silt", "Sandy clay loam", "Clay loam", "Silty clay loam", "Sandy clay", "Clay", "Silty clay"]
+
+# Array-like attributes rounded once calculated by predict functions, with their decimal places in addition to soil.roundn
+ROUNDING = {'water': 0, 'porosity': 0, 'bulk_perm': 0, 'water_perm': 0, 'salinity': 2, 'bulk_ec_dc': 2,
+            'bulk_ec': 3, 'bulk_ec_dc_tc': 3, 'water_ec': 3, 's_ec': 3, 'offset_perm': 3}
+
+def _copy_on_write():
+    """
+    Return whether pandas copies a column shared with another object before writing into it, as required by constant columns
+    """
+    return int(pd.__version__.split('.')[0]) >= 3 or pd.options.mode.copy_on_write is True
+
 class Soil(object):
     """
     A class to represent a soil sample with its characteristics.
@@ -71,10 +95,11 @@ class Soil(object):
         Soil cementation factor as defined in Archie law [-]
     n : single-value
         Soil saturation factor as defined in Archie second law [-]
-    alpha : single-value
-        Soil alpha exponent as defined in volumetric mixing theory [-]
-    texture : str
-        Soil texture according to USDA convention: "Sand", "Loamy sand", "Sandy loam", "Loam", "Silt loam", "Silt", "Sandy clay loam", "Clay loam", "Silty clay loam", "Sandy clay", "Clay", "Silty clay"
+    alpha : single-value or array-like
+        Soil alpha exponent as defined in volumetric mixing theory [-], for all states or for each state (NaN where unknown)
+    texture : str or array-like of str
+        Soil texture according to USDA convention: "Sand", "Loamy sand", "Sandy loam", "Loam", "Silt loam", "Silt", "Sandy clay loam", "Clay loam", "Silty clay loam", "Sandy clay", "Clay", "Silty clay",
+        for all states or for each state. Per-state textures, one per state with NaN where unknown, are stored as int8 codes (see Soil.texture_codes).
     instrument : str
         Instrument utilized: 'HydraProbe', 'TDR', 'GPR', 'Miller 400D', 'Dualem'
     info : DataFrame
@@ -87,20 +112,41 @@ class Soil(object):
         Empirical constant as in Rohades model [-]
     roundn : int
         Number of decimal places to round results.
+    raw : bool
+        If True, results are stored at full precision, without rounding to roundn decimals. Default is False.
+    drop_unconverged : bool
+        If True, numerical inversions leave missing the states where the solver failed or the residual exceeds the tolerance of the
+        inversion (see utils.diagnostics.TOLERANCES), instead of keeping the solver's result. Default is False.
     range_ratio : single-value
         Factor for extending extrapolation domain during fitting modelling
     n_states : int
         Number of soil states
+    precision : str
+        Storage precision of the array-like attributes: 'float64' (default) or 'float32'. Predict functions compute in float64
+        and store their results in this precision.
+    fits : dict
+        Parameters of the fitting approaches of predict functions, reused by their next calls while the calibration states are unchanged.
+    flags : np.ndarray
+        Bitmask of the validity checks failed in each state by the models applied by predict functions (see utils.validity.CHECKS).
+        utils.validity.validity(soil) returns them as a DataFrame of booleans.
+    diagnostics : dict
+        Per-state records of the numerical inversions of predict functions, by inversion (see utils.diagnostics.DIAGNOSTICS):
+        solver success and status, solver iterations, final residual, tolerance met and bound hit. utils.diagnostics.diagnostics(soil) returns them as a DataFrame.
 
     Notes
     -----
-    Attributes provided by the user that do not match the expected types or values 
+    Attributes provided by the user that do not match the expected types or values
     will raise a ValueError.
+
+    Array-like attributes that are not given, or given as a single value for all states, are stored in soil.df
+    (and their descriptions in soil.info) as read-only constant columns, which take no memory per state.
+    A constant column is copied to a regular one the first time a predict function writes into it.
+    This relies on the copy-on-write mode of pandas (default from pandas 3.0); otherwise all columns are regular arrays.
     """
 
     def __init__(self, **kwargs):
         # Define acceptable types for each argument
-        array_like_types = [float, np.float64, int, list, np.ndarray]
+        array_like_types = [float, np.float64, np.float32, int, list, np.ndarray]
         single_value = [float, np.float64, int]
         attributes = {
                 'temperature': array_like_types,
@@ -135,27 +181,33 @@ class Soil(object):
                 'Lw': single_value,
                 'm': single_value,
                 'n': single_value,
-                'alpha': single_value,
-                'texture': [str],
+                'alpha': single_value + [list, np.ndarray],
+                'texture': [str, list, np.ndarray],
                 'instrument': [str],
                 'range_ratio': single_value,
                 'n_states': single_value,
                 'E': single_value,
                 'F': single_value,
-                'roundn': [int]
+                'roundn': [int],
+                'precision': [str],
+                'raw': [bool],
+                'drop_unconverged': [bool]
                 }
 
         accepted_values = {
-            'texture': ["Sand", "Loamy sand", "Sandy loam", "Loam", "Silt loam", "Silt", "Sandy clay loam", "Clay loam", "Sandy clay", "Clay", "Silty clay", np.nan],
-            'instrument': ["TDR", "GPR", 'HydraProbe', 'EMI Dualem', 'EMI EM38-DD', np.nan]
+            'texture': TEXTURES + [np.nan],
+            'instrument': ["TDR", "GPR", 'HydraProbe', 'EMI Dualem', 'EMI EM38-DD', np.nan],
+            'precision': PRECISIONS
         }
 
         # Convert all inputs to np.ndarray if they are of type list, int, or float
         def to_ndarray(arg, key=None):
-            if key in ['texture', 'instrument']:
-                return arg  # return the argument if it is 'texture' or 'instrument'
-            if isinstance(arg, (list, int, np.float64, float)):
-                return np.array([arg]) if isinstance(arg, (int, np.float64, float)) else np.array(arg)
+            if key == 'texture' and isinstance(arg, (list, np.ndarray)):
+                return np.array(arg, dtype=object)  # per-state textures
+            if key in ['texture', 'instrument', 'precision', 'raw', 'drop_unconverged']:
+                return arg  # return the argument if it is 'texture', 'instrument', 'precision', 'raw' or 'drop_unconverged'
+            if isinstance(arg, (list, int, np.float64, np.float32, float)):
+                return np.array([arg]) if isinstance(arg, (int, np.float64, np.float32, float)) else np.array(arg)
             return arg
 
         # Check each input argument
@@ -165,8 +217,9 @@ class Soil(object):
                 value = kwargs[key]
 
                 if type(value) in attributes[key]:
-                    # if the key is 'texture' or 'instrument' verify if value is in the accepted_values
-                    if key in ['texture', 'instrument'] and value not in accepted_values[key]:
+                    # if the key is 'texture', 'instrument' or 'precision' verify if value is in the accepted_values (NaN marks states without texture)
+                    values = list(value) if key == 'texture' and isinstance(value, (list, np.ndarray)) else [value]
+                    if key in ['texture', 'instrument', 'precision'] and any(v not in accepted_values[key] and v == v for v in values):
                         raise ValueError(f"Invalid value for '{key}'. Must be one of {accepted_values[key]}")
                     setattr(self, key, to_ndarray(value, key=key))
                 else:
@@ -176,34 +229,46 @@ class Soil(object):
                 # If the key is not provided in the kwargs, set it as np.nan.
                 setattr(self, key, to_ndarray(np.nan, key=key))
             
-        self.roundn = 3 if np.isnan(self.roundn[0]) else self.roundn
+        self.roundn = 3 if np.isnan(self.roundn[0]) else int(self.roundn[0])
         self.range_ratio = 2 if np.isnan(self.range_ratio[0]) else self.range_ratio
+        self.precision = self.precision if isinstance(self.precision, str) else 'float64'
+        self.raw = self.raw is True
+        self.drop_unconverged = self.drop_unconverged is True
         
         ### Fill the state variables with nans when are shorter than n_states
-        array_like_attributes = ['temperature', 'water', 'salinity', 'sand', 'silt', 'clay', 'porosity', 'bulk_density', 'particle_density', 'CEC',
-                            'orgm', 'bulk_perm', 'bulk_perm_inf', 'air_perm', 'water_perm', 'solid_perm', 'offset_perm', 
-                            'bulk_ec', 'bulk_ec_tc', 'bulk_ec_dc', 'bulk_ec_dc_tc', 'water_ec', 'solid_ec', 'dry_ec', 'sat_ec', 's_ec', 'frequency_perm', 'frequency_ec']
+        array_like_attributes = ARRAY_LIKE_ATTRIBUTES
 
         # calculate the max length of the input arrays
         n_states = max([len(getattr(self, attr)) for attr in array_like_attributes])
         self.n_states = n_states                            # Number of states of the soil
 
-        # Now loop over each attribute in the list
+        if len(self.alpha) not in [1, n_states]:
+            raise ValueError(f"'alpha' must be a single value or have one value per state ({n_states})")
+        self.alpha = self.alpha.astype(np.float64)
+
+        # Per-state textures are stored as int8 codes, positions in TEXTURES (-1 where unknown)
+        if isinstance(self.texture, np.ndarray):
+            if len(self.texture) != n_states:
+                raise ValueError(f"'texture' must be a single value or have one value per state ({n_states})")
+            self.texture = pd.Categorical(self.texture, categories=TEXTURES).codes.astype(np.int8)
+
+        # Now loop over each attribute in the list. Attributes not given are left out, and a value given
+        # only in the first state is taken for all states, both stored as constant columns by _set_columns
+        columns = {}
         for attribute in array_like_attributes:
             attr = getattr(self, attribute)
-            
-            if len(attr) != n_states:
-                setattr(self, attribute, np.append(attr, [np.nan]*(n_states - len(attr))))        
 
-            if ~np.isnan(attr[0]) and (np.isnan(attr[1:(n_states)])).all():
-                setattr(self, attribute, np.append(attr[0], [attr[0]]*(n_states - 1)))     
+            if np.isnan(attr).all():
+                continue
 
-        ### Defining special attributes ### 
-        self.df = pd.DataFrame({attr: getattr(self, attr) for attr in array_like_attributes})
+            if ~np.isnan(attr[0]) and (np.isnan(attr[1:(n_states)])).all():
+                columns[attribute] = attr[0]
+            else:
+                columns[attribute] = np.append(attr, np.full(n_states - len(attr), np.nan))
 
-        # defining soil.info
-        self.info = self.df.where(pd.notna(self.df), 'nan')
-        self.info = self.info.where(pd.isna(self.df), 'Value given by the user')
+        ### Defining special attributes ###
+        self._set_columns(self, columns, n_states)
+        self.fits = {}
         
     # Simplify the getter methods using __getattr__
     def __getattr__(self, name):
@@ -239,4 +304,883 @@ class Soil(object):
         str
             String representation of the class as Soil.df
         """
-        return str(self.df)
\ No newline at end of file
+        return str(self.df)
+
+    @classmethod
+    def from_frame(cls, frame, columns=None, **kwargs):
+        """
+        Create a Soil object from the columns of a DataFrame and return
+
+        Columns named as an array-like Soil attribute, or renamed to one by `columns`, are taken as soil states;
+        other columns are ignored. The dtype of each column is validated once, and columns in the precision of the soil
+        (float64 by default) are not copied:
+        Soil.df shares their memory with `frame` until a predict function modifies them (pandas copy-on-write).
+
+        Parameters
+        ----------
+        frame : DataFrame
+            One row per soil state.
+        columns : dict, optional
+            Mapping of frame column names to Soil attribute names, e.g. {'theta': 'water', 'EC': 'bulk_ec'}.
+        **kwargs :
+            Other Soil attributes as in Soil(): single values (e.g. Lw, roundn, instrument),
+            and array-like attributes given as a single value for all states (e.g. water_ec=0.1).
+
+        Returns
+        -------
+        Soil
+            Soil object with one state per row of `frame`.
+
+        Notes
+        -----
+        As in Soil(), an array-like attribute given only in the first state is taken for all states.
+        Attributes with non-numeric columns, or given both as a column and a keyword argument, will raise a ValueError.
+
+        Example
+        -------
+        >>> frame = pd.DataFrame({'theta': [0.1, 0.2, np.nan], 'bulk_perm': [6, 11, 9], 'site': ['a', 'a', 'b']})
+        >>> sample = Soil.from_frame(frame, columns={'theta': 'water'}, frequency_perm=50e6)
+        >>> sample.df.water.values
+        array([0.1, 0.2, nan])
+        """
+        columns = columns or {}
+        names = {name: columns.get(name, name) for name in frame.columns}
+        invalid = [attribute for name, attribute in names.items() if name in columns and attribute not in ARRAY_LIKE_ATTRIBUTES]
+        if invalid:
+            raise ValueError(f"{invalid} are not array-like Soil attributes. Must be in {ARRAY_LIKE_ATTRIBUTES}")
+        names = {name: attribute for name, attribute in names.items() if attribute in ARRAY_LIKE_ATTRIBUTES}
+
+        repeated = [attribute for attribute in set(names.values()) if list(names.values()).count(attribute) > 1 or attribute in kwargs]
+        if repeated:
+            raise ValueError(f"{repeated} are given more than once")
+        for name, attribute in names.items():
+            if not pd.api.types.is_numeric_dtype(frame[name]) or pd.api.types.is_bool_dtype(frame[name]):
+                raise ValueError(f"'{attribute}' must be numeric, column '{name}' is {frame[name].dtype}")
+
+        # Single-valued attributes are validated by Soil()
+        broadcast = {key: value for key, value in kwargs.items() if key in ARRAY_LIKE_ATTRIBUTES}
+        for key, value in broadcast.items():
+            if np.size(value) != 1:
+                raise ValueError(f"'{key}' must be a single value or a column of frame")
+        soil = cls(**kwargs)
+
+        df = frame[list(names)].rename(columns=names)
+        dtype = soil._dtype()
+        df = df.astype({attribute: dtype for attribute in df.columns if df[attribute].dtype != dtype})
+        df.index = pd.RangeIndex(len(frame))
+        columns = {attribute: dtype.type(getattr(soil, attribute)[0]) for attribute in broadcast}
+        for attribute in df.columns:
+            values = df[attribute].values
+            if np.isnan(values).all():
+                continue
+            columns[attribute] = values[0] if len(df) > 1 and np.isnan(values[1:]).all() else df[attribute]
+
+        return cls._set_columns(soil, columns, len(frame))
+
+    @classmethod
+    def from_records(cls, records, columns=None, **kwargs):
+        """
+        Create a Soil object from a numpy structured (record) array, or a sequence of dicts, and return
+
+        Parameters
+        ----------
+        records : np.ndarray or sequence of dict
+            One record per soil state. The fields are handled as the columns of Soil.from_frame.
+        columns : dict, optional
+            Mapping of field names to Soil attribute names.
+        **kwargs :
+            Other Soil attributes, as in Soil.from_frame.
+
+        Returns
+        -------
+        Soil
+            Soil object with one state per record.
+
+        External functions
+        --------
+        from_frame : Create a Soil object from the columns of a DataFrame and return
+
+        Example
+        -------
+        >>> records = np.array([(0.1, 6.), (0.2, 11.)], dtype=[('water', 'f8'), ('bulk_perm', 'f8')])
+        >>> sample = Soil.from_records(records, frequency_perm=50e6)
+        """
+        if isinstance(records, np.ndarray) and records.dtype.names is not None:
+            # Field views of the records are copied once, so that predictions never write into `records`
+            frame = pd.DataFrame({name: records[name] for name in records.dtype.names})
+        else:
+            frame = pd.DataFrame.from_records(records)
+        return cls.from_frame(frame, columns=columns, **kwargs)
+
+    @classmethod
+    def from_arrow(cls, table, columns=None, **kwargs):
+        """
+        Create a Soil object from a pyarrow Table and return
+
+        Only the columns that map to Soil attributes are converted, with nulls taken as NaN.
+
+        Parameters
+        ----------
+        table : pyarrow.Table
+            One row per soil state, e.g. from pyarrow.parquet.read_table or pyarrow.csv.read_csv.
+        columns : dict, optional
+            Mapping of table column names to Soil attribute names.
+        **kwargs :
+            Other Soil attributes, as in Soil.from_frame.
+
+        Returns
+        -------
+        Soil
+            Soil object with one state per row of `table`.
+
+        External functions
+        --------
+        from_frame : Create a Soil object from the columns of a DataFrame and return
+
+        Example
+        -------
+        >>> table = pyarrow.table({'water': [0.1, 0.2, None], 'bulk_perm': [6., 11., 9.]})
+        >>> sample = Soil.from_arrow(table, frequency_perm=50e6)
+        """
+        columns = columns or {}
+        selected = [name for name in table.column_names if columns.get(name, name) in ARRAY_LIKE_ATTRIBUTES or name in columns]
+        return cls.from_frame(table.select(selected).to_pandas(), columns=columns, **kwargs)
+
+    def save(self, path, compression=None):
+        """
+        Write the states, provenance and single-value attributes of the soil to a compressed binary file
+
+        Every column of Soil.df is written in the precision of the soil (float64 by default), and every column of Soil.info as codes of its distinct
+        descriptions, so that the string-heavy provenance stays small, together with soil.flags and soil.diagnostics. Single-value attributes, including those
+        fitted by predict functions (e.g. Lw, E, F), are written as metadata. The file is written under
+        a temporary name and then renamed, so an interrupted run never leaves a truncated file behind.
+
+        Parameters
+        ----------
+        path : str
+            File path. A '.parquet' extension writes a Parquet file (requires pyarrow), any other writes a numpy '.npz' archive.
+        compression : str, optional
+            Parquet compression codec, 'zstd' by default. Numpy archives are always deflate-compressed.
+
+        Example
+        -------
+        >>> sample = Soil(bulk_perm = [7, 10, 14, 12], water = [0.05, 0.11, 0.17, np.nan], frequency_perm = 1e9)
+        >>> Water(sample)
+        >>> sample.save('sample.npz')
+        >>> Soil.load('sample.npz').Lw
+        0.042656374539049156
+        """
+        import json
+        import os
+
+        parameters = {key: self._to_json(getattr(self, key)) for key in SINGLE_VALUE_ATTRIBUTES}
+        parameters['n_states'] = self.n_states
+        parameters['precision'] = self.precision
+        parameters['raw'] = self.raw
+        parameters['drop_unconverged'] = self.drop_unconverged
+        parameters['fits'] = self.fits
+        info = {attribute: pd.factorize(self.info[attribute]) for attribute in ARRAY_LIKE_ATTRIBUTES}
+
+        directory, name = os.path.split(os.path.abspath(path))
+        temporary = os.path.join(directory, '.' + name + '.tmp')
+        if path.endswith('.parquet'):
+            import pyarrow
+            import pyarrow.parquet
+
+            columns = {attribute: pyarrow.array(self.df[attribute].values, pyarrow.from_numpy_dtype(self._dtype())) for attribute in ARRAY_LIKE_ATTRIBUTES}
+            columns.update({'info.' + attribute: pyarrow.DictionaryArray.from_arrays(codes, pyarrow.array(np.asarray(uniques, dtype=str)))
+                            for attribute, (codes, uniques) in info.items()})
+            columns['flags'] = pyarrow.array(self.flags)
+            columns.update({'diagnostics.' + inversion: pyarrow.StructArray.from_arrays([records[field] for field in DIAGNOSTICS.names], DIAGNOSTICS.names)
+                            for inversion, records in self.diagnostics.items()})
+            table = pyarrow.table(columns).replace_schema_metadata({'pedophysics': json.dumps(parameters, default=self._to_json)})
+            pyarrow.parquet.write_table(table, temporary, compression=compression or 'zstd')
+        else:
+            arrays = {attribute: self.df[attribute].values.astype(self._dtype()) for attribute in ARRAY_LIKE_ATTRIBUTES}
+            for attribute, (codes, uniques) in info.items():
+                arrays['info.' + attribute + '.codes'] = codes.astype(np.int32)
+                arrays['info.' + attribute + '.values'] = np.asarray(uniques, dtype=str)
+            with open(temporary, 'wb') as file:
+                np.savez_compressed(file, parameters=json.dumps(parameters, default=self._to_json), flags=self.flags, **arrays,
+                                    **{'diagnostics.' + inversion: records for inversion, records in self.diagnostics.items()})
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path, columns=None, info=True):
+        """
+        Read a soil written by Soil.save and return
+
+        Only the requested columns are read from the file; the other array-like attributes are NaN.
+
+        Parameters
+        ----------
+        path : str
+            File written by Soil.save, in Parquet ('.parquet') or numpy ('.npz') format.
+        columns : list of str, optional
+            Array-like attributes to read. All by default.
+        info : bool, optional
+            If True (default), the provenance of the read columns, soil.flags and soil.diagnostics are restored, otherwise they are set as in Soil().
+
+        Returns
+        -------
+        Soil
+            Soil object with the states, provenance and single-value attributes of the saved one.
+
+        Example
+        -------
+        >>> sample = Soil.load('sample.npz', columns=['water', 'bulk_perm'])
+        """
+        import json
+
+        columns = ARRAY_LIKE_ATTRIBUTES if columns is None else list(columns)
+        invalid = [attribute for attribute in columns if attribute not in ARRAY_LIKE_ATTRIBUTES]
+        if invalid:
+            raise ValueError(f"{invalid} are not array-like Soil attributes. Must be in {ARRAY_LIKE_ATTRIBUTES}")
+
+        if path.endswith('.parquet'):
+            import pyarrow.parquet
+
+            schema = pyarrow.parquet.read_schema(path)
+            parameters = json.loads(schema.metadata[b'pedophysics'])
+            flags = ['flags'] if info and 'flags' in schema.names else []
+            inversions = [name for name in schema.names if name.startswith('diagnostics.')] if info else []
+            table = pyarrow.parquet.read_table(path, columns=columns + flags + inversions + (['info.' + attribute for attribute in columns] if info else []))
+            arrays = {attribute: table.column(attribute).to_numpy() for attribute in columns}
+            flags = table.column('flags').to_numpy() if flags else None
+            diagnostics = {}
+            for name in inversions:
+                records, struct = np.empty(table.num_rows, dtype=DIAGNOSTICS), table.column(name).combine_chunks()
+                for field in DIAGNOSTICS.names:
+                    records[field] = struct.field(field).to_numpy(zero_copy_only=False)
+                diagnostics[name[len('diagnostics.'):]] = records
+            descriptions = {attribute: np.asarray(table.column('info.' + attribute).to_pylist(), dtype=object)
+                            for attribute in columns} if info else {}
+        else:
+            with np.load(path) as archive:
+                parameters = json.loads(str(archive['parameters']))
+                arrays = {attribute: archive[attribute] for attribute in columns}
+                flags = archive['flags'] if info and 'flags' in archive else None
+                diagnostics = {name[len('diagnostics.'):]: archive[name] for name in archive.files if name.startswith('diagnostics.')} if info else {}
+                descriptions = {attribute: archive['info.' + attribute + '.values'].astype(object)[archive['info.' + attribute + '.codes']]
+                                for attribute in columns} if info else {}
+
+        soil = cls(precision=parameters.pop('precision', 'float64'), raw=parameters.pop('raw', False),
+                   drop_unconverged=parameters.pop('drop_unconverged', False))
+        cls._set_columns(soil, {attribute: values.astype(soil._dtype(), copy=False) for attribute, values in arrays.items()
+                                if not np.isnan(values).all()}, parameters.pop('n_states'))
+        for attribute, values in descriptions.items():
+            if not (values == 'nan').all():
+                soil.info[attribute] = values
+                setattr(soil, attribute, np.where(soil._given(attribute), soil.df[attribute].values, np.nan))
+        if flags is not None:
+            soil.flags = flags.astype(np.uint8)
+        soil.diagnostics = diagnostics
+        fits = parameters.pop('fits', {}) if info else {}
+        soil.fits = {key: {name: {k: cls._from_json(v) for k, v in value.items()} if name == 'previous' else cls._from_json(value, list)
+                           for name, value in fit.items()} for key, fit in fits.items()}
+        for key, value in parameters.items():
+            setattr(soil, key, cls._from_json(value))
+        if isinstance(soil.texture, np.ndarray):
+            soil.texture = soil.texture.astype(np.int8)
+        return soil
+
+    def update(self, states=None, **kwargs):
+        """
+        Set values given by the user and reset the values calculated from them, so that the next predict calls recompute them
+
+        The values calculated by predict functions in the updated states are reset to NaN, while the fits stored in
+        soil.fits are kept and reused by the next predict calls. When a calibration state changes, i.e. a state with
+        at least two of water, bulk_perm and bulk_ec given, or when a single-value attribute is set, the fits no longer
+        hold for any state: every calculated value and fit is reset, and the next predict calls equal those on a new Soil.
+
+        Parameters
+        ----------
+        states : array-like of bool or int, optional
+            Soil states to update, as a boolean mask or positions. Default is all states.
+        **kwargs :
+            Array-like attributes, as a single value or one value per updated state (NaN removes a given value),
+            and single-value attributes as in Soil() (e.g. Lw, roundn).
+
+        Returns
+        -------
+        np.ndarray
+            Positions of the reset states.
+
+        Example
+        -------
+        >>> sample = Soil(bulk_perm = [7, 10, 14, 12], water = [0.05, 0.11, 0.17, np.nan], frequency_perm = 1e9)
+        >>> Water(sample)
+        >>> sample.update(states=[3], bulk_perm=13)
+        array([3])
+        >>> Water(sample)  # Only state 3 is recomputed, with the stored fit of Lw
+        array([0.05 , 0.11 , 0.17 , 0.156])
+        """
+        invalid = [key for key in kwargs if key not in ARRAY_LIKE_ATTRIBUTES + SINGLE_VALUE_ATTRIBUTES]
+        if invalid:
+            raise ValueError(f"{invalid} are not Soil attributes. Must be in {ARRAY_LIKE_ATTRIBUTES + SINGLE_VALUE_ATTRIBUTES}")
+        parameters = {key: value for key, value in kwargs.items() if key in SINGLE_VALUE_ATTRIBUTES}
+        # Validated on as many states as the soil, so that per-state textures are checked against them
+        validated = type(self)(water=np.full(self.n_states, np.nan), **parameters) if parameters else None
+
+        positions = np.arange(self.n_states) if states is None else np.arange(self.n_states)[np.asarray(states)]
+        calibration = self._calibration(positions)
+
+        for key, value in kwargs.items():
+            if key in ARRAY_LIKE_ATTRIBUTES:
+                values = np.broadcast_to(np.asarray(value, dtype=self._dtype()), positions.shape)
+                column = self.df[key].to_numpy(dtype=self._dtype(), copy=True)
+                column[positions] = values
+                self.df[key] = column
+                info = self.info[key].to_numpy(dtype=object, copy=True)
+                info[positions] = np.where(np.isnan(values), 'nan', 'Value given by the user')
+                self.info[key] = info
+                given = getattr(self, key).astype(self._dtype())
+                given[positions] = values
+                setattr(self, key, given)
+
+        full = bool(parameters) or (calibration | self._calibration(positions)).any()
+        return self._reset(None if full else positions, {key: getattr(validated, key) for key in parameters})
+
+    def append_states(self, **kwargs):
+        """
+        Append soil states with values given by the user, so that the next predict calls compute only the new states
+
+        The fits stored in soil.fits are reused for the new states. If a new state is a calibration state, i.e. it has
+        at least two of water, bulk_perm and bulk_ec given, every calculated value and fit is reset as in Soil.update.
+
+        Parameters
+        ----------
+        **kwargs :
+            Array-like attributes of the new states, as arrays of equal length or single values for all new states.
+
+        Returns
+        -------
+        np.ndarray
+            Positions of the reset states.
+
+        Example
+        -------
+        >>> sample = Soil(bulk_perm = [7, 10, 14, 12], water = [0.05, 0.11, 0.17, np.nan], frequency_perm = 1e9)
+        >>> Water(sample)
+        >>> sample.append_states(bulk_perm = [9, 11], frequency_perm = 1e9)
+        array([4, 5])
+        """
+        invalid = [key for key in kwargs if key not in ARRAY_LIKE_ATTRIBUTES]
+        if invalid:
+            raise ValueError(f"{invalid} are not array-like Soil attributes. Must be in {ARRAY_LIKE_ATTRIBUTES}")
+        arrays = {key: np.atleast_1d(np.asarray(value, dtype=np.float64)) for key, value in kwargs.items()}
+        n_new = max([len(values) for values in arrays.values()], default=0)
+        if any(len(values) not in [1, n_new] for values in arrays.values()):
+            raise ValueError("Array-like attributes must have the same length or a single value")
+
+        positions = np.arange(self.n_states, self.n_states + n_new)
+        df, info, flags, diagnostics = self.df, self.info, self.flags, self.diagnostics
+        self._set_columns(self, {attribute: np.concatenate([getattr(self, attribute), np.broadcast_to(arrays.get(attribute, np.nan), n_new)])
+                                 for attribute in ARRAY_LIKE_ATTRIBUTES if attribute in arrays or not np.isnan(getattr(self, attribute)).all()},
+                          self.n_states + n_new)
+
+        # Values and descriptions of the previous states are kept, for the attributes that are not missing in all of them
+        for attribute in ARRAY_LIKE_ATTRIBUTES:
+            if df[attribute].notna().any() or (info[attribute] != 'nan').any():
+                self.df[attribute] = np.concatenate([df[attribute].values, self.df[attribute].values[positions]])
+                self.info[attribute] = np.concatenate([info[attribute].to_numpy(dtype=object), self.info[attribute].to_numpy(dtype=object)[positions]])
+        self.flags[:len(flags)] = flags
+        self.diagnostics = {inversion: np.concatenate([records, not_inverted(n_new)]) for inversion, records in diagnostics.items()}
+        if isinstance(self.texture, np.ndarray):
+            self.texture = np.concatenate([self.texture, np.full(n_new, -1, dtype=np.int8)])
+        if len(self.alpha) > 1:
+            self.alpha = np.concatenate([self.alpha, np.full(n_new, np.nan)])
+
+        return self._reset(None if self._calibration(positions).any() else positions)
+
+    def copy(self):
+        """
+        Return a copy of the soil, so that predict functions called on the copy leave this soil unchanged
+
+        The columns of soil.df and soil.info are shared with the copy until a predict function replaces them
+        (pandas copy-on-write), so that a copy takes no memory per state; without copy-on-write in pandas, they are copied.
+        soil.fits, soil.flags, soil.diagnostics and the single-value attributes, which predict functions set as well, are copied.
+
+        Returns
+        -------
+        Soil
+            Soil object with the states, provenance, fits and single-value attributes of this one.
+
+        Example
+        -------
+        >>> sample = Soil(bulk_perm = [7, 10, 14], frequency_perm = 1e9, porosity = 0.4, clay = 20)
+        >>> Water(sample.copy())
+        array([0.106, 0.165, 0.234])
+        >>> sample.df.water.values
+        array([nan, nan, nan])
+        """
+        import copy
+
+        soil = copy.copy(self)
+        soil.df = self.df.copy(deep=not _copy_on_write())
+        soil.info = self.info.copy(deep=not _copy_on_write())
+        soil.fits = copy.deepcopy(self.fits)
+        soil.flags = self.flags.copy()
+        soil.diagnostics = {inversion: records.copy() for inversion, records in self.diagnostics.items()}
+        soil._constants = dict(self._constants)
+        # A copy taken during a predict call on this soil is not part of that call
+        soil._computing, soil._strategy = False, None
+        for key in SINGLE_VALUE_ATTRIBUTES:
+            if isinstance(getattr(soil, key, None), np.ndarray):
+                setattr(soil, key, getattr(soil, key).copy())
+        return soil
+
+    def texture_codes(self):
+        """
+        Return the USDA texture class of each state as int8 codes, i.e. positions in TEXTURES, with -1 where it is unknown
+
+        soil.texture is a single class for all states, or the codes of the class of each state given as per-state
+        textures. States appended after the per-state classes were given have unknown texture.
+
+        Returns
+        -------
+        np.ndarray
+            Texture code of each state.
+
+        Example
+        -------
+        >>> sample = Soil(water = [0.1, 0.2, 0.3], texture = ['Sand', 'Loam', np.nan])
+        >>> sample.texture_codes()
+        array([ 0,  3, -1], dtype=int8)
+        """
+        if isinstance(self.texture, np.ndarray):
+            return self.texture
+        code = TEXTURES.index(self.texture) if self.texture in TEXTURES else -1
+        return np.full(self.n_states, code, dtype=np.int8)
+
+    def _given(self, attribute, positions=slice(None)):
+        """
+        Return whether the values of an array-like attribute in the given positions were given by the user
+        """
+        codes, descriptions = pd.factorize(self.info[attribute].to_numpy(dtype=object)[positions])
+        return np.array([str(description).startswith('Value given by the user') for description in descriptions], dtype=bool)[codes]
+
+    def _calibration(self, positions):
+        """
+        Return whether the states in the given positions are calibration states of the fitting approaches
+        """
+        water = self._given('water', positions)
+        bulk_perm = self._given('bulk_perm', positions)
+        bulk_ec = np.any([self._given(attribute, positions) for attribute in ['bulk_ec', 'bulk_ec_tc', 'bulk_ec_dc', 'bulk_ec_dc_tc']], axis=0)
+        return water.astype(int) + bulk_perm + bulk_ec >= 2
+
+    def _reset(self, positions=None, parameters=None):
+        """
+        Reset the values calculated by predict functions in the given positions (all states and fits if None) and return the positions
+        """
+        # Single-value attributes are set back to their values before the first fit
+        for fit in reversed(list(self.fits.values())):
+            for key, value in fit['previous'].items():
+                setattr(self, key, value)
+
+        if positions is None:
+            self.fits = {}
+            self.diagnostics = {}
+            positions = np.arange(self.n_states)
+        self.flags[positions] = 0
+        for records in self.diagnostics.values():
+            records[positions] = not_inverted(len(positions))
+        for key, value in (parameters or {}).items():
+            setattr(self, key, value)
+
+        for attribute in ARRAY_LIKE_ATTRIBUTES:
+            calculated = positions[~self._given(attribute, positions)]
+            # States still missing are left as they are, so that constant columns are not copied
+            calculated = calculated[~np.isnan(self.df[attribute].values[calculated]) | (self.info[attribute].values[calculated] != 'nan')]
+            if len(calculated):
+                column = self.df[attribute].to_numpy(dtype=self._dtype(), copy=True)
+                column[calculated] = np.nan
+                self.df[attribute] = column
+                info = self.info[attribute].to_numpy(dtype=object, copy=True)
+                info[calculated] = 'nan'
+                self.info[attribute] = info
+        return positions
+
+    @staticmethod
+    def _to_json(value):
+        """
+        Convert a single-value attribute to a JSON serializable value and return
+        """
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    @staticmethod
+    def _from_json(value, sequence=np.array):
+        """
+        Convert a value written by Soil.save back to the types used by predict functions and return
+        """
+        if isinstance(value, list):
+            return sequence([Soil._from_json(item) for item in value])
+        if isinstance(value, float):
+            return np.float64(value)
+        return value
+
+    @staticmethod
+    def _set_columns(soil, columns, n_states):
+        """
+        Set the states of a Soil object from its given array-like attributes and return
+
+        `columns` maps attributes to arrays or Series of n_states values, or to a single value for all states.
+        Attributes left out and single values become constant columns of soil.df and soil.info.
+        With float32 precision, arrays and single values are converted to float32.
+        """
+        soil.n_states = n_states
+        soil.flags = np.zeros(n_states, dtype=np.uint8)
+        soil.diagnostics = {}
+        soil._constants = {}
+        dtype = soil._dtype() if soil.precision == 'float32' else None
+        absent, missing, given = (soil._constant(value, n_states) for value in [soil._dtype().type(np.nan), 'nan', 'Value given by the user'])
+
+        df, info = {}, {}
+        for attribute in ARRAY_LIKE_ATTRIBUTES:
+            values = columns.get(attribute, np.nan)
+            if np.ndim(values) == 0:
+                df[attribute] = absent if np.isnan(values) else soil._constant(values if dtype is None else dtype.type(values), n_states)
+                info[attribute] = missing if np.isnan(values) else given
+                setattr(soil, attribute, np.asarray(df[attribute]))
+                continue
+
+            # Arrays are copied, so that predict functions never write into the user values; Series are shared copy-on-write
+            df[attribute] = values if isinstance(values, pd.Series) else np.array(values, dtype=dtype)
+            setattr(soil, attribute, np.asarray(values, dtype=dtype))
+            nans = np.isnan(getattr(soil, attribute))
+            info[attribute] = missing if nans.all() else given if not nans.any() else np.where(nans, missing, given)
+
+        index = pd.RangeIndex(n_states)
+        soil.df = pd.DataFrame(df, index=index, copy=not _copy_on_write())
+        soil.info = pd.DataFrame(info, index=index, dtype=object, copy=not _copy_on_write())
+        return soil
+
+    def _constant(self, value, n_states):
+        """
+        Return a read-only column with the same value in all states, which takes no memory per state
+
+        A reference to the column is kept in soil._constants, so that pandas copies it before any in-place write.
+        Without copy-on-write in pandas, a regular array is returned instead.
+        """
+        dtype = np.dtype(object) if isinstance(value, str) else np.asarray(value).dtype
+        if not _copy_on_write():
+            return np.full(n_states, value, dtype=dtype)
+        key = (dtype.str, str(value))
+        if key not in self._constants:
+            self._constants[key] = pd.Series(np.broadcast_to(np.array(value, dtype=dtype), n_states), dtype=dtype, copy=False)
+        return self._constants[key]
+
+    def _missing(self):
+        """
+        Return the states with missing values of the attributes in ROUNDING, as boolean arrays
+        """
+        return {attribute: self.df[attribute].isna().values for attribute in ROUNDING}
+
+    def _round(self, missing):
+        """
+        Round the values calculated in the states that were missing, to soil.roundn plus the decimal places in ROUNDING
+        """
+        for attribute, states in missing.items():
+            values = self.df[attribute].to_numpy(dtype=np.float64)
+            calculated = states & ~np.isnan(values)
+            if calculated.any():
+                column = values.copy()
+                column[calculated] = np.round(values[calculated], self.roundn + ROUNDING[attribute])
+                self.df[attribute] = column
+
+    def _dtype(self):
+        """
+        Return the numpy dtype of the storage precision of the soil
+        """
+        return np.dtype(self.precision)
+
+    def _set_precision(self, dtype):
+        """
+        Convert the numeric columns of soil.df to dtype, keeping constant columns constant
+        """
+        dtype = np.dtype(dtype)
+        for attribute in ARRAY_LIKE_ATTRIBUTES:
+            values = self.df[attribute].values
+            if np.issubdtype(values.dtype, np.number) and values.dtype != dtype:
+                self.df[attribute] = self._constant(dtype.type(values[0]), self.n_states) if values.strides == (0,) else values.astype(dtype)
+
+# Default sampling distributions used by synthetic_states. Each entry is a tuple
+# (kind, *parameters) with kind one of 'uniform', 'normal', 'lognormal', 'choice' or 'constant'.
+DEFAULT_DISTRIBUTIONS = {
+    'clay': ('uniform', 2, 50),                     # [g/g]*100
+    'silt': ('uniform', 5, 60),                     # [g/g]*100, limited to 100 - clay
+    'porosity': ('uniform', 0.30, 0.55),            # [m**3/m**3]
+    'saturation': ('uniform', 0.05, 1.0),           # water = saturation*porosity
+    'salinity': ('lognormal', np.log(0.01), 0.8),   # [mol/L]
+    'temperature': ('normal', 288.15, 5),           # [K]
+    'CEC': ('uniform', 2, 40),                      # [meq/100g]
+    'frequency_perm': ('choice', [50e6, 200e6, 1e9]),   # HydraProbe, TDR, GPR [Hz]
+    'frequency_ec': ('choice', [9e3, 16e3]),            # EMI Dualem, EMI EM38-DD [Hz]
+    'solid_perm': ('constant', 4),
+    'air_perm': ('constant', 1.2),
+    'bulk_perm_inf': ('constant', 5),
+    'solid_ec': ('constant', 0),
+    's_ec': ('constant', 0.001),
+    'alpha': ('constant', 0.5),
+}
+
+
+def _sample(rng, spec, n_states):
+    """
+    Draw n_states values from a distribution specification and return
+
+    Parameters
+    ----------
+    rng : np.random.Generator
+        Random number generator.
+    spec : tuple, float or callable
+        Distribution specification as in DEFAULT_DISTRIBUTIONS, a constant value,
+        or a callable f(rng, n_states) returning an array.
+    n_states : int
+        Number of values to draw.
+
+    Returns
+    -------
+    np.ndarray
+        Sampled values.
+    """
+    if callable(spec):
+        return np.asarray(spec(rng, n_states), dtype=float)
+    if not isinstance(spec, tuple):
+        return np.full(n_states, spec, dtype=float)
+
+    kind, params = spec[0], spec[1:]
+    if kind == 'uniform':
+        return rng.uniform(params[0], params[1], n_states)
+    if kind == 'normal':
+        return rng.normal(params[0], params[1], n_states)
+    if kind == 'lognormal':
+        return rng.lognormal(params[0], params[1], n_states)
+    if kind == 'choice':
+        return rng.choice(np.asarray(params[0], dtype=float), n_states, p=params[1] if len(params) > 1 else None)
+    if kind == 'constant':
+        return np.full(n_states, params[0], dtype=float)
+    raise ValueError(f"Unknown distribution '{kind}'. Must be one of ['uniform', 'normal', 'lognormal', 'choice', 'constant']")
+
+
+def synthetic_states(n_states, seed=None, distributions=None, noise=None, ec_model='Fu', precision='float64'):
+    """
+    Sample synthetic soil states and their forward-modelled observations and return
+
+    Texture, porosity, water content, salinity, temperature and instrument frequencies are sampled 
+    from configurable distributions. Consistent observations are then computed with the pedophysical models 
+    used by the predict module: water_ec with SenGoode, bulk_ec_dc_tc with Fu (or Rhoades), bulk_ec with 
+    LongmireSmithEC and bulk_perm with LongmireSmithP, LR_MV, LR or LR_W depending on the frequency_perm band.
+
+    Parameters
+    ----------
+    n_states : int
+        Number of soil states to generate.
+    seed : int or np.random.Generator, optional
+        Seed of the random number generator. The same seed always returns the same states.
+    distributions : dict, optional
+        Sampling distributions overriding DEFAULT_DISTRIBUTIONS, e.g. {'clay': ('uniform', 10, 20), 'temperature': 293.15}.
+    noise : float or dict, optional
+        Relative standard deviation of the gaussian noise added to the observations. 
+        A float applies to bulk_perm and bulk_ec, a dict maps any returned property to its own level.
+    ec_model : str, optional
+        Model for bulk_ec_dc_tc: 'Fu' (default) or 'Rhoades'.
+    precision : str, optional
+        Precision of the returned columns: 'float64' (default) or 'float32'. The states are always computed in float64.
+
+    Returns
+    -------
+    DataFrame
+        One row per state with the sampled properties and the modelled observations.
+
+    External functions
+    --------
+    SenGoode : Calculate soil water real electrical conductivity using the Sen and Goode model and return
+    Olhoeft : Calculate soil water phase real dielectric permittivity using the Olhoeft (1986) model and return
+    Fu : Calculate the soil bulk real electrical conductivity using the Fu model and return
+    Rhoades : Calculate the soil bulk real electrical conductivity using the Rhoades model and return
+    SheetsHendrickx : Calculate the soil bulk real electrical conductivity using the Sheets-Hendricks model and return
+    LongmireSmithEC : Calculate the soil bulk real electrical conductivity using the Longmire-Smith model and return
+    LongmireSmithP : Calculate the soil bulk real relative dielectric permittivity using the Longmire-Smith model and return
+    LR_MV, LR, LR_W : Calculate the soil bulk real relative dielectric permittivity using the Lichtenecker and Rother models and return
+
+    Notes
+    -----
+    Water content is sampled as a relative saturation of the porosity, sand is the remainder of clay and silt,
+    and water_perm follows the defaults of predict.WaterPerm (Olhoeft below 100 MHz, 80 otherwise).
+
+    Example
+    -------
+    >>> states = synthetic_states(1000, seed=42, noise=0.01)
+    >>> sample = Soil(bulk_perm=states.bulk_perm.values, frequency_perm=states.frequency_perm.values, 
+                      clay=states.clay.values, porosity=states.porosity.values)
+    """
+    from pedophysics.pedophysical_models.water_ec import SenGoode
+    from pedophysics.pedophysical_models.water_perm import Olhoeft
+    from pedophysics.pedophysical_models.bulk_ec import Fu, Rhoades, SheetsHendrickx, LongmireSmithEC
+    from pedophysics.pedophysical_models.bulk_perm import LongmireSmithP, LR_MV, LR, LR_W
+
+    if ec_model not in ['Fu', 'Rhoades']:
+        raise ValueError("'ec_model' must be one of ['Fu', 'Rhoades']")
+    if precision not in PRECISIONS:
+        raise ValueError(f"'precision' must be one of {PRECISIONS}")
+
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    specs = dict(DEFAULT_DISTRIBUTIONS, **(distributions or {}))
+    s = {key: _sample(rng, specs[key], n_states) for key in DEFAULT_DISTRIBUTIONS}
+
+    # Texture fractions summing 100
+    clay = np.clip(s['clay'], 0, 100)
+    silt = np.clip(s['silt'], 0, 100 - clay)
+    porosity = np.clip(s['porosity'], 0.01, 0.99)
+    water = np.clip(s['saturation'], 0, 1)*porosity
+    salinity = np.clip(s['salinity'], 0, None)
+    temperature = s['temperature']
+    frequency_perm = s['frequency_perm']
+
+    # Pore water properties
+    water_ec = SenGoode(temperature, salinity)
+    water_perm = np.where(frequency_perm < 100e6, Olhoeft(temperature, salinity), 80.)
+
+    # Electrical conductivity chain: bulk_ec_dc_tc -> bulk_ec_dc -> bulk_ec
+    if ec_model == 'Fu':
+        bulk_ec_dc_tc = Fu(water, clay, porosity, water_ec, s['solid_ec'], np.nan, np.nan)
+    else:
+        bulk_ec_dc_tc = Rhoades(water, water_ec, s['s_ec'], 1, 0.38)
+    bulk_ec_dc = bulk_ec_dc_tc/SheetsHendrickx(1., temperature)
+    bulk_ec = LongmireSmithEC(bulk_ec_dc, s['frequency_ec'])
+
+    # Permittivity by frequency band, as in predict.bulk_perm.non_fitting
+    bulk_perm = np.full(n_states, np.nan)
+    args = (water, porosity, s['air_perm'], s['solid_perm'], water_perm)
+    bands = [((frequency_perm >= 5) & (frequency_perm < 30e6), lambda m: LongmireSmithP(bulk_ec_dc[m], s['bulk_perm_inf'][m], frequency_perm[m])),
+             ((frequency_perm >= 30e6) & (frequency_perm < 100e6), lambda m: LR_MV(*[a[m] for a in args], s['CEC'][m])),
+             ((frequency_perm >= 100e6) & (frequency_perm < 200e6), lambda m: LR(*[a[m] for a in args], s['alpha'][m])),
+             ((frequency_perm >= 200e6) & (frequency_perm <= 30e9), lambda m: LR_W(*[a[m] for a in args], clay[m]))]
+    for mask, model in bands:
+        if mask.any():
+            bulk_perm[mask] = model(mask)
+
+    states = pd.DataFrame({'temperature': temperature, 'water': water, 'salinity': salinity, 'sand': 100 - clay - silt,
+                           'silt': silt, 'clay': clay, 'porosity': porosity, 'CEC': s['CEC'], 'bulk_perm': bulk_perm,
+                           'bulk_perm_inf': s['bulk_perm_inf'], 'air_perm': s['air_perm'], 'water_perm': water_perm,
+                           'solid_perm': s['solid_perm'], 'bulk_ec': bulk_ec, 'bulk_ec_dc': bulk_ec_dc,
+                           'bulk_ec_dc_tc': bulk_ec_dc_tc, 'water_ec': water_ec, 'solid_ec': s['solid_ec'],
+                           'frequency_perm': frequency_perm, 'frequency_ec': s['frequency_ec']})
+
+    # Optional multiplicative gaussian noise on the observations
+    if noise is not None:
+        levels = noise if isinstance(noise, dict) else {'bulk_perm': noise, 'bulk_ec': noise}
+        for key, level in levels.items():
+            states[key] = states[key]*(1 + rng.normal(0, level, n_states))
+
+    return states.astype(precision)
+
+
+def synthetic_soil(n_states, observed=('bulk_perm', 'bulk_ec', 'frequency_perm', 'frequency_ec', 'clay', 'porosity', 'temperature'), **kwargs):
+    """
+    Create a Soil object from synthetic states and return
+
+    Parameters
+    ----------
+    n_states : int
+        Number of soil states to generate.
+    observed : sequence of str, optional
+        Properties passed to the Soil object; the remaining ones are left for the predict module to estimate.
+    **kwargs : 
+        Keyword arguments of synthetic_states (seed, distributions, noise, ec_model, precision).
+        The precision is also that of the Soil object.
+
+    Returns
+    -------
+    tuple
+        (Soil, DataFrame): the Soil object with the observed properties and the complete synthetic states.
+
+    External functions
+    --------
+    synthetic_states : Sample synthetic soil states and their forward-modelled observations and return
+    """
+    states = synthetic_states(n_states, **kwargs)
+    return Soil(**{key: states[key].values for key in observed}, precision=kwargs.get('precision', 'float64')), states
+
+
+def synthetic_chunks(n_states, chunk_size=1000000, seed=None, **kwargs):
+    """
+    Yield synthetic soil states in chunks of at most chunk_size states
+
+    Every chunk is generated with its own child seed spawned from `seed`, so a given (seed, chunk_size) 
+    pair always yields the same workload, whatever the total number of states.
+
+    Parameters
+    ----------
+    n_states : int
+        Total number of soil states.
+    chunk_size : int, optional
+        Maximum number of states per chunk.
+    seed : int, optional
+        Root seed of the chunk generators.
+    **kwargs : 
+        Keyword arguments of synthetic_states (distributions, noise, ec_model, precision).
+
+    Yields
+    ------
+    DataFrame
+        Synthetic states of the chunk, indexed by their global state number.
+
+    External functions
+    --------
+    synthetic_states : Sample synthetic soil states and their forward-modelled observations and return
+    """
+    n_chunks = int(np.ceil(n_states/chunk_size))
+    for i, child in enumerate(np.random.SeedSequence(seed).spawn(n_chunks)):
+        start = i*chunk_size
+        chunk = synthetic_states(min(chunk_size, n_states - start), seed=np.random.default_rng(child), **kwargs)
+        chunk.index = chunk.index + start
+        yield chunk
+
+
+def write_synthetic(path, n_states, chunk_size=1000000, fmt='csv', **kwargs):
+    """
+    Write synthetic soil states to chunked files and return their paths
+
+    Parameters
+    ----------
+    path : str
+        Directory where the chunk files 'part-00000.<fmt>', 'part-00001.<fmt>', ... are written.
+    n_states : int
+        Total number of soil states.
+    chunk_size : int, optional
+        Maximum number of states per file.
+    fmt : str, optional
+        File format: 'csv' or 'npz' (compressed numpy archive with one array per property).
+    **kwargs : 
+        Keyword arguments of synthetic_chunks (seed, distributions, noise, ec_model, precision).
+
+    Returns
+    -------
+    list
+        Paths of the written files.
+
+    External functions
+    --------
+    synthetic_chunks : Yield synthetic soil states in chunks of at most chunk_size states
+    """
+    import os
+
+    if fmt not in ['csv', 'npz']:
+        raise ValueError("'fmt' must be one of ['csv', 'npz']")
+    os.makedirs(path, exist_ok=True)
+
+    paths = []
+    for i, chunk in enumerate(synthetic_chunks(n_states, chunk_size, **kwargs)):
+        file = os.path.join(path, f"part-{i:05d}.{fmt}")
+        if fmt == 'csv':
+            chunk.to_csv(file, index_label='state')
+        else:
+            np.savez_compressed(file, state=chunk.index.values, **{col: chunk[col].values for col in chunk.columns})
+        paths.append(file)
+    return paths
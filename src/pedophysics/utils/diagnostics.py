@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+# Record of an inversion in one state: solver success and status (0 for closed-form, tabulated and bisection solutions), number of
+# solver iterations (0 for closed-form and tabulated solutions, -1 where the state was not inverted), final residual
+# |model(x) - target|, whether the residual is within the tolerance of the inversion and whether x is at a bound
+DIAGNOSTICS = np.dtype([('converged', '?'), ('status', 'i1'), ('iterations', 'i2'), ('residual', 'f4'), ('within_tolerance', '?'), ('bound', '?')])
+
+# Relative and absolute tolerances on the residual of each inversion, in the unit of its target: S/m for the conductivities
+# and none for bulk_perm. The absolute floor keeps the tolerance of targets at or near zero above the solvers' precision
+TOLERANCES = {'predict.salinity.Salinity': (1e-3, 1e-5),
+              'predict.bulk_ec_dc.tc_to_non_tc': (1e-3, 1e-5),
+              'predict.bulk_ec_dc.non_dc_to_dc': (1e-3, 1e-5),
+              'predict.water_from_ec.non_fitting': (1e-3, 1e-5),
+              'predict.water_from_ec.fitting': (1e-3, 1e-5),
+              'predict.water_from_perm.non_fitting': (1e-3, 1e-3),
+              'predict.water_from_perm.fitting': (1e-3, 1e-3)}
+
+
+def not_inverted(n_states):
+    """
+    Return the diagnostics of n_states states that were not inverted
+    """
+    diagnostics = np.zeros(n_states, dtype=DIAGNOSTICS)
+    diagnostics['iterations'] = -1
+    diagnostics['residual'] = np.nan
+    return diagnostics
+
+
+def record(soil, inversion, states, x, residual, iterations, target, bounds, status=0):
+    """
+    Record the diagnostics of an inversion in soil.diagnostics and return its solutions
+
+    Parameters
+    ----------
+    soil : object
+        Soil object with the diagnostics dict and the drop_unconverged attribute.
+    inversion : str
+        Name of the inversion, i.e. of the predict function solving it (e.g. 'predict.bulk_ec_dc.non_dc_to_dc'), key of TOLERANCES.
+    states : array-like of bool
+        States where the inversion is solved.
+    x : array-like
+        Solution in each solved state.
+    residual : array-like
+        Final residual |model(x) - target| in each solved state.
+    iterations : int or array-like
+        Solver iterations in each solved state.
+    target : array-like
+        Value matched by the model in each solved state.
+    bounds : tuple
+        Lower and upper bounds of the solutions.
+    status : int or array-like, optional
+        Solver status in each solved state, 0 where the solver succeeded (scipy.optimize.minimize result.status). Default is 0.
+
+    Returns
+    -------
+    np.ndarray
+        Solution in each solved state, NaN where the residual is NaN. If soil.drop_unconverged is True, also NaN where
+        the solver failed or the residual exceeds the tolerance of the inversion.
+
+    Example
+    -------
+    >>> sample = Soil(bulk_ec = [0.01, 0.02])
+    >>> record(sample, 'predict.bulk_ec_dc.non_dc_to_dc', [True, True], [0.1, 1], [1e-9, 0.5], 8, [0.01, 0.02], (0, 1))
+    array([0.1, 1. ])
+    >>> sample.diagnostics['predict.bulk_ec_dc.non_dc_to_dc']
+    array([( True, 0, 8, 1.e-09,  True, False), ( True, 0, 8, 5.e-01, False,  True)],
+          dtype=[('converged', '?'), ('status', 'i1'), ('iterations', '<i2'), ('residual', '<f4'), ('within_tolerance', '?'), ('bound', '?')])
+    """
+    states = np.asarray(states, dtype=bool)
+    x, residual, target = (np.asarray(values, dtype=np.float64) for values in (x, residual, target))
+    rtol, atol = TOLERANCES[inversion]
+    converged = np.asarray(status) == 0
+    with np.errstate(invalid='ignore'):
+        within_tolerance = residual <= np.maximum(rtol*np.abs(target), atol)
+
+    diagnostics = soil.diagnostics.setdefault(inversion, not_inverted(soil.n_states))
+    diagnostics['converged'][states] = converged
+    diagnostics['status'][states] = status
+    diagnostics['iterations'][states] = iterations
+    diagnostics['residual'][states] = residual
+    diagnostics['within_tolerance'][states] = within_tolerance
+    diagnostics['bound'][states] = (x == bounds[0]) | (x == bounds[1])
+    kept = ~np.isnan(residual) & (converged & within_tolerance if soil.drop_unconverged else True)
+    return np.where(kept, x, np.nan)
+
+
+def diagnostics(soil):
+    """
+    Return soil.diagnostics as a DataFrame with a column per inversion and field of DIAGNOSTICS
+
+    Example
+    -------
+    >>> sample = Soil(bulk_ec = [0.01, 0.02, 5], frequency_ec = 1e4)
+    >>> BulkECDC(sample)
+    array([0.0091 , 0.01854, 1.     ])
+    >>> diagnostics(sample)
+      predict.bulk_ec_dc.non_dc_to_dc
+                            converged status iterations      residual within_tolerance  bound
+    0                            True      0          4  3.382974e-09             True  False
+    1                            True      0          3  4.471433e-07             True  False
+    2                            True      0          1  3.974712e+00            False   True
+    """
+    return pd.DataFrame({(inversion, field): records[field] for inversion, records in soil.diagnostics.items() for field in DIAGNOSTICS.names},
+                        index=soil.df.index)
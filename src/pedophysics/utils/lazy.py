@@ -0,0 +1,59 @@
+import importlib
+import sys
+
+def lazy_package(package, submodules, attributes):
+    """
+    Return the __getattr__ and __dir__ functions of a package whose submodules are imported on first access
+
+    The package attributes are resolved as with star imports of its submodules (PEP 562): a name listed in `attributes`
+    imports only its submodule, and any other public name is searched in the submodules, the later ones taking precedence.
+    `from package import *` imports every submodule.
+
+    Parameters
+    ----------
+    package : str
+        Name of the package, i.e. `__name__` in its __init__.py.
+    submodules : list of str
+        Submodules in the order they were star-imported.
+    attributes : dict
+        Mapping of public names to the submodule defining them.
+
+    Returns
+    -------
+    tuple
+        (__getattr__, __dir__) to be set at module level in the package __init__.py.
+
+    Example
+    -------
+    >>> __getattr__, __dir__ = lazy_package(__name__, ['water', 'water_perm'], {'Water': 'water', 'WaterPerm': 'water_perm'})
+    """
+    def public_names(module):
+        return getattr(module, '__all__', None) or [name for name in vars(module) if not name.startswith('_')]
+
+    def __getattr__(name):
+        if name in submodules:
+            return importlib.import_module(f'{package}.{name}')
+
+        if name == '__all__':
+            names = list(dict.fromkeys(name for submodule in submodules for name in public_names(__getattr__(submodule))))
+            setattr(sys.modules[package], '__all__', names)
+            return names
+
+        if name in attributes:
+            value = getattr(__getattr__(attributes[name]), name)
+        else:
+            for submodule in reversed(submodules):
+                module = __getattr__(submodule)
+                if not name.startswith('_') and hasattr(module, name):
+                    value = getattr(module, name)
+                    break
+            else:
+                raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+        setattr(sys.modules[package], name, value) # Later accesses skip __getattr__
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | set(submodules) | set(attributes))
+
+    return __getattr__, __dir__
@@ -0,0 +1,38 @@
+import numpy as np
+
+def computable(soil, attribute, inputs, states=None):
+    """
+    Return the mask of the states where soil.df[attribute] is missing and all the inputs of its model are known
+
+    Predict functions evaluate their models and solvers on the states of this mask only, and scatter the results
+    back into soil.df, so that completing a mostly-complete data set costs time proportional to its gaps.
+    States with an unknown input are left missing, as the model would return NaN for them.
+
+    Parameters
+    ----------
+    soil : object
+        Soil object with the df DataFrame.
+    attribute : str
+        Attribute of soil.df calculated by the model.
+    inputs : list of str
+        Attributes of soil.df required by the model.
+    states : array-like of bool, optional
+        States where the model is applied, e.g. a frequency band. Default is all states.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask of the states to calculate.
+
+    Example
+    -------
+    >>> sample = Soil(bulk_ec_dc = [np.nan, 0.01, np.nan], bulk_ec_dc_tc = [0.02, 0.02, np.nan], temperature = 290)
+    >>> computable(sample, 'bulk_ec_dc', ['bulk_ec_dc_tc', 'temperature'])
+    array([ True, False, False])
+    """
+    mask = np.isnan(soil.df[attribute].values)
+    for input in inputs:
+        mask = mask & ~np.isnan(soil.df[input].values)
+    if states is not None:
+        mask = mask & np.asarray(states, dtype=bool)
+    return mask
@@ -0,0 +1,31 @@
+from concurrent.futures import ProcessPoolExecutor
+
+def map_chunks(function, chunks, n_jobs=1):
+    """
+    Apply a function to each chunk of arguments, optionally in a pool of worker processes, and return the results
+
+    Parameters
+    ----------
+    function : callable
+        Module-level function, so that it can be sent to worker processes.
+    chunks : list of tuple
+        Positional arguments of each call.
+    n_jobs : int, optional
+        Number of worker processes. With 1 (default), the chunks are evaluated in the current process.
+
+    Returns
+    -------
+    list
+        Result of each call, in the order of `chunks`.
+
+    Example
+    -------
+    >>> map_chunks(pow, [(2, 3), (3, 2)], n_jobs=2)
+    [8, 9]
+    """
+    if n_jobs == 1 or len(chunks) <= 1:
+        return [function(*args) for args in chunks]
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        futures = [pool.submit(function, *args) for args in chunks]
+        return [future.result() for future in futures]
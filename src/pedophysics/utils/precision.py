@@ -0,0 +1,113 @@
+import functools
+import numpy as np
+
+from pedophysics.utils.strategy import STRATEGIES
+
+# Storage precisions accepted by Soil(precision=...)
+PRECISIONS = ['float64', 'float32']
+
+def result_dtype(*values):
+    """
+    Return the dtype in which a model returns its result: float32 if the inputs are float32 arrays or scalars, float64 otherwise
+
+    Python scalars do not change the result, so that float32 arrays combined with float parameters give float32.
+
+    Parameters
+    ----------
+    *values : array_like
+        Inputs of the model.
+
+    Returns
+    -------
+    np.dtype
+        float32 or float64.
+
+    Example
+    -------
+    >>> result_dtype(np.ones(3, dtype=np.float32), 0.5)
+    dtype('float32')
+    """
+    dtype = np.result_type(*[np.asarray(value) if isinstance(value, (list, tuple)) else value for value in values])
+    return dtype if dtype == np.float32 else np.dtype(np.float64)
+
+
+def as_float64(*values):
+    """
+    Convert float32 arrays and scalars to float64 and return them, leaving the other values unchanged
+
+    Used by models whose result is sensitive to rounding errors, e.g. the differential Wunderlich models
+    and the LongmireSmith sums, so that they are computed in float64 whatever the precision of the inputs.
+
+    Parameters
+    ----------
+    *values : array_like
+        Inputs of the model.
+
+    Returns
+    -------
+    list
+        The inputs, with float32 values converted to float64.
+    """
+    return [value.astype(np.float64) if getattr(value, 'dtype', None) == np.float32 else value for value in values]
+
+
+def as_dtype(value, dtype):
+    """
+    Convert the result of a model to float32 if dtype is float32 and return, otherwise return it unchanged
+    """
+    return np.asarray(value, dtype=np.float32)[()] if dtype == np.float32 else value
+
+
+def predict_call(predict):
+    """
+    Decorate a predict function with the handling shared by all predict calls on a soil object
+
+    Only the outermost predict call is handled; the nested ones run inside it unchanged. The outermost call:
+
+    - selects the inversion paths with its `strategy` keyword, 'exact' (default), 'fast' or 'auto', for itself and
+      the nested calls (see utils.strategy.choose);
+    - converts the columns of soil.df to float64 as it starts, and back to float32 as it ends, when soil.precision
+      is 'float32';
+    - rounds the values it calculated once to soil.roundn decimals (see Soil._round), unless soil.raw is True.
+
+    The returned column of soil.df is rounded and converted as well.
+
+    Parameters
+    ----------
+    predict : callable
+        Predict function whose first argument is the soil object.
+
+    Returns
+    -------
+    callable
+        Decorated predict function.
+    """
+    @functools.wraps(predict)
+    def wrapper(soil, *args, strategy=None, **kwargs):
+        if getattr(soil, '_computing', False):
+            return predict(soil, *args, **kwargs)
+        if strategy is not None and strategy not in STRATEGIES:
+            raise ValueError(f"'strategy' must be one of {STRATEGIES}")
+
+        float32 = soil.precision == 'float32'
+        missing = soil._missing()
+        soil._computing = True
+        soil._strategy = strategy
+        if float32:
+            soil._set_precision(np.float64)
+        try:
+            result = predict(soil, *args, **kwargs)
+            if not soil.raw:
+                # Predict functions return a column of soil.df, which is replaced by its rounded values
+                column = next((attribute for attribute in missing if isinstance(result, np.ndarray) and 
+                               np.may_share_memory(result, soil.df[attribute].values)), None)
+                soil._round(missing)
+                result = result if column is None else soil.df[column].values
+        finally:
+            soil._computing = False
+            soil._strategy = None
+            if float32:
+                soil._set_precision(np.float32)
+        return result.astype(np.float32) if float32 and isinstance(result, np.ndarray) and result.dtype == np.float64 else result
+
+    return wrapper
@@ -0,0 +1,241 @@
+import functools
+import numpy as np
+
+# Number of tables of tabulated_inverse kept between calls, e.g. one per frequency of a survey
+TABLE_MEMO_SIZE = 64
+
+def golden_section(objective, lower, upper, tol=1e-6, maxiter=100):
+    """
+    Minimize a batch of unimodal scalar functions by golden-section search and return the minimizers
+
+    All problems of the batch are advanced together, so `objective` is evaluated once per iteration
+    on the whole batch instead of once per problem.
+
+    Parameters
+    ----------
+    objective : callable
+        Function f(x) taking an array of shape (n_problems,) and returning the objective value of each problem.
+    lower : float or array-like
+        Lower bound of each problem.
+    upper : float or array-like
+        Upper bound of each problem.
+    tol : float, optional
+        Absolute tolerance on the minimizers. Default is 1e-6.
+    maxiter : int, optional
+        Maximum number of iterations. Default is 100.
+
+    Returns
+    -------
+    np.ndarray
+        Minimizer of each problem.
+
+    Example
+    -------
+    >>> golden_section(lambda x: (x - np.array([0.1, 0.3]))**2, -0.2, 0.8)
+    array([0.1, 0.3])
+    """
+    invphi = (np.sqrt(5) - 1)/2
+    a, b = np.broadcast_arrays(np.asarray(lower, dtype=float), np.asarray(upper, dtype=float))
+    a, b = a.copy(), b.copy()
+    c = b - invphi*(b - a)
+    d = a + invphi*(b - a)
+    fc, fd = objective(c), objective(d)
+
+    for _ in range(maxiter):
+        if np.all(b - a < tol):
+            break
+        left = ~(fc > fd)   # NaN objective values shrink towards the lower bound
+        b = np.where(left, d, b)
+        a = np.where(left, a, c)
+        x = np.where(left, b - invphi*(b - a), a + invphi*(b - a))
+        fx = objective(x)
+        c, d = np.where(left, x, d), np.where(left, c, x)
+        fc, fd = np.where(left, fx, fd), np.where(left, fc, fx)
+
+    return (a + b)/2
+
+
+def bisection(function, lower, upper, tol=1e-10, maxiter=60, full_output=False):
+    """
+    Solve a batch of monotonic equations function(x) = 0 inside bounds and return the solutions
+
+    Equations without a sign change inside the bounds return the bound with the smallest absolute residual,
+    as a bounded least-squares solver would. All equations of the batch are advanced together.
+
+    Parameters
+    ----------
+    function : callable
+        Function f(x) taking an array of the batch shape and returning the residual of each equation.
+    lower : float or array-like
+        Lower bound of each equation.
+    upper : float or array-like
+        Upper bound of each equation.
+    tol : float, optional
+        Absolute tolerance on the solutions. Default is 1e-10.
+    maxiter : int, optional
+        Maximum number of iterations. Default is 60.
+    full_output : bool, optional
+        If True, the number of iterations of the batch is returned as well. Default is False.
+
+    Returns
+    -------
+    np.ndarray
+        Solution of each equation. NaN where the residuals are NaN.
+    int
+        Number of iterations, only if full_output is True.
+
+    Example
+    -------
+    >>> bisection(lambda x: x**2 - np.array([0.04, 0.25]), 0, 1)
+    array([0.2, 0.5])
+    """
+    a, b = np.broadcast_arrays(np.asarray(lower, dtype=float), np.asarray(upper, dtype=float))
+    fa, fb = function(a), function(b)
+    a, b = np.broadcast_arrays(a, fa)[0].copy(), np.broadcast_arrays(b, fb)[0].copy()
+    no_root = np.sign(fa) == np.sign(fb)
+    increasing = fb > fa
+
+    iterations = 0
+    while iterations < maxiter and not np.all(b - a < tol):
+        m = (a + b)/2
+        fm = function(m)
+        go_right = (fm < 0) == increasing
+        a = np.where(go_right, m, a)
+        b = np.where(go_right, b, m)
+        iterations += 1
+
+    x = (a + b)/2
+    x = np.where(no_root, np.where(np.abs(fa) <= np.abs(fb), a, b), x)
+    x = np.where(np.isnan(fa) | np.isnan(fb), np.nan, x)
+    return (x, iterations) if full_output else x
+
+
+def bounded_lstsq2(a1, a2, y, lower=(-np.inf, -np.inf), upper=(np.inf, np.inf), weights=None):
+    """
+    Solve a batch of bounded two-parameter linear least-squares problems and return the parameters
+
+    Each problem minimizes sum(weights*(p1*a1 + p2*a2 - y)**2) over the box lower <= (p1, p2) <= upper.
+    The problems are solved exactly from their normal equations: the unconstrained solution is kept if
+    it lies inside the box, otherwise the best of the four clipped edge solutions is returned.
+
+    Parameters
+    ----------
+    a1 : array-like
+        Regressor of the first parameter, of shape (n_problems, n_observations) or (n_observations,).
+    a2 : array-like
+        Regressor of the second parameter, same shape as a1.
+    y : array-like
+        Observations, same shape as a1.
+    lower : tuple, optional
+        Lower bounds (p1, p2). Default is unbounded.
+    upper : tuple, optional
+        Upper bounds (p1, p2). Default is unbounded.
+    weights : array-like, optional
+        Observation weights, same shape as a1. Zero weights exclude observations, e.g. padding of unequal groups.
+
+    Returns
+    -------
+    tuple
+        (p1, p2, sse): arrays of shape (n_problems,) with the optimal parameters and the weighted sum of squared residuals.
+
+    Example
+    -------
+    >>> x = np.array([1., 2., 3.])
+    >>> bounded_lstsq2(x, np.ones(3), 2*x + 1, lower=(0, 0), upper=(10, 0.5))
+    (array(2.21428571), array(0.5), array(0.10714286))
+    """
+    a1, a2, y = np.broadcast_arrays(*[np.asarray(v, dtype=float) for v in (a1, a2, y)])
+    w = np.ones(a1.shape) if weights is None else np.broadcast_to(np.asarray(weights, dtype=float), a1.shape)
+    w = np.where(np.isnan(a1) | np.isnan(a2) | np.isnan(y), 0, w)
+    a1, a2, y = [np.where(w > 0, v, 0) for v in (a1, a2, y)]
+
+    s11, s22, s12 = (w*a1*a1).sum(-1), (w*a2*a2).sum(-1), (w*a1*a2).sum(-1)
+    s1y, s2y, syy = (w*a1*y).sum(-1), (w*a2*y).sum(-1), (w*y*y).sum(-1)
+    lb1, lb2 = lower
+    ub1, ub2 = upper
+
+    def sse(p1, p2):
+        return syy - 2*(p1*s1y + p2*s2y) + p1**2*s11 + 2*p1*p2*s12 + p2**2*s22
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        det = s11*s22 - s12**2
+        p1 = (s22*s1y - s12*s2y)/det
+        p2 = (s11*s2y - s12*s1y)/det
+        inside = (det > 0) & (p1 >= lb1) & (p1 <= ub1) & (p2 >= lb2) & (p2 <= ub2)
+
+        # Edge candidates: one parameter at a bound, the other at its clipped 1-D optimum
+        candidates = []
+        for fixed in (lb1, ub1):
+            if np.isfinite(fixed):
+                q2 = np.clip(np.where(s22 > 0, (s2y - fixed*s12)/s22, 0), lb2, ub2)
+                candidates.append((np.full(s11.shape, float(fixed)), q2))
+        for fixed in (lb2, ub2):
+            if np.isfinite(fixed):
+                q1 = np.clip(np.where(s11 > 0, (s1y - fixed*s12)/s11, 0), lb1, ub1)
+                candidates.append((q1, np.full(s11.shape, float(fixed))))
+
+    best1 = np.where(inside, p1, np.nan)
+    best2 = np.where(inside, p2, np.nan)
+    best_sse = np.where(inside, sse(best1, best2), np.inf)
+    for q1, q2 in candidates:
+        q_sse = sse(q1, q2)
+        better = ~inside & (q_sse < best_sse)
+        best1 = np.where(better, q1, best1)
+        best2 = np.where(better, q2, best2)
+        best_sse = np.where(better, q_sse, best_sse)
+
+    return best1, best2, np.where(np.isinf(best_sse), np.nan, best_sse)
+
+
+def tabulated_inverse(function, y, lower, upper, n=4096, args=()):
+    """
+    Invert a monotonic increasing function by linear interpolation in a table of its values and return the solutions
+
+    The function is evaluated once, on n points geometrically spaced between the bounds, so that a batch of any size
+    is inverted at the cost of one evaluation and a binary search per value. Values of y outside the table return
+    the nearest bound, as a bounded least-squares solver would. A zero lower bound is the first point of the table,
+    where the function is evaluated on its own, followed by geometric points from upper*1e-6.
+    The last TABLE_MEMO_SIZE tables are kept between calls, by function, args, bounds and n, so that a model
+    given with its parameters in `args` (e.g. one table per frequency) is tabulated once per process.
+
+    Parameters
+    ----------
+    function : callable
+        Monotonic increasing function f(x, *args) taking an array of shape (n,).
+    y : array-like
+        Values to invert.
+    lower : float
+        Lower bound of the solutions, positive or zero.
+    upper : float
+        Upper bound of the solutions.
+    n : int, optional
+        Number of points of the table. Default is 4096.
+    args : tuple, optional
+        Hashable extra arguments of the function. Default is ().
+
+    Returns
+    -------
+    np.ndarray
+        Solution of f(x, *args) = y for each value. NaN where y is NaN.
+
+    Example
+    -------
+    >>> tabulated_inverse(lambda x: x**2, np.array([0, 0.04, 0.25, 2]), 0, 1)
+    array([0.        , 0.19999995, 0.49999929, 1.        ])
+    """
+    values, grid = _table(function, lower, upper, n, tuple(args))
+    return np.interp(y, values, grid)
+
+
+@functools.lru_cache(maxsize=TABLE_MEMO_SIZE)
+def _table(function, lower, upper, n, args):
+    """
+    Return the values and points of the table of tabulated_inverse
+    """
+    if lower > 0:
+        grid = np.geomspace(lower, upper, n)
+        return function(grid, *args), grid
+    grid = np.geomspace(upper*1e-6, upper, n - 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        at_lower = np.atleast_1d(function(np.zeros(1), *args))
+    return np.concatenate([at_lower, function(grid, *args)]), np.concatenate([[0], grid])
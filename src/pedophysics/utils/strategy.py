@@ -0,0 +1,66 @@
+# Strategies accepted by the predict functions, e.g. Water(soil, strategy='auto')
+STRATEGIES = ['exact', 'fast', 'auto']
+
+# Paths of the inversions of predict functions: setup time [s], time per state [s] and largest absolute error, measured by benchmarks/strategies.py
+COSTS = {
+    'bulk_ec_dc from bulk_ec_dc_tc': {'optimizer': (1.2e-04, 7.6e-04, 6e-09), 'closed-form': (1.6e-05, 7.0e-09, 4e-15)},
+    'bulk_ec_dc from bulk_ec': {'optimizer': (1.2e-03, 1.8e-03, 5e-06), 'tabulated': (5.2e-04, 7.1e-07, 4e-09)},
+    'bulk_ec_dc from bulk_perm': {'optimizer': (0.0e+00, 3.1e-03, 6e-09), 'tabulated': (4.9e-04, 7.1e-07, 3e-07)},
+    'water from bulk_perm': {'optimizer': (8.0e-03, 1.5e-02, 1e-08), 'bisection': (2.3e-02, 2.4e-05, 4e-11)},
+    'water from bulk_ec_dc_tc': {'optimizer': (0.0e+00, 1.0e-02, 6e-03), 'bisection': (2.3e-02, 2.3e-05, 4e-11)},
+}
+
+
+def choose(soil, inversion, attribute, n, tables=1):
+    """
+    Return the path of an inversion for n states according to the strategy of the running predict call
+
+    'exact' (default) keeps the scipy minimize call per state ('optimizer'). 'fast' takes the path with the smallest time
+    per state. 'auto' takes the path with the smallest expected time, setup included, among the optimizer and the paths
+    whose error is within half a unit of the last decimal stored for the attribute (see Soil._round), or, when soil.raw
+    is True, not larger than the error of the optimizer.
+
+    Parameters
+    ----------
+    soil : object
+        Soil object, with the strategy of the running predict call in soil._strategy.
+    inversion : str
+        Inversion in COSTS.
+    attribute : str
+        Attribute of soil.df calculated by the inversion.
+    n : int
+        Number of states to invert.
+    tables : int, optional
+        Number of tables of the 'tabulated' path, e.g. one per distinct frequency.
+
+    Returns
+    -------
+    str
+        Path of the inversion in COSTS[inversion], e.g. 'optimizer' or 'tabulated'.
+
+    Example
+    -------
+    >>> sample = Soil(bulk_ec = [0.01, 0.02])
+    >>> sample._strategy = 'auto'
+    >>> choose(sample, 'bulk_ec_dc from bulk_ec', 'bulk_ec_dc', 2)
+    'tabulated'
+    """
+    from pedophysics.simulate import ROUNDING # Lazy import to avoid circular dependency
+    strategy = getattr(soil, '_strategy', None) or 'exact'
+    paths = COSTS[inversion]
+    if strategy == 'exact':
+        return 'optimizer'
+    if strategy == 'fast':
+        return min(paths, key=lambda path: paths[path][1])
+
+    tolerance = paths['optimizer'][2] if soil.raw else 0.5*10.**-(soil.roundn + ROUNDING.get(attribute, 0))
+    candidates = [path for path in paths if path == 'optimizer' or paths[path][2] <= tolerance]
+    return min(candidates, key=lambda path: paths[path][0]*(tables if path == 'tabulated' else 1) + n*paths[path][1])
+
+
+def provenance(soil, path):
+    """
+    Return the note of the inversion path appended to soil.info when a strategy is given to the running predict call, '' otherwise
+    """
+    strategy = getattr(soil, '_strategy', None)
+    return '' if strategy is None else f" by {path} inversion (strategy={strategy})"
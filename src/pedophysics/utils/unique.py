@@ -0,0 +1,47 @@
+import functools
+import numpy as np
+
+# Number of distinct inputs remembered by the scalar models decorated with memoize
+MEMO_SIZE = 4096
+
+def evaluate_unique(model, *args):
+    """
+    Evaluate a model once per distinct tuple of its inputs and return its result in every state
+
+    Logger data repeat a few hundred temperature or salinity values over many states, so that the model
+    is evaluated on the distinct input tuples only and its results are scattered back with the inverse index.
+    NaN inputs are never equal to each other, so each state with a NaN input is evaluated on its own.
+
+    Parameters
+    ----------
+    model : callable
+        Vectorized model, called with one array per input. A model with several results, e.g. np.vectorize with several
+        otypes, returns a tuple of arrays.
+    *args : array_like
+        Inputs of the model, as arrays of the same length or single values.
+
+    Returns
+    -------
+    np.ndarray
+        Result of the model in each state, stacked along the first axis for a model with several results.
+
+    Example
+    -------
+    >>> evaluate_unique(Olhoeft, np.array([298.15, 298.15, 293.15]), 0.1)
+    array([76.94576243, 76.94576243, 78.7450942 ])
+    """
+    inputs = np.broadcast_arrays(*[np.asarray(arg, dtype=np.float64) for arg in args])
+    if inputs[0].size == 0:
+        return np.asarray(model(*inputs), dtype=np.float64)
+
+    distinct, inverse = np.unique(np.column_stack(inputs), axis=0, return_inverse=True)
+    return np.asarray(model(*distinct.T), dtype=np.float64)[..., inverse.ravel()]
+
+
+def memoize(model):
+    """
+    Decorate a scalar model, e.g. a numerical inversion, so that it remembers its results for the last MEMO_SIZE distinct inputs
+
+    The memo is kept between predict calls, so that chunks of the same data set reuse the inversions of each other.
+    """
+    return functools.lru_cache(maxsize=MEMO_SIZE)(model)
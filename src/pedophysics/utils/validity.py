@@ -0,0 +1,76 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+# Validity checks of the models: bit set in soil.flags, condition on soil.df for which the results are uncertain, and its description
+CHECKS = {
+    'texture': (1, lambda df: ~np.isnan(df.sand.values + df.silt.values + df.clay.values) & (df.sand.values + df.silt.values + df.clay.values != 100),
+                "Total percentage of texture fractions is not 100"),
+    'LongmireSmithP': (2, lambda df: (df.frequency_perm.values > 200e6) & (df.water.values > 0.22) & (df.porosity.values > 0.255)
+                                     & ((df.water_ec.values > 3.3) | (df.water_ec.values < 0.0016)) & ((df.clay.values > 10) | (df.sand.values < 85)),
+                       "LongmireSmithP function is applied with conditions frequency_perm > 200e6, and water > 0.22, and porosity > 0.255, "
+                       "and water_ec > 3.3 or water_ec < 0.0016, and clay > 10 or sand < 85, for which the validity of such model is uncertain")
+}
+
+# Number of flagged states listed in a warning
+SHOWN_STATES = 10
+
+
+def check(soil, name, states=None):
+    """
+    Flag the states outside the validity domain of a model in soil.flags, warn once about the newly flagged ones and return them
+
+    The condition of the check is evaluated on all the given states in one pass. States already flagged by a previous call,
+    e.g. by a nested predict function, are not warned again, so that each check emits at most one warning per predict call.
+
+    Parameters
+    ----------
+    soil : object
+        Soil object with the flags array.
+    name : str
+        Name of the check in CHECKS.
+    states : array-like of bool, optional
+        States where the model is applied. Default is all states.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask of the newly flagged states.
+
+    Example
+    -------
+    >>> sample = Soil(sand = [30, 40], silt = [30, 40], clay = [30, 20])
+    >>> check(sample, 'texture')
+    UserWarning: Total percentage of texture fractions is not 100 in 1 states: [0]
+    array([ True, False])
+    """
+    bit, condition, description = CHECKS[name]
+    with np.errstate(invalid='ignore'):
+        flagged = condition(soil.df)
+    if states is not None:
+        flagged = flagged & np.asarray(states, dtype=bool)
+
+    new = flagged & (soil.flags & bit == 0)
+    if new.any():
+        soil.flags = soil.flags | np.where(flagged, bit, 0).astype(soil.flags.dtype)
+        positions = np.flatnonzero(new)
+        shown = str(positions[:SHOWN_STATES].tolist())[:-1] + (', ...]' if len(positions) > SHOWN_STATES else ']')
+        warnings.warn(f"{description} in {len(positions)} states: {shown}")
+    return new
+
+
+def validity(soil):
+    """
+    Return the flags of soil.flags as a DataFrame with a boolean column per check of CHECKS, True where the results are uncertain
+
+    Example
+    -------
+    >>> sample = Soil(sand = [30, 40, 20], silt = [30, 40, np.nan], clay = [30, 20, 20])
+    >>> Texture(sample)
+    >>> validity(sample)
+       texture  LongmireSmithP
+    0     True           False
+    1    False           False
+    2    False           False
+    """
+    return pd.DataFrame({name: soil.flags & bit != 0 for name, (bit, _, _) in CHECKS.items()}, index=soil.df.index)
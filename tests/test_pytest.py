@@ -2,6 +2,8 @@ import sys
 import os
 import pandas as pd
 import ast
+import pytest
+import warnings
 
 # Get notebook and parent dir
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -13,12 +15,22 @@ sys.path.insert(0, pedophysics_code_path)
 
 import numpy as np
 
-from pedophysics.predict import BulkEC, BulkPerm, ParticleDensity, Salinity, WaterEC, Water
-from pedophysics.simulate import Soil
+from pedophysics.predict import BulkEC, BulkPerm, ParticleDensity, Salinity, WaterEC, Water, WaterEnsemble, WaterSites, Texture
+from pedophysics.simulate import Soil, synthetic_states, synthetic_soil, write_synthetic, TEXTURES
+from pedophysics.predict.texture import classify_texture, TEXTURE_FRACTIONS
+from pedophysics.predict import water_from_perm
+from pedophysics.predict.water_from_perm import fitting_bootstrap
+from pedophysics.predict.water_ec import fitting_rhoades_bootstrap, fitting_hilhorst, from_ec
+from pedophysics.predict.bulk_ec_dc_tc import shift_to_bulk_ec_dc_tc
+from pedophysics.predict.bulk_ec_dc import BulkECDC
 from pedophysics.utils.similar_arrays import arrays_are_similar
+from pedophysics.utils.validity import validity
+from pedophysics.utils.unique import evaluate_unique
 
-from pedophysics.pedophysical_models.bulk_ec import Rhoades
-from pedophysics.pedophysical_models.bulk_perm import LongmireSmithP
+from pedophysics.pedophysical_models.bulk_ec import Rhoades, LongmireSmithEC, WunderlichEC, Fu, SheetsHendrickx
+from pedophysics.pedophysical_models.water_ec import FuWaterEC
+from pedophysics.pedophysical_models.bulk_perm import LongmireSmithP, WunderlichP, Hilhorst
+from pedophysics.pedophysical_models.water_perm import MalmbergMaryott, Olhoeft
 
 ############################################# LOAD TEST DATA ############################################
 
@@ -399,6 +411,14 @@ def test_sample_P8():
       #sampleP8.info.to_excel('sampleP8_info.xlsx')
       #sampleP8.df.to_excel('sampleP8_df.xlsx')
 
+
+def test_sample_P9():
+      # LR_MV without CEC leaves state 0 to LongmireSmithP from bulk_ec, as the low frequency state 3
+      sample_P9 = Soil(water = [.1, .2, .3, .25], frequency_perm = [50e6, 150e6, 1e9, 1e6], clay = 10, porosity = .45, bulk_ec = .01)
+
+      assert arrays_are_similar(BulkPerm(sample_P9), np.array([13.506, 10.003, 18.962, 44.004]))
+      assert 'LongmireSmithP' in sample_P9.info.bulk_perm[0] and 'LR' in sample_P9.info.bulk_perm[1]
+
 ################################################################################################################
 ############################################### PREDICT PARTICLE DENSITY #######################################
 ################################################################################################################
@@ -662,6 +682,36 @@ def test_sample_WP9b():
       assert arrays_are_similar(Water(sample_WP9b), expected_results['test_sample_WP9b']) 
 
 
+def test_sample_WP9c():
+      sample_WP9c = Soil( water =          [0.05,   0.11,   0.08,   np.nan, np.nan, np.nan, np.nan],
+                        bulk_perm =        [6,      11,     9,      8,      10,     15,     20    ],
+                        frequency_perm =   [50e6,   50e6,   50e6,   50e6,   1e9,    1e9,    1e9   ],
+                        bulk_density=1.7, texture = 'Sand', solid_perm = 5)
+      sample_TDR = Soil( water = [0.05, 0.11, 0.08, np.nan], bulk_perm = [6, 11, 9, 8], frequency_perm = 50e6,
+                        bulk_density=1.7, texture = 'Sand', solid_perm = 5)
+      sample_GPR = Soil( bulk_perm = [10, 15, 20], frequency_perm = 1e9, bulk_density=1.7, texture = 'Sand', solid_perm = 5)
+
+      assert arrays_are_similar(Water(sample_WP9c), np.concatenate([Water(sample_TDR), Water(sample_GPR)]))
+
+
+def test_sample_WP9d():
+      # A campaign mixing low frequency, fitted and non-fitting instruments is calculated as each instrument alone, in every column
+      bulk_perm =      [10,     15,     20,     25,     7,      6,      11,     9,      8,      20,     22,     15    ]
+      frequency_perm = [1e6,    2e6,    2.5e6,  10e6,   25e6,   50e6,   50e6,   50e6,   50e6,   100e6,  1e9,    1e9   ]
+      water =          [np.nan, np.nan, np.nan, np.nan, np.nan, 0.05,   0.11,   0.08,   np.nan, np.nan, np.nan, np.nan]
+      inputs = dict(porosity = 0.36, particle_density = 2.65, air_perm = 1.2, sand = 95, silt = 3, clay = 2, solid_perm = 5,
+                    water_ec = 0.1, solid_ec = 0, bulk_perm_inf = 5, offset_perm = 4)
+      sample_WP9d = Soil(water = water, bulk_perm = bulk_perm, frequency_perm = frequency_perm, **inputs)
+      Water(sample_WP9d)
+
+      instruments = []
+      for states in [slice(0, 5), slice(5, 9), slice(9, 10), slice(10, 12)]:
+            instrument = Soil(water = water[states], bulk_perm = bulk_perm[states], frequency_perm = frequency_perm[states], **inputs)
+            Water(instrument)
+            instruments.append(instrument.df)
+      pd.testing.assert_frame_equal(sample_WP9d.df, pd.concat(instruments, ignore_index = True))
+
+
 def test_sample_WPv():
       sample_WPv = Soil( bulk_perm = [3,    8,       15,    20,    22,    7,    12,    18     ], 
                         bulk_density=1.4, texture = 'Sand', solid_perm = 5, CEC = 1.6, frequency_perm = 50e6)
@@ -787,3 +837,868 @@ def test_sample_WECv():
 
 
 
+
+
+################################################################################################################
+############################################## SYNTHETIC STATES ################################################
+################################################################################################################
+
+
+def test_synthetic_states_seed():
+      states_a = synthetic_states(50, seed=7, noise=0.02)
+      states_b = synthetic_states(50, seed=7, noise=0.02)
+      assert states_a.equals(states_b)
+      assert np.allclose(states_a.sand + states_a.silt + states_a.clay, 100)
+      assert (states_a.water <= states_a.porosity).all()
+
+
+def test_synthetic_soil_inversion():
+      sample, states = synthetic_soil(10, seed=3, distributions={'frequency_perm': 1e9}, 
+                                      observed=('bulk_perm', 'frequency_perm', 'clay', 'porosity', 'temperature'))
+      assert arrays_are_similar(Water(sample), np.round(states.water.values, 3))
+
+
+def test_write_synthetic(tmp_path):
+      paths = write_synthetic(str(tmp_path), 25, chunk_size=10, fmt='npz', seed=1)
+      assert len(paths) == 3
+      chunk = np.load(paths[2])
+      assert np.array_equal(chunk['state'], np.arange(20, 25))
+
+
+################################################################################################################
+############################################# WATER ENSEMBLE ###################################################
+################################################################################################################
+
+
+def test_water_ensemble_perm():
+      sample_E1 = Soil(bulk_perm = [8, 12, 20], clay = 10, porosity = 0.45, instrument = 'GPR')
+      ensemble = WaterEnsemble(sample_E1, {'bulk_perm': ('relative', 0.05), 'clay': ('normal', 3)}, n_samples=2000, seed=0)
+      sample_E1b = Soil(bulk_perm = [8, 12, 20], clay = 10, porosity = 0.45, instrument = 'GPR')
+      assert arrays_are_similar(ensemble['q0.5'].values, Water(sample_E1b), tol=0.005)
+      assert (ensemble['q0.05'] < ensemble['q0.5']).all() and (ensemble['q0.5'] < ensemble['q0.95']).all()
+
+
+def test_water_ensemble_ec_samples():
+      water_ec_samples = np.full((100, 1), 0.5)
+      sample_E2 = Soil(bulk_ec = [0.01, 0.02, 0.025, 0.030, 0.040], clay = 10, porosity = 0.47, water = [np.nan, 0.2])
+      ensemble = WaterEnsemble(sample_E2, {'water_ec': water_ec_samples})
+      assert arrays_are_similar(np.round(ensemble['q0.5'].values, 3), np.array([0.105, 0.2, 0.185, 0.206, 0.243]))
+      assert arrays_are_similar(ensemble['std'].values, np.zeros(5))
+
+
+################################################################################################################
+############################################# BOOTSTRAP FITTING ################################################
+################################################################################################################
+
+
+def test_bootstrap_Lw():
+      sample_B1 = Soil(bulk_perm = [7, 10, 14, 18, 25, 12], water = [0.05, 0.11, 0.17, 0.22, 0.31, np.nan])
+      parameters, water = fitting_bootstrap(sample_B1, n_resamples=100, seed=0)
+      sample_B1b = Soil(bulk_perm = [7, 10, 14, 18, 25, 12], water = [0.05, 0.11, 0.17, 0.22, 0.31, np.nan], frequency_perm = 1e9)
+      assert len(parameters) == 100
+      assert water['q0.05'][5] <= Water(sample_B1b)[5] <= water['q0.95'][5]
+      assert sample_B1b.Lw - 0.01 <= parameters.Lw.median() <= sample_B1b.Lw + 0.01
+
+
+def test_bootstrap_Lw_pool():
+      sample_B2 = Soil(bulk_perm = [7, 10, 14, 18, 25, 12], water = [0.05, 0.11, 0.17, 0.22, 0.31, np.nan])
+      parameters, water = fitting_bootstrap(sample_B2, n_resamples=40, seed=1)
+      parameters_pool, water_pool = fitting_bootstrap(sample_B2, n_resamples=40, n_jobs=2, seed=1)
+      assert arrays_are_similar(parameters.Lw.values, parameters_pool.Lw.values)
+      assert arrays_are_similar(water.values, water_pool.values)
+
+
+def test_bootstrap_rhoades():
+      sample_B3 = Soil(water = [0.1, 0.15, 0.2, 0.25, 0.3], bulk_ec_dc_tc = [0.005, 0.009, 0.014, 0.019, 0.027])
+      parameters, water_ec = fitting_rhoades_bootstrap(sample_B3, seed=0)
+      assert ((parameters.water_ec >= 0.00001) & (parameters.water_ec <= 2)).all()
+      assert ((parameters.s_ec >= 0) & (parameters.s_ec <= 0.1)).all()
+      assert water_ec['q0.05'][0] <= WaterEC(sample_B3)[0] <= water_ec['q0.95'][0]
+
+
+################################################################################################################
+############################################### MULTI-SITE FITTING #############################################
+################################################################################################################
+
+
+def test_water_sites():
+      bulk_perm = [7, 10, 14, 12, 6, 9, 16, 11]
+      water = [0.05, 0.11, 0.17, np.nan, 0.06, 0.1, 0.2, np.nan]
+      sample_S1 = Soil(bulk_perm = bulk_perm, water = water)
+      table = WaterSites(sample_S1, ['a', 'a', 'a', 'a', 'b', 'b', 'b', 'b'])
+      for site, states in [('a', slice(0, 4)), ('b', slice(4, 8))]:
+            sample_S1b = Soil(bulk_perm = bulk_perm[states], water = water[states], frequency_perm = 1e9)
+            assert arrays_are_similar(sample_S1.df.water.values[states], Water(sample_S1b))
+            assert abs(table.Lw[site] - sample_S1b.Lw) < 1e-4
+
+
+def test_water_sites_pool():
+      sample_S2 = Soil(bulk_ec_dc_tc = [0.005, 0.01, 0.02, 0.015, 0.004, 0.012, 0.02, 0.008], water = [0.1, 0.15, 0.25, np.nan]*2, water_ec = 0.1)
+      sites = [1, 1, 1, 1, 2, 2, 2, 2]
+      table = WaterSites(sample_S2, sites, model='WunderlichEC', n_jobs=2)
+      assert arrays_are_similar(table.n_calibration.values, np.array([3, 3]))
+      assert not np.isnan(sample_S2.df.water).any()
+
+
+####################################################################################################################
+################################################### IMPORT TIME ####################################################
+####################################################################################################################
+
+
+def test_lazy_import():
+      import subprocess
+      code = "import sys, pedophysics; assert 'scipy' not in sys.modules and 'pedophysics.predict' not in sys.modules"
+      environment = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+      assert subprocess.run([sys.executable, '-c', code], env=environment).returncode == 0
+
+      import pedophysics
+      from pedophysics.pedophysical_models.water import LR
+      assert pedophysics.Soil is Soil
+      assert pedophysics.predict.Water is Water
+      assert pedophysics.LR is LR
+      assert 'Water' in dir(pedophysics.predict)
+
+
+####################################################################################################################
+################################################ BULK CONSTRUCTORS #################################################
+####################################################################################################################
+
+
+def test_from_frame():
+      frame = pd.DataFrame({'theta': [0.1, 0.2, np.nan, 0.25], 'bulk_perm': [6, 11, 9, 14], 'site': ['a', 'a', 'b', 'b']}, index=[5, 6, 7, 8])
+      sample_C1 = Soil.from_frame(frame, columns={'theta': 'water'}, frequency_perm=50e6, water_ec=0.1)
+      sample_C1b = Soil(water = [0.1, 0.2, np.nan, 0.25], bulk_perm = [6., 11, 9, 14], frequency_perm = 50e6, water_ec = 0.1)
+      pd.testing.assert_frame_equal(sample_C1.df, sample_C1b.df)
+      pd.testing.assert_frame_equal(sample_C1.info, sample_C1b.info)
+      assert arrays_are_similar(Water(sample_C1), Water(sample_C1b))
+      assert np.isnan(frame.theta[7])
+
+      frame = pd.DataFrame({'water': [0.1, 0.2, np.nan, 0.25], 'bulk_perm': [6., 11, 9, 14]})
+      sample_C2 = Soil.from_frame(frame, frequency_perm=50e6)
+      assert np.shares_memory(sample_C2.df.bulk_perm.values, frame.bulk_perm.values)
+      Water(sample_C2)
+      assert np.isnan(frame.water[2])
+
+      with pytest.raises(ValueError):
+            Soil.from_frame(pd.DataFrame({'water': ['0.1', '0.2']}))
+      with pytest.raises(ValueError):
+            Soil.from_frame(frame, water=0.1)
+      with pytest.raises(ValueError):
+            Soil.from_frame(frame, columns={'bulk_perm': 'permittivity'})
+
+
+def test_from_records():
+      records = np.array([(0.1, 6., 1), (0.2, 11., 1), (np.nan, 9., 2)], dtype=[('water', 'f8'), ('bulk_perm', 'f8'), ('site', 'i4')])
+      sample_C3 = Soil.from_records(records, frequency_perm=50e6)
+      sample_C3b = Soil.from_records([{'water': 0.1, 'bulk_perm': 6}, {'water': 0.2, 'bulk_perm': 11}, {'bulk_perm': 9}], frequency_perm=50e6)
+      pd.testing.assert_frame_equal(sample_C3.df, sample_C3b.df)
+      Water(sample_C3)
+      assert np.isnan(records['water'][2])
+
+
+def test_from_arrow():
+      pyarrow = pytest.importorskip('pyarrow')
+      table = pyarrow.table({'water': [0.1, 0.2, None], 'EC': [0.01, 0.02, 0.015]})
+      sample_C4 = Soil.from_arrow(table, columns={'EC': 'bulk_ec'})
+      assert arrays_are_similar(sample_C4.df.water.values, np.array([0.1, 0.2, np.nan]))
+      assert arrays_are_similar(sample_C4.df.bulk_ec.values, np.array([0.01, 0.02, 0.015]))
+
+
+####################################################################################################################
+################################################## SAVE AND LOAD ###################################################
+####################################################################################################################
+
+
+def save_load(tmp_path, extension):
+      sample_SL1 = Soil(bulk_perm = [7, 10, 14, 12], water = [0.05, 0.11, 0.17, np.nan], frequency_perm = 1e9, instrument = 'TDR')
+      Water(sample_SL1)
+      path = str(tmp_path / ('sample' + extension))
+      sample_SL1.save(path)
+
+      sample_SL1b = Soil.load(path)
+      pd.testing.assert_frame_equal(sample_SL1.df, sample_SL1b.df, check_dtype=False)
+      pd.testing.assert_frame_equal(sample_SL1.info, sample_SL1b.info, check_dtype=False)
+      assert sample_SL1b.Lw == sample_SL1.Lw
+      assert sample_SL1b.instrument == 'TDR'
+      assert sample_SL1b.roundn == 3
+
+      sample_SL1c = Soil.load(path, columns=['water'], info=False)
+      assert arrays_are_similar(sample_SL1c.df.water.values, sample_SL1.df.water.values)
+      assert sample_SL1c.df.bulk_perm.isna().all()
+      assert (sample_SL1c.info.water == 'Value given by the user').all()
+
+
+def test_save_load_npz(tmp_path):
+      save_load(tmp_path, '.npz')
+
+
+def test_save_load_parquet(tmp_path):
+      pytest.importorskip('pyarrow')
+      save_load(tmp_path, '.parquet')
+
+
+####################################################################################################################
+############################################### INCREMENTAL UPDATES ################################################
+####################################################################################################################
+
+
+def test_append_states(tmp_path):
+      sample_I1 = Soil(bulk_perm = [7, 10, 14, 12], water = [0.05, 0.11, 0.17, np.nan], frequency_perm = 1e9)
+      Water(sample_I1)
+      fits = dict(sample_I1.fits)
+      assert arrays_are_similar(sample_I1.append_states(bulk_perm = [9, 11], frequency_perm = 1e9), np.array([4, 5]))
+      assert sample_I1.fits == fits
+      Water(sample_I1)
+
+      sample_I1b = Soil(bulk_perm = [7, 10, 14, 12, 9, 11], water = [0.05, 0.11, 0.17, np.nan, np.nan, np.nan], frequency_perm = 1e9)
+      Water(sample_I1b)
+      pd.testing.assert_frame_equal(sample_I1.df, sample_I1b.df, check_dtype=False)
+      pd.testing.assert_frame_equal(sample_I1.info, sample_I1b.info, check_dtype=False)
+
+      # Fits are kept by Soil.save and Soil.load
+      path = str(tmp_path / 'sample.npz')
+      sample_I1.save(path)
+      sample_I1c = Soil.load(path)
+      sample_I1c.append_states(bulk_perm = 13, frequency_perm = 1e9)
+      sample_I1.append_states(bulk_perm = 13, frequency_perm = 1e9)
+      assert arrays_are_similar(Water(sample_I1c), Water(sample_I1))
+
+
+def test_update():
+      bulk_ec = [0.01, 0.02, 0.025, 0.03, 0.04]
+      sample_I2 = Soil(bulk_ec = bulk_ec, water = [0.1, 0.15, 0.2, np.nan, np.nan], clay = 10, porosity = 0.47)
+      Water(sample_I2)
+      assert arrays_are_similar(sample_I2.update(states = [4], bulk_ec = 0.035), np.array([4]))
+      assert np.isnan(sample_I2.df.water[4]) and not np.isnan(sample_I2.df.water[3])
+      Water(sample_I2)
+
+      sample_I2b = Soil(bulk_ec = [0.01, 0.02, 0.025, 0.03, 0.035], water = [0.1, 0.15, 0.2, np.nan, np.nan], clay = 10, porosity = 0.47)
+      assert arrays_are_similar(sample_I2.df.water.values, Water(sample_I2b))
+
+      # Changing a calibration state resets every calculated value and fit
+      assert len(sample_I2.update(states = [0], water = 0.12)) == 5
+      assert sample_I2.fits == {} and np.isnan(sample_I2.df.water[3])
+      sample_I2c = Soil(bulk_ec = [0.01, 0.02, 0.025, 0.03, 0.035], water = [0.12, 0.15, 0.2, np.nan, np.nan], clay = 10, porosity = 0.47)
+      assert arrays_are_similar(Water(sample_I2), Water(sample_I2c))
+
+      with pytest.raises(ValueError):
+            sample_I2.update(moisture = 0.1)
+
+
+####################################################################################################################
+################################################# CONSTANT COLUMNS #################################################
+####################################################################################################################
+
+
+def test_constant_columns():
+      sample_K1 = Soil(bulk_ec = [0.01, 0.02, 0.03], clay = 10)
+      if int(pd.__version__.split('.')[0]) >= 3:
+            # Absent and broadcast attributes take no memory per state
+            assert sample_K1.df.water.values.strides == (0,) and sample_K1.df.clay.values.strides == (0,)
+            assert sample_K1.info.water.values.strides == (0,)
+      assert (sample_K1.df.clay == 10).all() and (sample_K1.info.clay == 'Value given by the user').all()
+      assert sample_K1.df.water.isna().all() and (sample_K1.info.water == 'nan').all()
+
+      # Writing a constant column copies it, and leaves the other ones missing
+      sample_K1.df.loc[1, 'water'] = 0.2
+      sample_K1.info.loc[1, 'water'] = 'Calculated'
+      assert arrays_are_similar(sample_K1.df.water.values, np.array([np.nan, 0.2, np.nan]))
+      assert sample_K1.df.porosity.isna().all() and (sample_K1.info.porosity == 'nan').all()
+      assert np.isnan(sample_K1.water).all()
+
+      sample_K2 = Soil(bulk_ec = [0.01, 0.02, 0.03], clay = [10, 10, 10])
+      assert arrays_are_similar(Water(Soil(bulk_ec = [0.01, 0.02, 0.03], clay = 10)), Water(sample_K2))
+
+
+def test_constant_columns_fallback(monkeypatch):
+      # Without copy-on-write in pandas, constant columns are regular writable columns with the same predictions
+      import pedophysics.simulate
+      monkeypatch.setattr(pedophysics.simulate, '_copy_on_write', lambda: False)
+      sample_K3 = Soil(bulk_ec = [0.01, 0.02, 0.03], clay = 10)
+      assert sample_K3.df.clay.values.strides == (8,) and sample_K3.df.water.values.strides == (8,)
+      assert not sample_K3._constants
+      sample_K3.df.loc[1, 'porosity'] = 0.4
+      assert arrays_are_similar(sample_K3.df.porosity.values, np.array([np.nan, 0.4, np.nan]))
+      assert arrays_are_similar(Water(sample_K3.copy()), Water(Soil(bulk_ec = [0.01, 0.02, 0.03], clay = [10, 10, 10])))
+
+
+####################################################################################################################
+################################################ FLOAT32 PRECISION #################################################
+####################################################################################################################
+
+
+def test_float32_soil(tmp_path):
+      states = synthetic_states(100, seed=5, distributions={'frequency_perm': 1e9})
+      water = np.where(np.arange(100) < 10, states.water.values, np.nan)
+      errors = {}
+      for name, kwargs, predict in [('fitting', dict(bulk_perm=states.bulk_perm.values, water=water, frequency_perm=1e9), Water),
+                                    ('non_fitting', dict(bulk_ec=states.bulk_ec.values, frequency_ec=states.frequency_ec.values, clay=states.clay.values,
+                                                         porosity=states.porosity.values, water_ec=states.water_ec.values), Water),
+                                    ('bulk_perm', dict(water=states.water.values, clay=states.clay.values, porosity=states.porosity.values,
+                                                       frequency_perm=1e9), BulkPerm)]:
+            sample_F64 = Soil(**kwargs)
+            sample_F32 = Soil(**kwargs, precision='float32')
+            expected, result = predict(sample_F64), predict(sample_F32)
+            assert result.dtype == np.float32
+            assert (sample_F32.df.dtypes == np.float32).all()
+            assert (np.isnan(result) == np.isnan(expected)).all()
+            with np.errstate(invalid='ignore'):
+                  errors[name] = np.nanmax(np.abs(result/expected - 1))
+
+      # Results rounded to soil.roundn decimals only differ by the float32 rounding of the stored values
+      assert max(errors.values()) < 1e-6
+
+      path = str(tmp_path / 'sample.npz')
+      sample_F32.save(path)
+      sample_F32b = Soil.load(path)
+      assert sample_F32b.precision == 'float32' and (sample_F32b.df.dtypes == np.float32).all()
+      pd.testing.assert_frame_equal(sample_F32.df, sample_F32b.df)
+
+      with pytest.raises(ValueError):
+            Soil(water = 0.1, precision = 'float16')
+
+
+def test_float32_models():
+      water = np.linspace(0.05, 0.4, 200)
+      bulk_ec_dc = np.linspace(0.001, 0.2, 200)
+      for model, args in [(WunderlichP, (water, 7., 0.05, 80., 0.1)), (WunderlichEC, (water, 0.01, 0.05, 0.5, 0.1)),
+                          (LongmireSmithP, (bulk_ec_dc, 5., 50e6)), (LongmireSmithEC, (bulk_ec_dc, 9e3))]:
+            expected = model(*args)
+            result = model(*[np.float32(arg) if np.ndim(arg) == 0 else arg.astype(np.float32) for arg in args])
+            assert result.dtype == np.float32
+
+            # Computed in float64 from float32 inputs: the error is that of the inputs, not of the integration or sums
+            assert np.max(np.abs(result/expected - 1)) < 1e-6
+
+
+####################################################################################################################
+################################################# DEFERRED ROUNDING ################################################
+####################################################################################################################
+
+def test_raw():
+      kwargs = dict(water = np.array([0.06, 0.08, 0.095, 0.128]), temperature=25.+273.15, clay = 20, water_ec = 0.2, bulk_density=1.7, solid_ec=0.001)
+      sample_R = Soil(**kwargs)
+      sample_Rb = Soil(**kwargs, raw = True)
+      sample_Rc = Soil(**kwargs, roundn = 2)
+
+      expected, result = BulkEC(sample_R), BulkEC(sample_Rb)
+      assert arrays_are_similar(expected, np.round(result, 6))
+      assert (result != np.round(result, 6)).any()
+      assert arrays_are_similar(sample_Rb.df.porosity, 1 - 1.7/2.65, tol=1e-12)
+      assert arrays_are_similar(sample_R.df.porosity, 0.358)
+
+      # Calculated values are rounded to roundn plus the number of decimals of each attribute
+      assert arrays_are_similar(BulkEC(sample_Rc), np.round(result, 5))
+      assert arrays_are_similar(sample_Rc.df.porosity, 0.36)
+      assert sample_Rc.df.water.equals(sample_R.df.water)
+
+
+####################################################################################################################
+################################################# VALIDITY CHECKS ##################################################
+####################################################################################################################
+
+def test_validity(tmp_path):
+      sample_V = Soil(water = np.random.rand(6)*0.4,
+                      sand = [30, 40, 20, 50,     30,     np.nan], 
+                      silt = [30, 40, 20, np.nan, np.nan, np.nan], 
+                      clay = [30, 20, 20, 20,     30,     np.nan],
+                      frequency_perm = 1e9, porosity = 0.4)
+
+      with pytest.warns(UserWarning, match=r"not 100 in 2 states: \[0, 2\]") as record:
+            BulkPerm(sample_V)
+      assert len([warning for warning in record if 'texture' in str(warning.message)]) == 1
+      assert (validity(sample_V).texture.values == [True, False, True, False, False, False]).all()
+      assert not validity(sample_V).LongmireSmithP.any()
+
+      # Flagged states are not warned again, until their values are reset
+      with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            Texture(sample_V)
+      path = str(tmp_path / 'sample.npz')
+      sample_V.save(path)
+      assert (Soil.load(path).flags == sample_V.flags).all()
+      sample_V.update(states=[0], sand=40)
+      assert (sample_V.flags == [0, 0, 1, 0, 0, 0]).all()
+
+      # LongmireSmithP is checked where it runs: from bulk_ec above 200e6 where LR_W lacks clay, and in a campaign of varying
+      # frequency_perm once water is calculated
+      sample_V2 = Soil(water = [0.3, 0.3], frequency_perm = [1e9, 1e6], porosity = 0.45, sand = 50, bulk_ec = 0.01, water_ec = 0.001)
+      with pytest.warns(UserWarning, match=r"LongmireSmithP .* in 1 states: \[0\]"):
+            BulkPerm(sample_V2)
+      assert (validity(sample_V2).LongmireSmithP.values == [True, False]).all()
+
+
+####################################################################################################################
+############################################## UNIQUE-VALUE EVALUATION #############################################
+####################################################################################################################
+
+def test_evaluate_unique():
+      temperature = 273.15 + np.array([10, 20, 10, np.nan, 20, 10])
+      salinity = np.array([0.1, 0.1, 0.1, 0.1, 0.2, np.nan])
+      assert arrays_are_similar(evaluate_unique(Olhoeft, temperature, salinity), Olhoeft(temperature, salinity), tol=1e-12)
+      assert arrays_are_similar(evaluate_unique(MalmbergMaryott, temperature[:3]), MalmbergMaryott(temperature[:3]), tol=1e-12)
+      assert evaluate_unique(MalmbergMaryott, temperature[:0]).shape == (0,)
+
+      sample_U = Soil(water_ec = [0.1, 0.2, 0.1, 0.1], temperature = [293.15, 293.15, 293.15, 283.15], frequency_ec = 100)
+      expected = [Salinity(Soil(water_ec = sample_U.water_ec[x], temperature = sample_U.temperature[x], frequency_ec = 100))[0] for x in range(4)]
+      assert arrays_are_similar(Salinity(sample_U), expected)
+      assert sample_U.df.salinity[0] == sample_U.df.salinity[2]
+
+
+####################################################################################################################
+################################################# TEXTURE CLASSES ##################################################
+####################################################################################################################
+
+def test_texture_classes():
+      sample_T = Soil(water = 0.1,
+                      sand = [np.nan, np.nan, np.nan,            np.nan, 20,     40], 
+                      silt = [30,     np.nan, np.nan,            np.nan, 20,     40], 
+                      clay = [20,     np.nan, np.nan,            np.nan, np.nan, 20],
+                      texture = ['Sand', 'Clay', 'Silty clay loam', np.nan, 'Sand', 'Sand'])
+      assert (sample_T.texture_codes() == [0, 10, 8, -1, 0, 0]).all()
+
+      Texture(sample_T)
+      assert arrays_are_similar(sample_T.df.sand, [50, 15, 10, np.nan, 20, 40])
+      assert arrays_are_similar(sample_T.df.silt, [30, 20, 55, np.nan, 20, 40])
+      assert arrays_are_similar(sample_T.df.clay, [20, 65, 35, np.nan, 60, 20])
+      assert sample_T.info.clay[1] == 'Fraction calculated using soil.texture'
+      assert sample_T.info.sand[0] == "Fraction calculated using: 100 - clay - silt" and sample_T.info.clay[4] == "Fraction calculated using: 100 - sand - silt"
+
+      codes = classify_texture(*TEXTURE_FRACTIONS.T)
+      assert codes.dtype == np.int8
+      assert (np.array(TEXTURES)[codes] == [texture if texture != "Sandy clay loam" else "Sandy loam" for texture in TEXTURES]).all()
+      assert (classify_texture([60, np.nan], [13, 10], [27, 30]) == [TEXTURES.index("Sandy clay loam"), -1]).all()
+
+      with pytest.raises(ValueError):
+            Soil(water = 0.1, texture = ['Sand', 'Sandy'])
+
+def test_texture_codes(tmp_path):
+      # Per-state textures are stored as int8 codes, one per state, and kept as codes by save and load
+      sample_T2 = Soil(water = [0.1, 0.2, 0.3], texture = ['Sand', 'Loam', np.nan])
+      assert sample_T2.texture.dtype == np.int8 and (sample_T2.texture == [0, 3, -1]).all()
+      sample_T2.save(str(tmp_path / 'sample.npz'))
+      loaded = Soil.load(str(tmp_path / 'sample.npz'))
+      assert loaded.texture.dtype == np.int8 and (loaded.texture_codes() == [0, 3, -1]).all()
+
+      sample_T2.append_states(water = 0.25)
+      assert (sample_T2.texture_codes() == [0, 3, -1, -1]).all()
+      with pytest.raises(ValueError):
+            Soil(water = [0.1, 0.2, 0.3], texture = ['Sand', 'Loam'])
+      with pytest.raises(ValueError):
+            Soil(water = [0.1, 0.2, 0.3], texture = ['Sand']*4)
+
+
+####################################################################################################################
+################################################ HILHORST FITTING #################################################
+####################################################################################################################
+
+def test_fitting_hilhorst_groups(tmp_path):
+      bulk_ec = [0.025, 0.038, 0.065, 0.079, 0.1, 0.02, 0.03, 0.04, 0.05]
+      bulk_perm = [13, 16.5, 21, 24, 26, 12.5, 16.8, 20, 23.1]
+      groups = ['A']*5 + ['B']*4
+      sample_H = Soil(bulk_ec = bulk_ec, bulk_perm = bulk_perm, water_ec = np.nan, temperature = 298.15, frequency_ec = 0)
+      report = fitting_hilhorst(sample_H, groups = groups)
+
+      # Each group equals its own fit, which is the least-squares optimum of the Hilhorst function
+      for group, states in [('A', slice(0, 5)), ('B', slice(5, 9))]:
+            sample_Hb = Soil(bulk_ec = bulk_ec[states], bulk_perm = bulk_perm[states], water_ec = np.nan, temperature = 298.15, frequency_ec = 0)
+            alone = fitting_hilhorst(sample_Hb)
+            assert arrays_are_similar(report.loc[group, ['water_ec', 'offset_perm']].values.astype(float), alone.loc[0, ['water_ec', 'offset_perm']].values.astype(float))
+            assert arrays_are_similar(sample_H.df.water_ec.values[states], sample_Hb.df.water_ec.values)
+            water_perm = sample_Hb.df.water_perm.values
+            sse = lambda water_ec, offset_perm: np.sum((Hilhorst(np.array(bulk_ec[states]), water_ec, water_perm, offset_perm) - bulk_perm[states])**2)
+            best = sse(*alone.loc[0, ['water_ec', 'offset_perm']])
+            assert all(best <= sse(alone.water_ec[0]*(1 + dw), alone.offset_perm[0] + do) for dw in [-1e-3, 0, 1e-3] for do in [-1e-3, 0, 1e-3])
+      assert (report.n_states == [5, 4]).all() and (report.R2 > 0.9).all()
+
+      # The stored fit and its groups are reused by WaterEC, also after saving
+      path = str(tmp_path / 'sample.npz')
+      sample_H.save(path)
+      sample_Hc = Soil.load(path)
+      sample_Hc.append_states(bulk_ec = 0.03)
+      assert arrays_are_similar(WaterEC(sample_Hc), np.append(sample_H.df.water_ec.values, np.nan))
+
+      # States assigned to other groups with the same labels are fitted again
+      regrouped = ['A', 'B']*4 + ['A']
+      report = fitting_hilhorst(sample_H, groups = regrouped)
+      fresh = fitting_hilhorst(Soil(bulk_ec = bulk_ec, bulk_perm = bulk_perm, water_ec = np.nan, temperature = 298.15, frequency_ec = 0), groups = regrouped)
+      assert arrays_are_similar(report.values.astype(float), fresh.values.astype(float))
+      assert not arrays_are_similar(report.offset_perm.values, sample_Hc.fits['predict.water_ec.fitting_hilhorst']['offset_perm'])
+
+      # States without a group are left missing, and their info says so
+      sample_Hd = Soil(bulk_ec = bulk_ec[:6], bulk_perm = bulk_perm[:6], water_ec = np.nan, temperature = 298.15, frequency_ec = 0)
+      fitting_hilhorst(sample_Hd, groups = ['A']*5 + [None])
+      assert np.isnan(sample_Hd.df.offset_perm.values[5]) and not np.isnan(sample_Hd.df.offset_perm.values[:5]).any()
+      assert all('Calculated by fitting Hilhorst' in info for info in sample_Hd.info.offset_perm[:5])
+      assert 'Provide offset_perm' in sample_Hd.info.offset_perm[5] and 'Calculated' not in sample_Hd.info.offset_perm[5]
+
+
+####################################################################################################################
+################################################# FU INVERSION ####################################################
+####################################################################################################################
+
+def test_fu_inversion():
+      water = np.array([0.1, 0.2, 0.3, 0.3])
+      dry_ec = np.array([np.nan, np.nan, np.nan, 0.01])
+      bulk_ec = np.array([Fu(wat, 30, 0.5, 0.6, 0, dry, np.nan) for wat, dry in zip(water, dry_ec)])
+
+      # Fu inverted in closed form returns the water_ec of the forward model, or NaN where it has no solution
+      assert arrays_are_similar(FuWaterEC(water, 30, 0.5, bulk_ec, 0, dry_ec, np.nan), 0.6)
+      assert np.isnan(FuWaterEC(0.3, 30, 0.5, 0.001, 0, np.nan, np.nan))
+      assert np.isnan(FuWaterEC(0.3, 30, 0.5, 0.07, 0, np.nan, 0.1))
+
+      sample_F = Soil(water = water, clay = 30, porosity = 0.5, bulk_ec = np.append(bulk_ec[:3], 0.001), solid_ec = 0, temperature = 298.15, frequency_ec = 0)
+      shift_to_bulk_ec_dc_tc(sample_F)
+      from_ec(sample_F)
+      assert arrays_are_similar(sample_F.df.water_ec.values[:3], 0.6, tol=1e-3) and np.isnan(sample_F.df.water_ec[3])
+      assert sample_F.info.water_ec[3].endswith("--> Provide water_ec; otherwise bulk_ec_dc_tc, water, clay and porosity")
+
+
+def test_fu_water_inversion():
+      # Water inverted from Fu matches bulk_ec_dc_tc, also for the small values where the squared residual is tiny
+      sample_FW = Soil(bulk_ec = np.array([1e-4, 5e-4, 1, 7, 12, 20])*1e-3, bulk_density = 1.7, texture = 'Sand', water_ec = 0.1,
+                       temperature = 298.15, frequency_ec = 0, raw = True)
+      Water(sample_FW)
+      df = sample_FW.df
+      bulk_ec = np.array([Fu(*state) for state in df[['water', 'clay', 'porosity', 'water_ec', 'solid_ec', 'dry_ec', 'sat_ec']].values])
+      assert all('Fu function' in info for info in sample_FW.info.water)
+      assert arrays_are_similar(bulk_ec/df.bulk_ec_dc_tc.values, 1, tol=1e-3)
+
+
+####################################################################################################################
+############################################## ONLY MISSING STATES ################################################
+####################################################################################################################
+
+def test_computable(monkeypatch):
+      import scipy.optimize
+      calls = []
+      minimize = scipy.optimize.minimize
+      monkeypatch.setattr(scipy.optimize, 'minimize', lambda *args, **kwargs: calls.append(kwargs['args']) or minimize(*args, **kwargs))
+
+      # The solver runs only in the states where bulk_ec_dc is missing and bulk_perm is known
+      bulk_ec_dc = np.full(10, 0.01)
+      bulk_ec_dc[[0, 4]] = np.nan
+      sample_C = Soil(bulk_perm = [20, 21, 22, 23, np.nan, 25, 26, 27, 28, 29], bulk_ec_dc = bulk_ec_dc, frequency_perm = 1e6, water_ec = 0.1, 
+                      porosity = 0.4, clay = 10, sand = 60, silt = 30)
+      water_from_perm.non_fitting(sample_C)
+      assert len(calls) == 1 and calls[0][2] == 20
+      assert (sample_C.df.bulk_ec_dc.values[1:4] == 0.01).all() and ~np.isnan(sample_C.df.bulk_ec_dc[0]) and np.isnan(sample_C.df.bulk_ec_dc[4])
+      assert sample_C.info.bulk_ec_dc[4].endswith("--> Provide bulk_ec_dc; otherwise, bulk_perm")
+
+      calls.clear()
+      sample_Cb = Soil(bulk_ec_dc_tc = [0.02, 0.03, np.nan, 0.05], bulk_ec_dc = [np.nan, 0.02, np.nan, 0.04], temperature = 290)
+      BulkECDC(sample_Cb)
+      assert len(calls) == 1 and arrays_are_similar(SheetsHendrickx(sample_Cb.df.bulk_ec_dc[0], 290), 0.02)
+      assert sample_Cb.info.bulk_ec_dc[2].endswith("--> Provide bulk_ec_dc; otherwise, bulk_ec_dc_tc, and temperature")
+
+
+####################################################################################################################
+################################################## LR INVERSIONS ##################################################
+####################################################################################################################
+
+def test_lr_alpha():
+      from pedophysics.pedophysical_models.water import LR
+      from pedophysics.pedophysical_models.bulk_perm import LR as LR_bulk_perm
+      bulk_perm = np.array([8, 12, 16, 20])
+
+      # Single, one-element, per-state and NaN alpha give the same water as the state-by-state inversion
+      single = LR(bulk_perm, 0.45, 1.2, 4, 80, 0.5)
+      assert arrays_are_similar(single, [LR(b, 0.45, 1.2, 4, 80, 0.5) for b in bulk_perm])
+      assert arrays_are_similar(LR(bulk_perm, 0.45, 1.2, 4, 80, np.array([0.5])), single)
+      assert arrays_are_similar(LR(bulk_perm, 0.45, 1.2, 4, 80, np.nan), single)
+      alpha = np.array([0.4, 0.5, 0.6, np.nan])
+      assert arrays_are_similar(LR(bulk_perm, 0.45, 1.2, 4, 80, alpha), [LR(b, 0.45, 1.2, 4, 80, a) for b, a in zip(bulk_perm, alpha)])
+      assert arrays_are_similar(LR_bulk_perm(LR(bulk_perm, 0.45, 1.2, 4, 80, alpha), 0.45, 1.2, 4, 80, alpha), bulk_perm)
+
+      sample_L = Soil(bulk_perm = bulk_perm, frequency_perm = [50e6, 150e6, 1e9, 150e6], porosity = 0.45, CEC = 10, clay = 20, water_perm = 80)
+      water = Water(sample_L)
+      assert arrays_are_similar(water[[1, 3]], np.round(single[[1, 3]], 3), tol=1e-3)
+      assert sample_L.info.water[1].endswith("--> Calculated using LR function (reported RMSE=0.032) in predict.water_from_perm.non_fitting")
+
+      # Per-state alpha is applied to the states of the LR band, NaN taking the default 0.5
+      sample_L2 = Soil(bulk_perm = bulk_perm, frequency_perm = [150e6, 150e6, 1e9, 150e6], porosity = 0.45, clay = 20, water_perm = 80, alpha = alpha)
+      water = Water(sample_L2)
+      assert arrays_are_similar(water[[0, 1, 3]], np.round(LR(bulk_perm, 0.45, 1.2, 4, 80, alpha)[[0, 1, 3]], 3), tol=1e-3)
+      sample_L3 = Soil(water = water, frequency_perm = [150e6, 150e6, 1e9, 150e6], porosity = 0.45, clay = 20, water_perm = 80, alpha = alpha)
+      assert arrays_are_similar(BulkPerm(sample_L3)[[0, 1, 3]], bulk_perm[[0, 1, 3]], tol=0.05)
+      ensemble = WaterEnsemble(Soil(bulk_perm = bulk_perm, frequency_perm = 150e6, porosity = 0.45, water_perm = 80, alpha = alpha), {'bulk_perm': ('relative', 1e-6)}, n_samples=10, seed=0)
+      assert arrays_are_similar(ensemble['q0.5'].values, LR(bulk_perm, 0.45, 1.2, 4, 80, alpha), tol=1e-3)
+      with pytest.raises(ValueError):
+            Soil(bulk_perm = bulk_perm, alpha = [0.4, 0.6])
+
+
+####################################################################################################################
+################################################# BATCH PROCESSOR #################################################
+####################################################################################################################
+
+def test_cli(tmp_path):
+      from pedophysics import cli
+      frame = pd.DataFrame({'theta': [0.1, 0.2, np.nan, 0.25, np.nan], 'bulk_perm': [6, 11, 9, 14, 10], 'site': ['a', 'a', 'b', 'b', 'c']})
+      frame.to_csv(tmp_path / 'survey.csv', index=False)
+      output = str(tmp_path / 'results')
+      arguments = [str(tmp_path / 'survey.csv'), output, '--target', 'Water', '--map', 'theta=water', '--set', 'frequency_perm=50e6', 'water_ec=0.1', '--chunk-size', '2']
+      assert cli.main(arguments) == 0
+
+      # Each part equals the predictions on its chunk, with the other columns of the file
+      parts = pd.concat([pd.read_csv(os.path.join(output, f"part-0000{i}.csv"), index_col='state') for i in range(3)])
+      for start in [0, 2, 4]:
+            sample_B = Soil.from_frame(frame[start:start+2], columns={'theta': 'water'}, frequency_perm=50e6, water_ec=0.1)
+            assert arrays_are_similar(parts.water.values[start:start+2], Water(sample_B))
+            assert (parts['info.water'].values[start:start+2] == sample_B.info.water.values).all()
+      assert (parts.site == frame.site).all() and (parts.index == frame.index).all()
+
+      # Resuming writes the missing parts only, and requires the same settings
+      os.remove(os.path.join(output, 'part-00001.csv'))
+      assert cli.run(str(tmp_path / 'survey.csv'), output, ['Water'], columns={'theta': 'water'}, attributes={'frequency_perm': 50e6, 'water_ec': 0.1},
+                     chunk_size=2, resume=True) == [os.path.join(output, 'part-00001.csv')]
+      assert cli.main(arguments[:-2] + ['--chunk-size', '3', '--resume']) == 1
+      with pytest.raises(ValueError):
+            cli.run(str(tmp_path / 'survey.csv'), output, ['Texture'])
+
+
+####################################################################################################################
+################################################ PREDICTION SERVICE ###############################################
+####################################################################################################################
+
+def test_service():
+      import json
+      import threading
+      import urllib.request
+      import urllib.error
+      from concurrent.futures import ThreadPoolExecutor
+      from pedophysics.service import make_server, PredictionService
+
+      server = make_server(port=0, service=PredictionService(max_wait=0.2, warm=False))
+      threading.Thread(target=server.serve_forever, daemon=True).start()
+      url = f"http://127.0.0.1:{server.server_address[1]}"
+      def post(path, content):
+            request = urllib.request.Request(url + path, data=json.dumps(content).encode(), headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(request) as response:
+                  return json.loads(response.read())
+
+      try:
+            # Concurrent requests are predicted in one batch, with the results of separate soils
+            requests = [{'states': {'bulk_perm': [10 + i, 12 + i]}, 'attributes': {'frequency_perm': 150e6, 'porosity': 0.4 + i/100}} for i in range(4)]
+            with ThreadPoolExecutor(4) as pool:
+                  responses = list(pool.map(lambda content: post('/predict/Water', content), requests))
+            for content, response in zip(requests, responses):
+                  sample_S = Soil(bulk_perm = content['states']['bulk_perm'], **content['attributes'])
+                  assert arrays_are_similar(np.array(response['water'], dtype=float), Water(sample_S))
+                  assert response['info'] == list(sample_S.info.water)
+            metrics = json.loads(urllib.request.urlopen(url + '/metrics').read())['targets']['Water']
+            assert metrics['requests'] == 4 and metrics['states'] == 8 and metrics['batches'] < 4
+
+            # Calibrated fits are reused by the predictions of the calibration
+            post('/calibrate/site', {'target': 'Water', 'states': {'bulk_perm': [7, 10, 14, 12], 'water': [0.05, 0.11, 0.17, None]}, 
+                                     'attributes': {'frequency_perm': 1e9}})
+            response = post('/predict/Water', {'states': {'bulk_perm': [9, 11]}, 'attributes': {'frequency_perm': 1e9}, 'calibration': 'site'})
+            sample_Sb = Soil(bulk_perm = [7, 10, 14, 12], water = [0.05, 0.11, 0.17, np.nan], frequency_perm = 1e9)
+            Water(sample_Sb)
+            sample_Sb.append_states(bulk_perm = [9, 11], frequency_perm = 1e9)
+            assert arrays_are_similar(np.array(response['water']), Water(sample_Sb)[4:])
+
+            with pytest.raises(urllib.error.HTTPError) as error:
+                  post('/predict/Texture', requests[0])
+            assert error.value.code == 400
+
+            # Strategies are predicted with the tables of the previous batches of their frequency
+            from pedophysics.utils.solvers import _table
+            content = {'states': {'bulk_ec': [0.01, 0.02]}, 'attributes': {'frequency_ec': 1e4, 'temperature': 298.15}, 'strategy': 'fast'}
+            post('/predict/BulkECDC', content)
+            misses = _table.cache_info().misses
+            response = post('/predict/BulkECDC', content)
+            assert _table.cache_info().misses == misses
+            sample_Sc = Soil(bulk_ec = [0.01, 0.02], frequency_ec = 1e4, temperature = 298.15)
+            assert arrays_are_similar(np.array(response['bulk_ec_dc'], dtype=float), BulkECDC(sample_Sc, strategy = 'fast'))
+            assert 'strategy=fast' in response['info'][0]
+            with pytest.raises(urllib.error.HTTPError) as error:
+                  post('/predict/Water', dict(content, strategy = 'bad'))
+            assert error.value.code == 400
+
+            # Undecodable bodies and unexpected errors are answered with a JSON error
+            request = urllib.request.Request(url + '/predict/Water', data=b'not an arrow stream', headers={'Content-Type': 'application/vnd.apache.arrow.stream'})
+            with pytest.raises(urllib.error.HTTPError) as error:
+                  urllib.request.urlopen(request)
+            assert error.value.code in [400, 500] and 'error' in json.loads(error.value.read())
+            def fail(*args):
+                  raise RuntimeError('out of memory')
+            server.service.predict = fail
+            with pytest.raises(urllib.error.HTTPError) as error:
+                  post('/predict/Water', requests[0])
+            assert error.value.code == 500 and json.loads(error.value.read()) == {'error': 'RuntimeError: out of memory'}
+      finally:
+            server.shutdown()
+            server.server_close()
+
+
+####################################################################################################################
+############################################### IMMUTABLE PREDICTIONS #############################################
+####################################################################################################################
+
+def test_predict_targets():
+      from concurrent.futures import ThreadPoolExecutor
+      from pedophysics.predict import predict_copy, predict_targets, BulkPerm
+
+      sample_I = Soil(water = [0.05, 0.11, 0.17, np.nan], bulk_perm = [7, 10, 14, 12], clay = 20, porosity = 0.4, water_ec = 0.1, frequency_perm = 1e9)
+      df, info = sample_I.df.copy(), sample_I.info.copy()
+
+      # Targets predicted concurrently on copies equal those predicted on their own soils, and the shared soil is unchanged
+      predictions = predict_targets(sample_I, [BulkPerm, 'BulkEC', 'Water'])
+      for name, target in [('BulkPerm', BulkPerm), ('BulkEC', BulkEC), ('Water', Water)]:
+            sample_Ib = Soil(water = [0.05, 0.11, 0.17, np.nan], bulk_perm = [7, 10, 14, 12], clay = 20, porosity = 0.4, water_ec = 0.1, frequency_perm = 1e9)
+            assert arrays_are_similar(predictions[name].values, target(sample_Ib))
+            pd.testing.assert_frame_equal(predictions[name].soil.df, sample_Ib.df)
+      with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(lambda _: predict_copy(sample_I, Water).values, range(8)))
+      assert all(arrays_are_similar(result, predictions['Water'].values) for result in results)
+
+      pd.testing.assert_frame_equal(sample_I.df, df)
+      pd.testing.assert_frame_equal(sample_I.info, info)
+      assert sample_I.fits == {} and np.isnan(sample_I.Lw) and predictions['Water'].soil.fits and ~np.isnan(predictions['Water'].soil.Lw)
+
+      # A copy taken while the soil is being predicted is rounded as a soil of its own
+      sample_I._computing, sample_I._strategy = True, 'fast'
+      copied = sample_I.copy()
+      sample_I._computing, sample_I._strategy = False, None
+      assert not copied._computing and copied._strategy is None
+      assert arrays_are_similar(Water(copied), predictions['Water'].values)
+
+
+####################################################################################################################
+################################################### EXPLAIN PLANS ##################################################
+####################################################################################################################
+
+def test_explain(monkeypatch):
+      import scipy.optimize
+      from pedophysics.predict import explain
+      calls = []
+      minimize = scipy.optimize.minimize
+      monkeypatch.setattr(scipy.optimize, 'minimize', lambda *args, **kwargs: calls.append(1) or minimize(*args, **kwargs))
+
+      # A fitted frequency, two non-fitting bands, a low frequency and bulk_ec states
+      def sample():
+            return Soil(water = [0.05, 0.11, 0.17, 0.22, np.nan, np.nan, np.nan, np.nan, np.nan, np.nan],
+                        bulk_perm = [7, 10, 14, 18, 12, 40, 15, 20, np.nan, np.nan], frequency_perm = [1e9]*6 + [50e6, 1e6, np.nan, np.nan],
+                        bulk_ec = [np.nan]*8 + [0.02, 0.03], frequency_ec = [np.nan]*8 + [1e3, 0], porosity = 0.45, clay = 20, water_ec = 0.1)
+
+      sample_P = sample()
+      plan = explain(sample_P, 'Water')
+      assert plan.models.water.tolist() == ['given']*4 + ['WunderlichP', 'LR_W', '', 'Fu', 'Fu', 'Fu']
+      assert plan.missing.water[6] == 'LR_MV requires CEC' and (plan.missing.water.drop(6) == '').all()
+      assert plan.solver_calls == {'predict.water_from_perm.fitting': 6, 'predict.water_from_perm.non_fitting': 1,
+                                   'predict.bulk_ec_dc.non_dc_to_dc': 1, 'predict.water_from_ec.non_fitting': 3}
+      assert len(calls) == 0 and np.isnan(sample_P.df.water[4:]).all() and sample_P.fits == {}
+
+      # The predict function uses the models and solver calls of the plan
+      Water(sample_P)
+      assert len(calls) == sum(plan.solver_calls.values())
+      assert (np.isnan(sample_P.df.water.values) == (plan.models.water == '').values).all()
+      assert 'WunderlichP' in sample_P.info.water[4] and 'LR_W' in sample_P.info.water[5] and 'Fu' in sample_P.info.water[9]
+
+      plan = explain(sample(), BulkPerm)
+      assert plan.models.bulk_perm[8] == '' and plan.missing.bulk_perm[8] == 'BulkPerm requires frequency_perm'
+      with pytest.raises(ValueError):
+            explain(sample(), 'Salinity')
+
+
+####################################################################################################################
+############################################### INVERSION STRATEGIES ###############################################
+####################################################################################################################
+
+def test_strategy(monkeypatch):
+      import scipy.optimize
+      from pedophysics.predict import explain
+      calls = []
+      minimize = scipy.optimize.minimize
+      monkeypatch.setattr(scipy.optimize, 'minimize', lambda *args, **kwargs: calls.append(1) or minimize(*args, **kwargs))
+
+      # Fitted bulk_perm states, low frequency bulk_perm states and fitted bulk_ec states
+      def sample():
+            return [Soil(bulk_perm = [10, 15, 20, 25, 12, 18], water = [0.1, 0.2, 0.3, np.nan, np.nan, np.nan], frequency_perm = 1e9,
+                         clay = 15, bulk_density = 1.5, water_ec = 0.05, temperature = 298.15),
+                    Soil(bulk_perm = [30, 40, 50, 60], frequency_perm = [1e5, 1e5, 5e5, 5e5], clay = 15, bulk_density = 1.5,
+                         water_ec = 0.05, temperature = 298.15),
+                    Soil(bulk_ec = [0.01, 0.02, 0.03, 0.025, 0.035], water = [0.1, 0.2, 0.3, np.nan, np.nan], frequency_ec = 1e4,
+                         temperature = 298.15)]
+
+      explained = sum(sum(explain(sample_S, 'Water').solver_calls.values()) for sample_S in sample())
+      exact = [Water(sample_S) for sample_S in sample()]
+      n_exact = len(calls)
+      assert explained == n_exact
+      for strategy in ['fast', 'auto']:
+            # explain counts the minimize calls left by the strategy
+            explained = sum(sum(explain(sample_S, 'Water', strategy = strategy).solver_calls.values()) for sample_S in sample())
+            del calls[:]
+            samples = sample()
+            for sample_S, water in zip(samples, exact):
+                  assert np.allclose(Water(sample_S, strategy = strategy), water, equal_nan = True)
+            assert len(calls) < n_exact and len(calls) == explained
+            assert f'by bisection inversion (strategy={strategy})' in samples[0].info.water[3]
+            assert f'by tabulated inversion (strategy={strategy})' in samples[1].info.bulk_ec_dc[0]
+            assert f'by bisection inversion (strategy={strategy})' in samples[2].info.water[3]
+
+      sample_S = sample()[0]
+      Water(sample_S, strategy = 'exact')
+      assert 'by optimizer inversion (strategy=exact)' in sample_S.info.water[3] and sample_S._strategy is None
+      sample_S = sample()[0]
+      Water(sample_S)
+      assert 'inversion' not in sample_S.info.water[3]
+      with pytest.raises(ValueError):
+            Water(sample()[0], strategy = 'bad')
+      with pytest.raises(ValueError):
+            explain(sample()[0], 'Water', strategy = 'bad')
+
+      # Zero bulk_ec has a zero bulk_ec_dc on every path
+      for strategy in ['exact', 'fast', 'auto']:
+            assert arrays_are_similar(BulkECDC(Soil(bulk_ec = [0, 0.01], frequency_ec = 1e4), strategy = strategy), np.array([0, 0.0091]))
+
+
+####################################################################################################################
+################################################ SOLVER DIAGNOSTICS ################################################
+####################################################################################################################
+
+def test_diagnostics(tmp_path):
+      from pedophysics.predict import BulkECDC
+      from pedophysics.utils.diagnostics import diagnostics, record
+
+      # water_ec = 50 and bulk_ec = 5 are out of reach of SenGoode and LongmireSmithEC inside their bounds: the solvers stop at the bound
+      sample_D = Soil(water_ec = [0.1, 0.1, np.nan, 50], bulk_ec = [0.01, 0.02, 5, 0], frequency_ec = 1e4, temperature = 298.15)
+      assert arrays_are_similar(Salinity(sample_D), np.array([0.00846, 0.00846, np.nan, 1]))
+      assert arrays_are_similar(BulkECDC(sample_D), np.array([0.0091, 0.01854, 1, 0]))
+      records = sample_D.diagnostics['predict.salinity.Salinity']
+      assert records['converged'].tolist() == [True, True, False, True] and records['status'].tolist() == [0, 0, 0, 0]
+      assert records['within_tolerance'].tolist() == [True, True, False, False] and records['bound'].tolist() == [False, False, False, True]
+      assert records['iterations'][2] == -1 and np.isnan(records['residual'][2]) and records['residual'][3] > 40
+      table = diagnostics(sample_D)
+      # The absolute floor of the tolerance accepts the exact solution of a zero bulk_ec
+      assert table['predict.bulk_ec_dc.non_dc_to_dc', 'within_tolerance'].tolist() == [True, True, False, True]
+      assert (table['predict.bulk_ec_dc.non_dc_to_dc', 'iterations'].values > 0).all()
+
+      # The fast paths record their diagnostics as well
+      sample_F = Soil(bulk_ec = [0.01, 0.02, 5, np.nan], frequency_ec = 1e4, temperature = 298.15)
+      assert arrays_are_similar(BulkECDC(sample_F, strategy = 'fast'), np.array([0.0091, 0.01854, 1, np.nan]))
+      assert sample_F.diagnostics['predict.bulk_ec_dc.non_dc_to_dc']['within_tolerance'].tolist() == [True, True, False, False]
+      assert sample_F.diagnostics['predict.bulk_ec_dc.non_dc_to_dc']['iterations'].tolist() == [0, 0, 0, -1]
+
+      # With drop_unconverged, the states where the solver fails or the tolerance is missed are left missing
+      sample_U = Soil(water_ec = [0.1, 0.1, np.nan, 50], bulk_ec = [0.01, 0.02, 5, 0], frequency_ec = 1e4, temperature = 298.15, drop_unconverged = True)
+      assert arrays_are_similar(Salinity(sample_U), np.array([0.00846, 0.00846, np.nan, np.nan]))
+      assert arrays_are_similar(BulkECDC(sample_U), np.array([0.0091, 0.01854, np.nan, 0]))
+      assert 'Provide bulk_ec_dc' in sample_U.info.bulk_ec_dc[2]
+      assert np.isnan(record(sample_U, 'predict.bulk_ec_dc.tc_to_non_tc', [True, True, False, False], [0.1, 0.2], [0, 0], 9, [0.1, 0.2], (0, 1), [0, 2])[1])
+      assert sample_U.diagnostics['predict.bulk_ec_dc.tc_to_non_tc']['converged'].tolist() == [True, False, False, False]
+      sample_U.save(str(tmp_path / 'dropped.npz'))
+      assert Soil.load(str(tmp_path / 'dropped.npz')).drop_unconverged
+
+      # Diagnostics are saved, appended, copied and reset with the states
+      for name in ['sample.npz', 'sample.parquet']:
+            sample_D.save(str(tmp_path / name))
+            assert diagnostics(Soil.load(str(tmp_path / name))).equals(table)
+      copied = sample_D.copy()
+      copied.append_states(water_ec = 0.2)
+      assert len(copied.diagnostics['predict.salinity.Salinity']) == 5 and copied.diagnostics['predict.salinity.Salinity']['iterations'][4] == -1
+      assert len(sample_D.diagnostics['predict.salinity.Salinity']) == 4
+      sample_D.update(states = [0], water_ec = 0.2)
+      assert sample_D.diagnostics['predict.salinity.Salinity']['iterations'][0] == -1 and sample_D.diagnostics['predict.salinity.Salinity']['converged'][1]
+      sample_D.update(Lw = 0.1)
+      assert sample_D.diagnostics == {}